@@ -23,6 +23,7 @@
 
 from __future__ import absolute_import
 from ._sync.stream import Stream
+from ._sync.sketch import BloomFilter, HyperLogLog, KLL, SpaceSaving
 
 import sys
 
@@ -19,10 +19,17 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from .util import AsyncAdaptor, unwrap, not_infinite
+from .util import AsyncAdaptor, BlockingAdaptor, SequenceAdaptor, unwrap, not_infinite
 from pstream.errors import InfiniteCollectionError
 from pstream._async.functors import *
-
+from pstream._sync.aggregate import AGGREGATORS, NOTHING, aggregator, identity, is_valid
+from pstream._sync.sketch import BloomFilter, HyperLogLog, KLL, Moments, SpaceSaving, describe
+from pstream._sync.window import RecentKeys
+
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from concurrent.futures import Executor
+from multiprocessing import cpu_count
+from inspect import iscoroutinefunction
 from typing import TypeVar, Generic, List, Collection, Callable
 
 T = TypeVar('T')
@@ -53,17 +60,35 @@ class AsyncStream(Generic[T]):
     >>> await AsyncStream([1, 2, 3, 4]).filter(consult).map(double).collect()
     """
 
-    def __init__(self, initial: Collection[T] = None):
+    def __init__(self, initial: Collection[T] = None, blocking: bool = False, batch_size: int = 64):
         """
         :param initial: An optional initial value for the stream. `Must` be either an iterator, an iterable, or an
                         asynchronous iterator (supports an `__anext__` method). If `initial` is `None` then the stream
                         with be initialized to be empty.
+        :param blocking: :class:`bool`. Whether drawing from a synchronous `initial` may block, as is the case for
+                         files, sockets, and database cursors. If so, elements are drawn from within the event loop's
+                         default executor rather than on the event loop itself, so that other tasks may carry on in
+                         the meantime. Has no effect on an asynchronous `initial`.
+        :param batch_size: :class:`int`. The number of elements drawn per trip to the executor when `blocking`.
+                           While one batch is being consumed, the next is already being drawn.
+                           `Must` be greater than 0.
 
         :Raises: :class:`ValueError` if `initial` is neither an iterator nor, an iterable, nor an asynchronous iterator.
+
+        :Example:
+        >>> with open('access.log') as log:
+        ...     errors = await AsyncStream(log, blocking=True).filter(lambda line: ' 500 ' in line).count()
         """
         if initial is None:
             initial = []
-        self.stream = AsyncAdaptor.new(initial)
+        if blocking and batch_size <= 0:
+            raise ValueError("pstream.AsyncStream batch sizes must be greater than 0. Received {}.".format(batch_size))
+        if blocking and not isinstance(initial, (AsyncIterator, AsyncIterable)):
+            self.stream = BlockingAdaptor(initial, batch_size)
+        elif isinstance(initial, Sequence):
+            self.stream = SequenceAdaptor(initial)
+        else:
+            self.stream = AsyncAdaptor.new(initial)
         self._infinite = False
 
     @not_infinite
@@ -117,7 +142,146 @@ class AsyncStream(Generic[T]):
         return await count(self.stream)
 
     @unwrap
-    def distinct(self):
+    @not_infinite
+    async def approx_count_distinct(self, precision: int = 14) -> int:
+        """
+        Evaluates the stream, consuming it and returning an estimate of the number of distinct elements in the stream.
+        Distinction is computed by applying the builtin `hash` function to each element.
+
+        Rather than collecting every distinct element into a hashset (as `distinct().count()` would) the estimate is
+        computed with a :class:`pstream.HyperLogLog` sketch of 2 ** `precision` bytes. The standard error of the
+        estimate is roughly 1.04 / sqrt(2 ** `precision`), or 0.8% for the default precision of 14 (16KB).
+
+        In order to combine estimates from several streams (say, shards of a dataset counted in parallel) build a
+        :class:`pstream.HyperLogLog` for each stream with :meth:`AsyncStream.for_each` and merge them.
+
+        :param precision: :class:`int`. The base 2 logarithm of the number of registers in the sketch.
+                          `Must` be within [4, 18].
+
+        :Returns: :class:`int`
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> count = await AsyncStream(range(100)).map(lambda x: x % 10).approx_count_distinct()
+        >>> assert count == 10
+        """
+        hyperloglog = HyperLogLog(precision)
+        await sketch(self.stream, hyperloglog)
+        return int(round(hyperloglog.estimate()))
+
+    @unwrap
+    @not_infinite
+    async def quantiles(self, qs: List[float], k: int = 200) -> List[T]:
+        """
+        Evaluates the stream, consuming it and returning an estimate of the element at each of the given quantiles.
+
+        Rather than sorting the entire stream, the estimates are computed in a single pass with a :class:`pstream.KLL`
+        sketch which holds only O(`k`) elements in memory. The rank of each estimate is typically within
+        1.7 / `k` of the requested quantile (a little under 1% for the default `k` of 200). The quantiles 0 and 1
+        are always exactly the smallest and largest elements.
+
+        :param qs: A list of quantiles, each of which `must` be within [0, 1].
+        :param k: :class:`int`. Controls the size, and therefore the accuracy, of the sketch. `Must` be at least 8.
+
+        :Returns: :class:`list`. The estimated element at each quantile, in the order given. Every estimate is
+                  `None` if the stream is empty.
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> # The median and the 99th percentile.
+        >>> p50, p99 = await AsyncStream(range(1, 10001)).quantiles([0.5, 0.99])
+        >>> assert 4900 <= p50 <= 5100
+        >>> assert 9800 <= p99 <= 10000
+        """
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError("pstream.AsyncStream.quantiles quantiles must be within [0, 1]. Received {}.".format(q))
+        kll = KLL(k)
+        await sketch(self.stream, kll)
+        return kll.quantiles(qs)
+
+    @unwrap
+    @not_infinite
+    async def describe(self, qs: List[float] = (0.25, 0.5, 0.75), k: int = 200):
+        """
+        Evaluates the stream of numbers, consuming it and returning summary statistics in a single pass.
+
+        The count, mean, (sample) variance, standard deviation, minimum and maximum are exact, and are computed using
+        Welford's algorithm. The quantiles are estimated as in :meth:`AsyncStream.quantiles`.
+
+        The constructed tuple is the namedtuple, :class:`Stream.Description`, which provides the names `count`,
+        `mean`, `variance`, `stdev`, `min`, `max`, and `quantiles`, a :class:`dict` of each quantile to its estimate.
+        Statistics which are undefined for the number of elements in the stream (such as the mean of an empty
+        stream, or the variance of a single number) are `None`.
+
+        :param qs: A list of quantiles, each of which `must` be within [0, 1].
+        :param k: :class:`int`. Controls the size, and therefore the accuracy, of the quantile sketch.
+                  `Must` be at least 8.
+
+        :Returns: :class:`Stream.Description`
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> latencies = [12, 15, 11, 90, 13, 14, 12, 16, 11, 13]
+        >>> description = await AsyncStream(latencies).describe(qs=[0.5, 1])
+        >>> description.count, round(description.mean, 3), description.min, description.max
+        (10, 20.7, 11, 90)
+        >>> description.quantiles
+        {0.5: 13, 1: 90}
+        """
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError("pstream.AsyncStream.describe quantiles must be within [0, 1]. Received {}.".format(q))
+        moments = Moments()
+        kll = KLL(k)
+        await sketch(self.stream, moments, kll)
+        return describe(moments, kll, qs)
+
+    @unwrap
+    @not_infinite
+    async def most_common(self, k: int, approximate: bool = False, counters: int = None):
+        """
+        Evaluates the stream, consuming it and returning the `k` most frequent elements along with their counts,
+        from the most frequent to the least. Elements with equal counts are ordered by their first occurrence.
+
+        By default, every distinct element is counted exactly.
+
+        If `approximate` is `True` then no more than `counters` distinct elements are tracked at once using the
+        Space-Saving algorithm (see :class:`pstream.SpaceSaving`). Memory is then fixed, however counts may be
+        overestimated by up to N / `counters` where N is the number of elements in the stream. Every element that
+        occurs more than N / `counters` times is guaranteed to be reported.
+
+        :param k: :class:`int`. The number of elements to return. `Must` be greater than 0.
+        :param approximate: :class:`bool`. Whether to track a fixed number of counters rather than every element.
+        :param counters: :class:`int`. The number of counters to track. Defaults to 10 * `k`. `Must` be at least `k`.
+                         Ignored unless `approximate` is `True`.
+
+        :Returns: :class:`list`. Up to `k` `(element, count)` tuples.
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> words = 'the quick brown fox jumps over the lazy dog the fox'.split()
+        >>> await AsyncStream(words).most_common(2)
+        [('the', 3), ('fox', 2)]
+        """
+        if k <= 0:
+            raise ValueError("pstream.AsyncStream.most_common k must be greater than 0. Received {}.".format(k))
+        if approximate:
+            counters = 10 * k if counters is None else counters
+            if counters < k:
+                raise ValueError("pstream.AsyncStream.most_common counters must be at least k ({}). Received {}.".format(k, counters))
+        else:
+            counters = None
+        space_saving = SpaceSaving(counters)
+        await sketch(self.stream, space_saving)
+        return space_saving.most_common(k)
+
+    @unwrap
+    def distinct(self, approximate: bool = False, capacity: int = 1000000, error_rate: float = 0.001):
         """
         Returns a stream of distinct elements. Distinction is computed by applying the builtin `hash` function
         to each element. Ordering of elements in the stream is maintained.
@@ -125,18 +289,37 @@ class AsyncStream(Generic[T]):
         This functor incurs an additional allocation in the form of a hashset in order to keep track of
         the elements in the stream.
 
+        If `approximate` is `True` then the hashset is replaced by a :class:`pstream.BloomFilter` of a fixed size that
+        is determined by the given `capacity` and `error_rate`. Memory no longer grows with the number of distinct
+        elements, however an element may be mistaken for a duplicate (and thus dropped) with a probability of
+        roughly `error_rate`, so long as no more than `capacity` distinct elements have been seen. An element that
+        is truly distinct from all of its predecessors is never yielded twice.
+
+        :param approximate: :class:`bool`. Whether to track elements in a fixed size Bloom filter rather than a hashset.
+        :param capacity: :class:`int`. The number of distinct elements that the Bloom filter is sized for.
+                         `Must` be greater than 0. Ignored unless `approximate` is `True`.
+        :param error_rate: :class:`float`. The acceptable probability of dropping a distinct element.
+                           `Must` be within (0, 1). Ignored unless `approximate` is `True`.
+
         :Returns: :class:`AsyncStream`
 
         :Example:
         >>> numbers = [1, 2, 2, 3, 2, 1, 4, 5, 6, 1]
         >>> got = await AsyncStream(numbers).distinct().collect()
         >>> assert got == [1, 2, 3, 4, 5, 6]
+
+        :Example:
+        >>> got = await AsyncStream(numbers).distinct(approximate=True, capacity=100, error_rate=0.01).collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6]
         """
-        self.stream = distinct(self.stream)
+        if approximate:
+            self.stream = distinct_with_seen(identity, self.stream, BloomFilter(capacity, error_rate))
+        else:
+            self.stream = distinct(self.stream)
         return self
 
     @unwrap
-    def distinct_with(self, key: Callable[[T], U]):
+    def distinct_with(self, key: Callable[[T], U], approximate: bool = False, capacity: int = 1000000, error_rate: float = 0.001):
         """
         Returns a stream of distinct elements. Distinction is computed by applying the builtin `hash` function
         to each item generated by the provided `key(element)`. Ordering of elements in the stream is maintained.
@@ -144,8 +327,16 @@ class AsyncStream(Generic[T]):
         This functor incurs an additional allocation in the form of a hashset in order to keep track of
         the elements in the stream.
 
+        If `approximate` is `True` then the hashset is replaced by a fixed size Bloom filter
+        (see :meth:`AsyncStream.distinct`).
+
         :param key: A function such that `key(element) -> T` where `T` must be hashable. `key` may be either
                     asynchronous or synchronous.
+        :param approximate: :class:`bool`. Whether to track keys in a fixed size Bloom filter rather than a hashset.
+        :param capacity: :class:`int`. The number of distinct keys that the Bloom filter is sized for.
+                         `Must` be greater than 0. Ignored unless `approximate` is `True`.
+        :param error_rate: :class:`float`. The acceptable probability of dropping a distinct element.
+                           `Must` be within (0, 1). Ignored unless `approximate` is `True`.
 
         :Returns: :class:`AsyncStream`
 
@@ -157,7 +348,66 @@ class AsyncStream(Generic[T]):
         >>> got = await AsyncStream(people).distinct_with(fingerprinter).collect()
         >>> assert got == ['Bob', 'Alice', 'Eve', 'Achmed']
         """
-        self.stream = distinct_with(key, self.stream)
+        if approximate:
+            self.stream = distinct_with_seen(key, self.stream, BloomFilter(capacity, error_rate))
+        else:
+            self.stream = distinct_with(key, self.stream)
+        return self
+
+    @unwrap
+    def distinct_within(self, window: int = None, ttl: float = None, key: Callable[[T], U] = None):
+        """
+        Returns a stream of elements that are distinct from those that came shortly before them. Distinction is
+        computed by applying the builtin `hash` function to each element, or to each item generated by
+        the provided `key(element)`. Ordering of elements in the stream is maintained.
+
+        Unlike :meth:`AsyncStream.distinct`, only the keys of recently yielded elements are remembered. A key is
+        forgotten once `window` other distinct keys have been yielded after it, or once `ttl` seconds have passed since
+        it was yielded. Memory is therefore bounded, and this functor may be used on infinite streams. At least one
+        of `window` and `ttl` `must` be given. If both are given, then a key is forgotten as soon as either bound
+        is reached.
+
+        :param window: :class:`int`. The number of most recently yielded keys to remember. `Must` be greater than 0.
+        :param ttl: :class:`float`. The number of seconds for which to remember a yielded key. `Must` be greater than 0.
+        :param key: An optional function such that `key(element) -> T` where `T` must be hashable. `key` may be
+                    either asynchronous or synchronous.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> # Drop redelivered messages, so long as they arrive within three messages of the original.
+        >>> messages = [1, 2, 1, 3, 2, 4, 5, 6, 1, 6]
+        >>> got = await AsyncStream(messages).distinct_within(window=3).collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6, 1]
+        """
+        if window is None and ttl is None:
+            raise ValueError("pstream.AsyncStream.distinct_within requires either a window or a ttl.")
+        if window is not None and window <= 0:
+            raise ValueError("pstream.AsyncStream.distinct_within windows must be greater than 0. Received {}.".format(window))
+        if ttl is not None and ttl <= 0:
+            raise ValueError("pstream.AsyncStream.distinct_within ttls must be greater than 0. Received {}.".format(ttl))
+        key = identity if key is None else key
+        self.stream = distinct_with_seen(key, self.stream, RecentKeys(window, ttl))
+        return self
+
+    @unwrap
+    def distinct_sorted(self):
+        """
+        Returns a stream of distinct elements from a stream that is already sorted (or, at least, a stream
+        in which equal elements are adjacent to one another). Distinction is computed by equality against
+        the previous element, so this functor holds only a single element in memory, never requires that
+        elements be hashable, and may be used on infinite streams.
+
+        Equal elements that are not adjacent to one another are not considered duplicates.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> numbers = [1, 1, 2, 3, 3, 3, 4, 5, 5, 6]
+        >>> got = await AsyncStream(numbers).distinct_sorted().collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6]
+        """
+        self.stream = distinct_sorted(self.stream)
         return self
 
     @unwrap
@@ -286,14 +536,20 @@ class AsyncStream(Generic[T]):
 
     @unwrap
     @not_infinite
-    def group_by(self, key: Callable[[T], U]):
+    def group_by(self, key: Callable[[T], U], memory_limit: int = None):
         """
         Returns a stream that groups elements together using the provided `key` function.
 
         The ordering of the groups is non-deterministic.
 
+        If a `memory_limit` is provided then, once more than `memory_limit` elements have been seen, elements are
+        hash-partitioned by their key into temporary files which are then grouped one partition at a time. Every
+        element, and every key, must therefore be picklable.
+
         :param key: A function such that `f(element) -> T` where `T` will be used to group elements together. `key`
                     may be either asynchronous or synchronous.
+        :param memory_limit: :class:`int`. An optional maximum number of elements to hold in memory while grouping.
+                             `Must` be greater than 0.
 
         :Returns: :class:`AsyncStream`
 
@@ -322,7 +578,90 @@ class AsyncStream(Generic[T]):
         >>> [0, 2, 4, 6, 8] in got
         True
         """
-        self.stream = group_by(key, self.stream)
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError("pstream.AsyncStream.group_by memory limits must be greater than 0. Received {}.".format(memory_limit))
+        self.stream = group_by(key, self.stream, memory_limit)
+        return self
+
+    @unwrap
+    @not_infinite
+    def group_by_aggregate(self, key: Callable[[T], U], combine, initial=NOTHING):
+        """
+        Returns a stream that groups elements together using the provided `key` function and folds each group
+        into a single value as it goes, rather than collecting each group into a list.
+
+        Only one running accumulator is held per distinct key, so this is the equivalent of
+        `group_by(key).map(lambda group: reduce(combine, group))` without ever materializing the groups.
+
+        `combine` may either be a function or the name of one of the following builtin aggregators.
+
+            - "count": The number of elements in the group.
+            - "sum": The sum of the elements in the group.
+            - "min": The smallest element in the group. Ties favor the first element seen.
+            - "max": The largest element in the group. Ties favor the first element seen.
+            - "mean": The arithmetic mean of the elements in the group.
+            - "first": The first element of the group.
+            - "last": The last element of the group.
+
+        The constructed tuple is the namedtuple, :class:`Stream.Aggregation`, which provides
+        the names `key` and `value`.
+
+        The ordering of the groups is non-deterministic.
+
+        :param key: A function such that `f(element) -> T` where `T` will be used to group elements together. `key`
+                    may be either asynchronous or synchronous.
+        :param combine: Either the name of a builtin aggregator or a function such that
+                        `f(accumulator, element) -> accumulator`. `combine` `must` be synchronous.
+        :param initial: An optional initial accumulator for every group. If not provided then the first
+                        element of each group is used as its initial accumulator. Each group starts from its own shallow
+                        copy (`copy.copy`) of `initial`, so a mutable accumulator, such as a list, is never shared
+                        between groups. `May not` be given alongside the name of a builtin aggregator.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> # Count people by how long their names are.
+        >>> names = ['Alice', 'Bob', 'Eve', 'Chris', 'Arjuna', 'Zack']
+        >>> got = await AsyncStream(names).group_by_aggregate(len, 'count').collect()
+        >>> sorted(got)
+        [Aggregation(key=3, value=2), Aggregation(key=4, value=1), Aggregation(key=5, value=2), Aggregation(key=6, value=1)]
+
+        :Example:
+        >>> # Sum the evens and the odds within [0, 10).
+        >>> got = await AsyncStream(range(10)).group_by_aggregate(lambda x: x % 2, lambda acc, x: acc + x).collect()
+        >>> sorted(got)
+        [Aggregation(key=0, value=20), Aggregation(key=1, value=25)]
+        """
+        if not is_valid(combine, initial) or iscoroutinefunction(combine):
+            raise ValueError("pstream.AsyncStream.group_by_aggregate aggregators must be either a synchronous function or one of {} "
+                             "without an initial accumulator. Received {}.".format(', '.join(sorted(AGGREGATORS)), repr(combine)))
+        self.stream = group_by_aggregate(key, self.stream, aggregator(combine, initial))
+        return self
+
+    @unwrap
+    def group_by_sorted(self, key: Callable[[T], U]):
+        """
+        Returns a stream that groups together adjacent elements that share the same `key`. This is the
+        equivalent of :meth:`AsyncStream.group_by` over a stream that is already sorted by `key`.
+
+        Unlike :meth:`AsyncStream.group_by`, each group is yielded as soon as the key changes, so this functor
+        only ever holds a single group in memory, never requires that keys be hashable, and may be used on
+        infinite streams. Groups are yielded in the order in which they occur.
+
+        Elements that share a key but are not adjacent to one another are yielded in separate groups.
+
+        :param key: A function such that `f(element) -> T` where `T` will be used to group elements together. `key`
+                    may be either asynchronous or synchronous.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> # Group people by how long their names are.
+        >>> names = ['Bob', 'Eve', 'Zack', 'Alice', 'Chris', 'Arjuna']
+        >>> got = await AsyncStream(names).group_by_sorted(len).collect()
+        >>> assert got == [['Bob', 'Eve'], ['Zack'], ['Alice', 'Chris'], ['Arjuna']]
+        """
+        self.stream = group_by_sorted(key, self.stream)
         return self
 
     @unwrap
@@ -353,11 +692,25 @@ class AsyncStream(Generic[T]):
         return self
 
     @unwrap
-    def map(self, f: Callable[[T], U]):
+    def map(self, f: Callable[[T], U], concurrency: int = None, ordered: bool = True, executor=None, batch_size: int = 1):
         """
         Returns a stream that maps each value using `f`.
 
         :param f: A function such that `f(A) -> B`. `f` may be either asynchronous or synchronous.
+        :param concurrency: :class:`int`. If provided, and `f` is asynchronous, then up to `concurrency` calls to `f`
+                            are kept in flight at once. Alongside an `executor`, up to `concurrency` batches are kept
+                            in flight at once, which defaults to the number of CPUs. `Must` be greater than 0.
+        :param ordered: :class:`bool`. Only meaningful alongside `concurrency`. If `True` (the default) then the
+                        ordering of the stream is maintained. Otherwise, results are yielded as they complete.
+        :param executor: Either `'thread'`, `'process'`, or a :class:`concurrent.futures.Executor`. If provided, then
+                         the synchronous `f` is called within the executor rather than on the event loop, so that
+                         a CPU bound (or otherwise blocking) `f` does not hold up every other task on the loop.
+                         For `'thread'` and `'process'` a pool of `concurrency` workers is started along with the
+                         stream and is shut down along with it. Within a process pool, `f` and every element must
+                         be picklable.
+        :param batch_size: :class:`int`. Only meaningful alongside an `executor`. The number of elements handed to
+                           the executor at once, which amortizes the cost of shipping elements to a process pool.
+                           `Must` be greater than 0.
 
         :Returns: :class:`AsyncStream`
 
@@ -365,16 +718,52 @@ class AsyncStream(Generic[T]):
         >>> double = lambda x: x * 2
         >>> got = await AsyncStream(numbers).map(double).collect()
         >>> assert got == [2, 4, 6, 8, 10, 12, 14, 16, 18]
+
+        A `concurrency` turns a stream of, say, HTTP requests from one-at-a-time into N-at-a-time.
+
+        >>> async def fetch(url):
+        ...     await asyncio.sleep(1)
+        ...     return url
+        >>> # Takes roughly one second rather than three.
+        >>> got = await AsyncStream(['a', 'b', 'c']).map(fetch, concurrency=3).collect()
+        >>> assert got == ['a', 'b', 'c']
+
+        An `executor` keeps expensive synchronous work off of the event loop.
+
+        >>> import json
+        >>> got = await AsyncStream(['[1]', '[2, 3]']).map(json.loads, executor='thread').collect()
+        >>> assert got == [[1], [2, 3]]
         """
-        self.stream = map(f, self.stream)
+        if concurrency is not None and concurrency <= 0:
+            raise ValueError("pstream.AsyncStream.map concurrency must be greater than 0. Received {}.".format(concurrency))
+        if executor is not None:
+            if iscoroutinefunction(f):
+                raise TypeError('The function provided to AsyncStream.map may NOT be asynchronous when given an executor.')
+            if not isinstance(executor, Executor) and executor not in ('thread', 'process'):
+                raise ValueError("pstream.AsyncStream.map executors must be either 'thread', 'process', or an Executor. Received {}.".format(repr(executor)))
+            if batch_size <= 0:
+                raise ValueError("pstream.AsyncStream.map batch sizes must be greater than 0. Received {}.".format(batch_size))
+            if concurrency is None:
+                concurrency = cpu_count()
+            self.stream = executor_map(self.stream, f, executor, concurrency, ordered, batch_size)
+            return self
+        if concurrency is None:
+            self.stream = map(f, self.stream)
+            return self
+        self.stream = concurrent_map(f, self.stream, concurrency, ordered)
         return self
 
     @unwrap
-    def pool(self, size: int):
+    def pool(self, size: int, timeout: float = None):
         """
         Returns a stream that will collect up to `size` elements into a list before yielding.
 
+        If a `timeout` is provided then a partial list is also yielded once its oldest element has waited
+        for `timeout` seconds, so that a slowly trickling stream still makes steady progress. This bounds
+        the latency of each element while still batching together elements that arrive in quick succession.
+
         :param size: :class:`int`. `Must` be greater than 0.
+        :param timeout: :class:`float`. An optional number of seconds. `Must` be greater than 0.
 
         :Returns: :class:`AsyncStream`
 
@@ -391,10 +780,55 @@ class AsyncStream(Generic[T]):
         >>> assert two == [[1, 2], [3, 4], [5, 6], [7, 8]]
         >>> three = await AsyncStream(two).pool(2).collect()
         >>> assert three == [[[1, 2], [3, 4]], [[5, 6], [7, 8]]]
+
+        :Example:
+        >>> async def feed():
+        ...     for x in range(5):
+        ...         yield x
+        ...         await asyncio.sleep(0.4 if x == 1 else 0)
+        >>> got = await AsyncStream(feed()).pool(100, timeout=0.1).collect()
+        >>> assert got == [[0, 1], [2, 3, 4]]
         """
         if size <= 0:
             raise ValueError("pstream.AsyncStream.pool sizes must be greater than 0. Received {}.".format(size))
-        self.stream = pool(self.stream, size)
+        if timeout is not None and timeout <= 0:
+            raise ValueError("pstream.AsyncStream.pool timeouts must be greater than 0. Received {}.".format(timeout))
+        self.stream = pool(self.stream, size, timeout)
+        return self
+
+    @unwrap
+    def prefetch(self, n: int):
+        """
+        Returns a stream that draws from every preceding step in a separate task, which runs ahead of
+        the consumer by up to `n` elements.
+
+        Ordinarily, each step of a stream only does any work while the consumer is waiting on it,
+        so a slow source and a slow step further down the stream take turns. With a `prefetch` between them
+        they overlap instead, while the bounded buffer applies backpressure to the source should the
+        consumer fall behind.
+
+        An exception raised upstream is re-raised to the consumer once it reaches the failing element.
+        The task is cancelled if the consumer stops early. A synchronous stream gains nothing from being drawn
+        from a separate task and is left as-is.
+
+        :param n: :class:`int`. The number of elements to buffer. `Must` be greater than 0.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> async def fetch(url):
+        ...     await asyncio.sleep(0.5)
+        ...     return url
+        >>> async def store(page):
+        ...     await asyncio.sleep(0.5)
+        ...     return page
+        >>> # Takes roughly two seconds rather than three.
+        >>> got = await AsyncStream(['a', 'b', 'c']).map(fetch).prefetch(1).map(store).collect()
+        >>> assert got == ['a', 'b', 'c']
+        """
+        if n <= 0:
+            raise ValueError("pstream.AsyncStream.prefetch sizes must be greater than 0. Received {}.".format(n))
+        self.stream = prefetch(self.stream, n)
         return self
 
     @unwrap
@@ -435,13 +869,16 @@ class AsyncStream(Generic[T]):
 
     @unwrap
     @not_infinite
-    def sort(self):
+    def sort(self, memory_limit: int = None, lazy: bool = False):
         """
         Returns a stream whose elements are sorted.
 
         Note that calling `sort` itself remains lazy, however at time of collecting the stream a sort
         will incur an internal collection at that particular step.
 
+        :param memory_limit: :class:`int`. See :meth:`AsyncStream.sort_with`.
+        :param lazy: :class:`bool`. See :meth:`AsyncStream.sort_with`.
+
         :Returns: :class:`AsyncStream`
 
         :Example:
@@ -449,21 +886,37 @@ class AsyncStream(Generic[T]):
         >>> got = await AsyncStream(arr).sort().collect()
         >>> assert got == [4, 7, 7, 12, 23, 34, 45, 63, 233, 345, 456, 567, 4567, 5678, 344523]
         """
-        self.stream = sort(self.stream)
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError("pstream.AsyncStream.sort memory limits must be greater than 0. Received {}.".format(memory_limit))
+        if memory_limit is not None and lazy:
+            raise ValueError("pstream.AsyncStream.sort lazy sorts may not have a memory limit. Received {}.".format(memory_limit))
+        self.stream = sort(self.stream, memory_limit, lazy)
         return self
 
     @unwrap
     @not_infinite
-    def sort_with(self, key: Callable[[T], U]):
+    def sort_with(self, key: Callable[[T], U], memory_limit: int = None, lazy: bool = False):
         """
         Returns a stream whose elements are sorted using the provided key selection function.
 
         Note that calling `sort_with` itself remains lazy, however at time of collecting the stream a sort
         will incur an internal collection at that particular step.
 
+        If a `memory_limit` is provided then no more than `memory_limit` elements are held in memory at once.
+        Instead, sorted runs of `memory_limit` elements are spilled to temporary files and are lazily merged back
+        together as the stream is consumed. No more than 16 runs are merged at once (runs beyond that are first merged
+        into larger runs on disk), so the number of open files stays small. Since runs are pickled, every element must be picklable.
+
+        If `lazy` is `True` then, rather than sorting everything up front, the elements are heapified in O(n) time
+        and each element is only popped off of the heap as it is consumed, in O(log(n)) time. This is cheaper than a
+        full sort whenever only a prefix of the sorted stream is consumed, such as by a :meth:`AsyncStream.take`.
+
         :param key: A function such that `key(element) -> T` where `T` is the type used for comparison. `key` MAY NOT
         be asynchronous! This is due to a limitation in the builtin `sorted` function which does not support
         asynchronous key functions.
+        :param memory_limit: :class:`int`. An optional maximum number of elements to hold in memory while sorting.
+                             `Must` be greater than 0.
+        :param lazy: :class:`bool`. Whether to heap sort lazily. `May not` be combined with a `memory_limit`.
 
         :Returns: :class:`AsyncStream`
 
@@ -472,7 +925,11 @@ class AsyncStream(Generic[T]):
         >>> got = await AsyncStream(arr).sort_with(len).collect()
         >>> assert got == ['7', '4', '7', '12', '34', '23', '63', '45', '233', '567', '456', '345', '4567', '5678', '344523']
         """
-        self.stream = sort_with(key, self.stream)
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError("pstream.AsyncStream.sort_with memory limits must be greater than 0. Received {}.".format(memory_limit))
+        if memory_limit is not None and lazy:
+            raise ValueError("pstream.AsyncStream.sort_with lazy sorts may not have a memory limit. Received {}.".format(memory_limit))
+        self.stream = sort_with(key, self.stream, memory_limit, lazy)
         return self
 
     @unwrap
@@ -612,6 +1069,115 @@ class AsyncStream(Generic[T]):
         self.stream = reverse(self.stream)
         return self
 
+    @not_infinite
+    def sample(self, n: int, seed=None):
+        """
+        Returns a stream of `n` elements chosen uniformly at random from this stream, in no particular order.
+        If the stream has no more than `n` elements, then every element is yielded.
+
+        Only `n` elements are held in memory at once. Rather than drawing a random number for every element, the
+        number of elements to skip over before the next one is chosen is drawn directly. A stream built directly
+        from a `Sequence` (such as a list or a range) is sampled by index.
+
+        :param n: :class:`int`. The size of the sample. `Must` be greater than or equal to 0.
+        :param seed: An optional seed for the random number generator, for repeatable samples.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> got = await AsyncStream(range(1000000)).sample(5).collect()
+        >>> assert len(got) == 5
+        """
+        if n < 0:
+            raise ValueError("pstream.AsyncStream.sample sizes must be greater than or equal to 0. Received {}.".format(n))
+        # Rather than @unwrap, so as to see whether this stream is still an untouched Sequence.
+        if isinstance(self.stream, SequenceAdaptor) and self.stream.source is not None:
+            self.stream = AsyncAdaptor.new(reservoir(self.stream.source, n, seed))
+        elif isinstance(self.stream, AsyncAdaptor):
+            self.stream = AsyncAdaptor.new(sample(self.stream.stream, n, seed))
+        else:
+            self.stream = AsyncAdaptor.new(sample(self.stream, n, seed))
+        return self
+
+    def sample_fraction(self, p: float, seed=None):
+        """
+        Returns a stream that yields each element of this stream independently with probability `p`.
+        Ordering of elements in the stream is maintained.
+
+        This is equivalent to `filter(lambda _: random.random() < p)`, except that rather than drawing a random
+        number for every element, the gap between chosen elements is drawn directly. A stream built directly from a
+        `Sequence` (such as a list or a range) is sampled by index, so skipped elements are never touched at all.
+
+        :param p: :class:`float`. The probability of yielding each element. `Must` be within [0, 1].
+        :param seed: An optional seed for the random number generator, for repeatable samples.
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> got = await AsyncStream(range(100000)).sample_fraction(0.01).collect()
+        >>> assert 800 < len(got) < 1200
+        """
+        if not 0 <= p <= 1:
+            raise ValueError("pstream.AsyncStream.sample_fraction probabilities must be within [0, 1]. Received {}.".format(p))
+        # Rather than @unwrap, so as to see whether this stream is still an untouched Sequence.
+        if isinstance(self.stream, SequenceAdaptor) and self.stream.source is not None:
+            self.stream = AsyncAdaptor.new(bernoulli(self.stream.source, p, seed))
+        elif isinstance(self.stream, AsyncAdaptor):
+            self.stream = AsyncAdaptor.new(sample_fraction(self.stream.stream, p, seed))
+        else:
+            self.stream = AsyncAdaptor.new(sample_fraction(self.stream, p, seed))
+        return self
+
+    @unwrap
+    @not_infinite
+    def top_k(self, n: int, key: Callable[[T], U] = None):
+        """
+        Returns a stream of the `n` largest elements, from the largest to the smallest.
+
+        This is equivalent to `sort_with(key).reverse().take(n)` (except that equal elements retain their original
+        order) however no more than `2n` elements are ever held in memory at once.
+
+        :param n: :class:`int`. The number of elements to yield.
+        :param key: An optional function such that `key(element) -> T` where `T` is the type used for comparison.
+        `key` MAY NOT be asynchronous!
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        >>> got = await AsyncStream(arr).top_k(3).collect()
+        >>> assert got == [344523, 5678, 4567]
+        """
+        if iscoroutinefunction(key):
+            raise TypeError('The key function provided to AsyncStream.top_k may NOT be asynchronous.')
+        self.stream = top_k(self.stream, n, key)
+        return self
+
+    @unwrap
+    @not_infinite
+    def bottom_k(self, n: int, key: Callable[[T], U] = None):
+        """
+        Returns a stream of the `n` smallest elements, from the smallest to the largest.
+
+        This is equivalent to `sort_with(key).take(n)`, however no more than `2n` elements are ever held in memory
+        at once.
+
+        :param n: :class:`int`. The number of elements to yield.
+        :param key: An optional function such that `key(element) -> T` where `T` is the type used for comparison.
+        `key` MAY NOT be asynchronous!
+
+        :Returns: :class:`AsyncStream`
+
+        :Example:
+        >>> arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        >>> got = await AsyncStream(arr).bottom_k(3).collect()
+        >>> assert got == [4, 7, 7]
+        """
+        if iscoroutinefunction(key):
+            raise TypeError('The key function provided to AsyncStream.bottom_k may NOT be asynchronous.')
+        self.stream = bottom_k(self.stream, n, key)
+        return self
+
     @unwrap
     def take(self, n: int):
         """
@@ -19,12 +19,24 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import asyncio
+import heapq
 import itertools
+import math
+import random
 from collections.abc import Iterable, Iterator, AsyncIterable, AsyncIterator
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from inspect import iscoroutinefunction
 
 from .._sync.stream import Stream
+from .._sync.aggregate import NOTHING, Aggregation, aggregate
+from .._sync.parallel import apply_chunk
+from .._sync.plan import MAX_FUSION, Stage, fusion, heap_sort
+from .._sync.plan import FILTER, FILTER_FALSE, INSPECT, MAP, TAKE_WHILE
+from .._sync.plan import bottom_k as sorted_bottom_k, top_k as sorted_top_k
+from .._sync.sample import reservoir, bernoulli, gap, next_weight, skip_length
+from .._sync.spill import ExternalSorter, SpillingGrouper, external_sort
 
 Enumeration = Stream.Enumeration
 
@@ -66,6 +78,25 @@ async def a_count(stream):
         count += 1
     return count
 
+
+##############################
+# SKETCH
+##############################
+
+# Feeds every element to the `add` method of each of the given sketches (see pstream._sync.sketch).
+
+async def s_sketch(stream, *sketches):
+    for x in stream:
+        for sketch in sketches:
+            sketch.add(x)
+
+
+async def a_sketch(stream, *sketches):
+    async for x in stream:
+        for sketch in sketches:
+            sketch.add(x)
+
+
 ##############################
 # MAP
 ##############################
@@ -89,6 +120,121 @@ async def aa_map(f, stream):
         yield await f(x)
 
 
+##############################
+# CONCURRENT_MAP
+##############################
+
+
+def ss_concurrent_map(f, stream, concurrency, ordered):
+    # Synchronous functions run inline, so there is nothing to run concurrently.
+    return ss_map(f, stream)
+
+
+def sa_concurrent_map(f, stream, concurrency, ordered):
+    return sa_map(f, stream)
+
+
+async def as_concurrent_map(f, stream, concurrency, ordered):
+    async def pull():
+        try:
+            return next(stream)
+        except StopIteration:
+            raise StopAsyncIteration
+    async for x in concurrent_map_with(f, pull, concurrency, ordered):
+        yield x
+
+
+async def aa_concurrent_map(f, stream, concurrency, ordered):
+    async for x in concurrent_map_with(f, stream.__anext__, concurrency, ordered):
+        yield x
+
+
+async def concurrent_map_with(f, pull, concurrency, ordered):
+    """
+    Keeps up to `concurrency` invocations of `f` in flight at once.
+
+    In ordered mode the in flight tasks double as the reorder buffer, so a slow head of line
+    stalls the pulling of new elements rather than letting the buffer grow without bound.
+    """
+    pending = deque() if ordered else set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    x = await pull()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(f(x))
+                if ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+##############################
+# EXECUTOR_MAP
+##############################
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+async def s_executor_map(stream, f, executor, concurrency, ordered, batch_size):
+    batches = s_pool(stream, batch_size)
+
+    async def pull():
+        try:
+            return next(batches)
+        except StopIteration:
+            raise StopAsyncIteration
+    async for x in executor_map_with(f, pull, executor, concurrency, ordered):
+        yield x
+
+
+async def a_executor_map(stream, f, executor, concurrency, ordered, batch_size):
+    async for x in executor_map_with(f, a_pool(stream, batch_size).__anext__, executor, concurrency, ordered):
+        yield x
+
+
+async def executor_map_with(f, pull, executor, concurrency, ordered):
+    """
+    Maps the synchronous `f` over batches of elements within `executor`, keeping up to `concurrency`
+    batches in flight at once.
+
+    If `executor` is the name of a kind of executor then one with `concurrency` workers is started
+    on the first element and is shut down once the stream is exhausted or is abandoned early.
+    """
+    loop = asyncio.get_event_loop()
+    pool = EXECUTORS[executor](concurrency) if isinstance(executor, str) else executor
+
+    def submit(batch):
+        return loop.run_in_executor(pool, apply_chunk, f, batch)
+    try:
+        async for ok, values in concurrent_map_with(submit, pull, concurrency, ordered):
+            if not ok:
+                raise values
+            for x in values:
+                yield x
+    finally:
+        if pool is not executor:
+            pool.shutdown(wait=False)
+
+
 ##############################
 # FILTER
 ##############################
@@ -149,9 +295,58 @@ async def aa_filter_false(f, stream):
 # CHAIN
 ##############################
 
-async def chain(*streams):
-    async for x in flatten(streams):
-        yield x
+class Chain:
+    """
+    An asynchronous iterator over a flat list of streams, drawn from one after the other.
+
+    Chaining onto a Chain extends its list of streams rather than wrapping it in yet another
+    layer, so the cost of drawing an element does not grow with the number of calls to chain.
+    """
+
+    def __init__(self, streams):
+        self.streams = deque(streams)
+        self.stream = None
+        self.asynchronous = False
+
+    def extend(self, streams):
+        self.streams.extend(streams)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            if self.stream is None:
+                if len(self.streams) == 0:
+                    raise StopAsyncIteration
+                self.stream = coerce(self.streams.popleft())
+                self.asynchronous = is_async_stream(self.stream)
+            if self.asynchronous:
+                try:
+                    return await self.stream.__anext__()
+                except StopAsyncIteration:
+                    pass
+            else:
+                try:
+                    return next(self.stream)
+                except StopIteration:
+                    pass
+            self.stream = None
+
+    async def aclose(self):
+        streams = [self.stream] if self.stream is not None else []
+        streams.extend(self.streams)
+        self.stream = None
+        self.streams.clear()
+        for stream in streams:
+            await aclose(stream)
+
+
+def chain(stream, *streams):
+    if isinstance(stream, Chain):
+        return stream.extend(streams)
+    return Chain((stream,) + streams)
 
 
 ##############################
@@ -185,35 +380,123 @@ async def a_flatten(streams):
 # GROUP_BY
 ##############################
 
-def ss_group_by(f, stream):
-    groups = defaultdict(list)
+def ss_group_by(f, stream, memory_limit=None):
+    groups = SpillingGrouper(memory_limit)
     for x in stream:
-        groups[f(x)].append(x)
-    for group in groups.values():
+        groups.add(f(x), x)
+    for group in groups:
         yield group
 
 
-async def sa_group_by(f, stream):
-    groups = defaultdict(list)
+async def sa_group_by(f, stream, memory_limit=None):
+    groups = SpillingGrouper(memory_limit)
     async for x in stream:
-        groups[f(x)].append(x)
-    for group in groups.values():
+        groups.add(f(x), x)
+    for group in groups:
         yield group
 
 
-async def as_group_by(f, stream):
-    groups = defaultdict(list)
+async def as_group_by(f, stream, memory_limit=None):
+    groups = SpillingGrouper(memory_limit)
     for x in stream:
-        groups[await f(x)].append(x)
-    for group in groups.values():
+        groups.add(await f(x), x)
+    for group in groups:
         yield group
 
 
-async def aa_group_by(f, stream):
-    groups = defaultdict(list)
+async def aa_group_by(f, stream, memory_limit=None):
+    groups = SpillingGrouper(memory_limit)
     async for x in stream:
-        groups[await f(x)].append(x)
-    for group in groups.values():
+        groups.add(await f(x), x)
+    for group in groups:
+        yield group
+
+
+##############################
+# GROUP_BY_AGGREGATE
+##############################
+
+def ss_group_by_aggregate(f, stream, aggregator):
+    return aggregate(stream, f, aggregator)
+
+
+async def sa_group_by_aggregate(f, stream, aggregator):
+    seed, combine, finish = aggregator
+    accumulators = dict()
+    async for x in stream:
+        k = f(x)
+        accumulator = accumulators.get(k, NOTHING)
+        accumulators[k] = seed(x) if accumulator is NOTHING else combine(accumulator, x)
+    for k, accumulator in accumulators.items():
+        yield Aggregation(k, finish(accumulator))
+
+
+async def as_group_by_aggregate(f, stream, aggregator):
+    seed, combine, finish = aggregator
+    accumulators = dict()
+    for x in stream:
+        k = await f(x)
+        accumulator = accumulators.get(k, NOTHING)
+        accumulators[k] = seed(x) if accumulator is NOTHING else combine(accumulator, x)
+    for k, accumulator in accumulators.items():
+        yield Aggregation(k, finish(accumulator))
+
+
+async def aa_group_by_aggregate(f, stream, aggregator):
+    seed, combine, finish = aggregator
+    accumulators = dict()
+    async for x in stream:
+        k = await f(x)
+        accumulator = accumulators.get(k, NOTHING)
+        accumulators[k] = seed(x) if accumulator is NOTHING else combine(accumulator, x)
+    for k, accumulator in accumulators.items():
+        yield Aggregation(k, finish(accumulator))
+
+
+##############################
+# GROUP_BY_SORTED
+##############################
+
+def ss_group_by_sorted(f, stream):
+    return (list(group) for _, group in itertools.groupby(stream, f))
+
+
+async def sa_group_by_sorted(f, stream):
+    group, previous = [], NOTHING
+    async for x in stream:
+        k = f(x)
+        if group and k != previous:
+            yield group
+            group = []
+        group.append(x)
+        previous = k
+    if group:
+        yield group
+
+
+async def as_group_by_sorted(f, stream):
+    group, previous = [], NOTHING
+    for x in stream:
+        k = await f(x)
+        if group and k != previous:
+            yield group
+            group = []
+        group.append(x)
+        previous = k
+    if group:
+        yield group
+
+
+async def aa_group_by_sorted(f, stream):
+    group, previous = [], NOTHING
+    async for x in stream:
+        k = await f(x)
+        if group and k != previous:
+            yield group
+            group = []
+        group.append(x)
+        previous = k
+    if group:
         yield group
 
 
@@ -426,7 +709,8 @@ async def zip(*streams):
 ##############################
 
 
-def s_pool(stream, size):
+def s_pool(stream, size, timeout=None):
+    # Drawing from a synchronous stream blocks the event loop, so there is no waiting to time out.
     p = list()
     for x in stream:
         p.append(x)
@@ -437,7 +721,11 @@ def s_pool(stream, size):
         yield p
 
 
-async def a_pool(stream, size):
+async def a_pool(stream, size, timeout=None):
+    if timeout is not None:
+        async for p in a_pool_with_timeout(stream, size, timeout):
+            yield p
+        return
     p = list()
     async for x in stream:
         p.append(x)
@@ -448,34 +736,182 @@ async def a_pool(stream, size):
         yield p
 
 
+async def a_pool_with_timeout(stream, size, timeout):
+    """
+    Pools as does `a_pool`, but also yields a partial pool once its oldest element has waited for `timeout` seconds.
+
+    The pull of the next element is kept as a task that outlives any single wait on it. A timeout
+    therefore never cancels an in-flight `__anext__`, which would otherwise tear down the upstream.
+    """
+    loop = asyncio.get_event_loop()
+    p = list()
+    deadline = None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(stream.__anext__())
+            if len(p) != 0:
+                done, _ = await asyncio.wait([pending], timeout=max(deadline - loop.time(), 0))
+                if not done:
+                    yield p
+                    p = list()
+                    continue
+            else:
+                await asyncio.wait([pending])
+            x, pending = pending, None
+            try:
+                x = x.result()
+            except StopAsyncIteration:
+                break
+            if len(p) == 0:
+                deadline = loop.time() + timeout
+            p.append(x)
+            if len(p) == size:
+                yield p
+                p = list()
+        if len(p) != 0:
+            yield p
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
 ##############################
-# SORT
+# PREFETCH
 ##############################
 
-s_sort = sorted
+class Raised:
+    """
+    Carries an exception raised by a producer across a queue, to be re-raised by its consumer.
+    """
+
+    def __init__(self, error):
+        self.error = error
+
+
+EXHAUSTED = object()
+
+
+def s_prefetch(stream, n):
+    # Drawing from a synchronous stream blocks the event loop no matter which task does it,
+    # so there is nothing to overlap.
+    return stream
 
 
-async def a_sort(stream):
-    for x in sorted([x async for x in stream]):
+async def a_prefetch(stream, n):
+    queue = asyncio.Queue(maxsize=n)
+
+    async def produce():
+        try:
+            async for x in stream:
+                await queue.put(x)
+        except asyncio.CancelledError:
+            # Before Python 3.8 this is an Exception, and reporting it would block forever on a full queue.
+            raise
+        except Exception as error:
+            await queue.put(Raised(error))
+        else:
+            await queue.put(EXHAUSTED)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            x = await queue.get()
+            if x is EXHAUSTED:
+                return
+            if isinstance(x, Raised):
+                raise x.error
+            yield x
+    finally:
+        producer.cancel()
+
+
+##############################
+# TOP_K / BOTTOM_K
+##############################
+
+def s_top_k(stream, n, key):
+    for x in sorted_top_k(stream, key, n):
         yield x
 
 
+async def a_top_k(stream, n, key):
+    for x in await a_select_k(heapq.nlargest, stream, n, key):
+        yield x
+
+
+def s_bottom_k(stream, n, key):
+    for x in sorted_bottom_k(stream, key, n):
+        yield x
+
+
+async def a_bottom_k(stream, n, key):
+    for x in await a_select_k(heapq.nsmallest, stream, n, key):
+        yield x
+
+
+async def a_select_k(select, stream, n, key):
+    # The buffer is cut back down to the best n whenever it doubles in size, which
+    # keeps memory bounded while amortizing the cost of each selection. Both nlargest
+    # and nsmallest are stable, so survivors keep their place ahead of later arrivals.
+    if n <= 0:
+        return []
+    buffer = list()
+    async for x in stream:
+        buffer.append(x)
+        if len(buffer) >= 2 * n:
+            buffer = select(n, buffer, key=key)
+    return select(n, buffer, key=key)
+
+
+##############################
+# SORT
+##############################
+
+def s_sort(stream, memory_limit=None, lazy=False):
+    return ss_sort_with(None, stream, memory_limit, lazy)
+
+
+def a_sort(stream, memory_limit=None, lazy=False):
+    return sa_sort_with(None, stream, memory_limit, lazy)
+
+
 ##############################
 # SORT_WITH
 ##############################
 
 
-def ss_sort_with(f, stream):
+def ss_sort_with(f, stream, memory_limit=None, lazy=False):
+    if lazy:
+        for x in heap_sort(stream, f):
+            yield x
+        return
+    if memory_limit is not None:
+        for x in external_sort(stream, f, memory_limit):
+            yield x
+        return
     for x in sorted([x for x in stream], key=f):
         yield x
 
 
-async def sa_sort_with(f, stream):
+async def sa_sort_with(f, stream, memory_limit=None, lazy=False):
+    if lazy:
+        for x in heap_sort([x async for x in stream], f):
+            yield x
+        return
+    if memory_limit is not None:
+        sorter = ExternalSorter(f, memory_limit)
+        async for x in stream:
+            sorter.add(x)
+        for x in sorter:
+            yield x
+        return
     for x in sorted([x async for x in stream], key=f):
         yield x
 
 
-def fail_sort_with(_, __):
+def fail_sort_with(*_):
     raise TypeError('The key function provided to AsyncStream.sort_with may NOT be asynchronous.')
 
 
@@ -494,6 +930,63 @@ async def a_reverse(stream):
         yield x
 
 
+##############################
+# SAMPLE
+##############################
+
+def s_sample(stream, n, seed):
+    return reservoir(stream, n, seed)
+
+
+async def a_sample(stream, n, seed):
+    if n == 0:
+        return
+    rng = random.Random(seed)
+    sample = list()
+    async for x in stream:
+        sample.append(x)
+        if len(sample) == n:
+            break
+    if len(sample) == n:
+        w = next_weight(rng, 1.0, n)
+        skip = skip_length(rng, w)
+        async for x in stream:
+            if skip:
+                skip -= 1
+                continue
+            sample[rng.randrange(n)] = x
+            w = next_weight(rng, w, n)
+            skip = skip_length(rng, w)
+    for x in sample:
+        yield x
+
+
+##############################
+# SAMPLE_FRACTION
+##############################
+
+def s_sample_fraction(stream, p, seed):
+    return bernoulli(stream, p, seed)
+
+
+async def a_sample_fraction(stream, p, seed):
+    if p <= 0:
+        return
+    if p >= 1:
+        async for x in stream:
+            yield x
+        return
+    rng = random.Random(seed)
+    log_q = math.log(1 - p)
+    skip = gap(rng, log_q)
+    async for x in stream:
+        if skip:
+            skip -= 1
+            continue
+        yield x
+        skip = gap(rng, log_q)
+
+
 ##############################
 # DISTINCT
 ##############################
@@ -560,6 +1053,54 @@ async def aa_distinct_with(f, stream):
         yield x
 
 
+##############################
+# DISTINCT_WITH_SEEN
+##############################
+
+# `seen` is any object whose `add(key)` reports whether `key` had already been seen,
+# such as a BloomFilter or a RecentKeys.
+
+def ss_distinct_with_seen(f, stream, seen):
+    for x in stream:
+        if not seen.add(f(x)):
+            yield x
+
+
+async def sa_distinct_with_seen(f, stream, seen):
+    async for x in stream:
+        if not seen.add(f(x)):
+            yield x
+
+
+async def as_distinct_with_seen(f, stream, seen):
+    for x in stream:
+        if not seen.add(await f(x)):
+            yield x
+
+
+async def aa_distinct_with_seen(f, stream, seen):
+    async for x in stream:
+        if not seen.add(await f(x)):
+            yield x
+
+
+##############################
+# DISTINCT_SORTED
+##############################
+
+def s_distinct_sorted(stream):
+    return (x for x, _ in itertools.groupby(stream))
+
+
+async def a_distinct_sorted(stream):
+    previous = NOTHING
+    async for x in stream:
+        if previous is not NOTHING and x == previous:
+            continue
+        previous = x
+        yield x
+
+
 ##############################
 # REDUCE
 ##############################
@@ -639,6 +1180,16 @@ def is_async_stream(stream):
     return isinstance(stream, AsyncIterator) or isinstance(stream, AsyncIterable)
 
 
+async def aclose(stream):
+    """
+    Closes `stream`, such as an async generator or a generator, should it be closeable at all.
+    """
+    if hasattr(stream, 'aclose'):
+        await stream.aclose()
+    elif hasattr(stream, 'close'):
+        stream.close()
+
+
 def coerce(stream):
     if isinstance(stream, AsyncIterator):
         return stream
@@ -695,33 +1246,95 @@ def binary_function_stream_factory(ss, sa, _as, aa):
     return inner
 
 
+class Fused:
+    """
+    An asynchronous iterator that applies a run of synchronous, element-wise functions (maps, filters,
+    and so on) to an asynchronous stream within a single generated loop body.
+
+    The generator is only compiled once the first element is requested. Until then, further
+    element-wise functions are folded into a new Fused rather than wrapping this one.
+    """
+
+    def __init__(self, upstream, stages):
+        self.upstream = upstream
+        self.stages = stages
+        self.stream = None
+
+    @staticmethod
+    def then(op, f, stream):
+        if isinstance(stream, Fused) and stream.stream is None and len(stream.stages) < MAX_FUSION:
+            return Fused(stream.upstream, stream.stages + [Stage(op, f, ())])
+        return Fused(stream, [Stage(op, f, ())])
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if self.stream is None:
+            fused = fusion(tuple(stage.op for stage in self.stages), asynchronous=True)
+            self.stream = fused(self.upstream, *[stage.f for stage in self.stages])
+        return self.stream.__anext__()
+
+    async def aclose(self):
+        # Closing the fused generator does not close the stream that it draws from, so both are closed.
+        if self.stream is not None:
+            await self.stream.aclose()
+        await aclose(self.upstream)
+
+
+def fused_function_stream_factory(op, ss, sa, _as, aa):
+    """
+    Equivalent to `binary_function_stream_factory` except that a synchronous function over an
+    asynchronous stream is fused together with the synchronous functions that precede it.
+    """
+    unfused = binary_function_stream_factory(ss, sa, _as, aa)
+
+    def inner(f, stream):
+        if callable(f) and not iscoroutinefunction(f) and is_async_stream(stream):
+            return Fused.then(op, f, stream)
+        return unfused(f, stream)
+    return inner
+
+
 ##############################
 # FINAL_EXPORT_ALIASES
 ##############################
 
 
+bottom_k = unary_stream_factory(s_bottom_k, a_bottom_k)
 chain = chain
 collect = unary_stream_factory(s_collect, a_collect)
 count = unary_stream_factory(s_count, a_count)
 distinct = unary_stream_factory(s_distinct, a_distinct)
+distinct_sorted = unary_stream_factory(s_distinct_sorted, a_distinct_sorted)
 distinct_with = binary_function_stream_factory(ss_distinct_with, sa_distinct_with, as_distinct_with, aa_distinct_with)
+distinct_with_seen = binary_function_stream_factory(ss_distinct_with_seen, sa_distinct_with_seen, as_distinct_with_seen, aa_distinct_with_seen)
 enumerate = unary_stream_factory(s_enumerate, a_enumerate)
-filter = binary_function_stream_factory(ss_filter, sa_filter, as_filter, aa_filter)
-filter_false = binary_function_stream_factory(ss_filter_false, sa_filter_false, as_filter_false, aa_filter_false)
+executor_map = unary_stream_factory(s_executor_map, a_executor_map)
+filter = fused_function_stream_factory(FILTER, ss_filter, sa_filter, as_filter, aa_filter)
+filter_false = fused_function_stream_factory(FILTER_FALSE, ss_filter_false, sa_filter_false, as_filter_false, aa_filter_false)
 flatten = unary_stream_factory(s_flatten, a_flatten)
 for_each = binary_function_stream_factory(ss_for_each, sa_for_each, as_for_each, aa_for_each)
 group_by = binary_function_stream_factory(ss_group_by, sa_group_by, as_group_by, aa_group_by)
-inspect = binary_function_stream_factory(ss_inspect, sa_inspect, as_inspect, aa_inspect)
-map = binary_function_stream_factory(ss_map, sa_map, as_map, aa_map)
+group_by_aggregate = binary_function_stream_factory(ss_group_by_aggregate, sa_group_by_aggregate, as_group_by_aggregate, aa_group_by_aggregate)
+group_by_sorted = binary_function_stream_factory(ss_group_by_sorted, sa_group_by_sorted, as_group_by_sorted, aa_group_by_sorted)
+inspect = fused_function_stream_factory(INSPECT, ss_inspect, sa_inspect, as_inspect, aa_inspect)
+map = fused_function_stream_factory(MAP, ss_map, sa_map, as_map, aa_map)
+concurrent_map = binary_function_stream_factory(ss_concurrent_map, sa_concurrent_map, as_concurrent_map, aa_concurrent_map)
 pool = unary_stream_factory(s_pool, a_pool)
+prefetch = unary_stream_factory(s_prefetch, a_prefetch)
 reduce = binary_function_stream_factory(ss_reduce, sa_reduce, as_reduce, aa_reduce)
 repeat = repeat
 repeat_with = unary_function_factory(s_repeat_with, a_repeat_with)
 reverse = unary_stream_factory(s_reverse, a_reverse)
+sample = unary_stream_factory(s_sample, a_sample)
+sample_fraction = unary_stream_factory(s_sample_fraction, a_sample_fraction)
 skip_while = binary_function_stream_factory(ss_skip_while, sa_skip_while, as_skip_while, aa_skip_while)
 skip = unary_stream_factory(s_skip, a_skip)
+sketch = unary_stream_factory(s_sketch, a_sketch)
 sort = unary_stream_factory(s_sort, a_sort)
 sort_with = binary_function_stream_factory(ss_sort_with, sa_sort_with, fail_sort_with, fail_sort_with)
 step_by = unary_stream_factory(s_step_by, a_step_by)
-take_while = binary_function_stream_factory(ss_take_while, sa_take_while, as_take_while, aa_take_while)
+take_while = fused_function_stream_factory(TAKE_WHILE, ss_take_while, sa_take_while, as_take_while, aa_take_while)
 take = unary_stream_factory(s_take, a_take)
+top_k = unary_stream_factory(s_top_k, a_top_k)
@@ -19,6 +19,7 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import asyncio
 from inspect import iscoroutinefunction
 from collections.abc import AsyncIterator, AsyncIterable, Iterator, Iterable
 from functools import wraps
@@ -94,3 +95,94 @@ class AsyncAdaptor:
             return next(self.stream)
         except StopIteration:
             raise StopAsyncIteration
+
+
+class SequenceAdaptor(AsyncAdaptor):
+    """
+    An AsyncAdaptor over a `Sequence` that keeps hold of the `Sequence` itself, so that operators which can
+    index into it directly may do so. The `source` is dropped as soon as any element is drawn from the adaptor.
+    """
+
+    def __init__(self, source):
+        super(SequenceAdaptor, self).__init__(source)
+        self.source = source
+
+    async def __anext__(self):
+        self.source = None
+        try:
+            return next(self.stream)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class BlockingAdaptor:
+    """
+    An asynchronous iterator over a synchronous iterator whose `next` may block, such as a file or a database cursor.
+
+    Elements are drawn off of the event loop, in batches of `batch_size`, by the loop's default executor.
+    While one batch is being handed out, the next is already being drawn.
+
+    Note that this deliberately does not extend AsyncAdaptor, as `unwrap` would otherwise hand the underlying
+    iterator straight back to the synchronous implementations of each step.
+    """
+
+    def __init__(self, stream, batch_size):
+        if isinstance(stream, Iterator):
+            self.stream = stream
+        elif isinstance(stream, Iterable):
+            self.stream = stream.__iter__()
+        else:
+            raise TypeError
+        self.batch_size = batch_size
+        self.batch = list()
+        self.index = 0
+        self.pending = None
+        self.exhausted = False
+        self.error = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.index == len(self.batch):
+            await self.refill()
+        if self.index == len(self.batch):
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            raise StopAsyncIteration
+        x = self.batch[self.index]
+        self.index += 1
+        return x
+
+    async def refill(self):
+        if self.pending is None:
+            if self.exhausted:
+                self.batch, self.index = list(), 0
+                return
+            self.pending = self.fetch()
+        pending, self.pending = self.pending, None
+        self.batch, self.error = await pending
+        self.index = 0
+        if len(self.batch) < self.batch_size or self.error is not None:
+            self.exhausted = True
+        else:
+            self.pending = self.fetch()
+
+    def fetch(self):
+        return asyncio.get_event_loop().run_in_executor(None, draw, self.stream, self.batch_size)
+
+
+def draw(stream, size):
+    """
+    Returns up to `size` elements from `stream`, along with any exception that cut the batch short.
+    """
+    batch = list()
+    try:
+        for _ in range(size):
+            batch.append(next(stream))
+    except StopIteration:
+        pass
+    except Exception as error:
+        return batch, error
+    return batch, None
@@ -0,0 +1,95 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+
+import copy
+
+from collections import namedtuple
+
+# An Aggregator keeps a single running accumulator per group.
+#
+#   seed(element) -> accumulator          called with the first element of a group
+#   combine(accumulator, element) -> accumulator
+#   finish(accumulator) -> value          called once per group after the stream is exhausted
+Aggregator = namedtuple('Aggregator', ['seed', 'combine', 'finish'])
+
+Aggregation = namedtuple('Aggregation', ['key', 'value'])
+
+NOTHING = object()
+
+
+def identity(x):
+    return x
+
+
+def seed_mean(x):
+    return [x, 1]
+
+
+def combine_mean(accumulator, x):
+    accumulator[0] += x
+    accumulator[1] += 1
+    return accumulator
+
+
+AGGREGATORS = {
+    'count': Aggregator(lambda x: 1, lambda accumulator, x: accumulator + 1, identity),
+    'sum': Aggregator(identity, lambda accumulator, x: accumulator + x, identity),
+    'min': Aggregator(identity, lambda accumulator, x: x if x < accumulator else accumulator, identity),
+    'max': Aggregator(identity, lambda accumulator, x: x if x > accumulator else accumulator, identity),
+    'mean': Aggregator(seed_mean, combine_mean, lambda accumulator: accumulator[0] / accumulator[1]),
+    'first': Aggregator(identity, lambda accumulator, x: accumulator, identity),
+    'last': Aggregator(identity, lambda accumulator, x: x, identity),
+}
+
+
+def aggregator(combine, initial):
+    """
+    Returns the :class:`Aggregator` described by either the name of a builtin aggregator
+    or by a user provided `combine(accumulator, element)` function and an optional `initial` accumulator.
+
+    Every group is seeded with its own shallow copy of `initial`, so that a mutable accumulator
+    (such as a list that `combine` appends to) is never shared between groups.
+    """
+    if not callable(combine):
+        return AGGREGATORS[combine]
+    if initial is NOTHING:
+        return Aggregator(identity, combine, identity)
+    return Aggregator(lambda x: combine(copy.copy(initial), x), combine, identity)
+
+
+def is_valid(combine, initial):
+    if callable(combine):
+        return True
+    return combine in AGGREGATORS and initial is NOTHING
+
+
+def aggregate(stream, key, aggregator):
+    seed, combine, finish = aggregator
+    accumulators = dict()
+    for x in stream:
+        k = key(x)
+        accumulator = accumulators.get(k, NOTHING)
+        accumulators[k] = seed(x) if accumulator is NOTHING else combine(accumulator, x)
+    return (Aggregation(k, finish(accumulator)) for k, accumulator in accumulators.items())
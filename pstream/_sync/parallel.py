@@ -0,0 +1,168 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import functools
+import itertools
+import sys
+import threading
+
+from queue import Empty, Queue
+
+# Python 2's pools have no error callbacks, so a task that fails within the pool itself must be polled for.
+POLLED = sys.version_info.major < 3
+
+
+def apply_chunk(f, chunk):
+    # Runs inside of the worker, so failures are shipped back as values rather than
+    # relying on the pool's error callbacks (which Python 2 does not have).
+    try:
+        return True, [f(x) for x in chunk]
+    except Exception as e:
+        return False, e
+
+
+def notify(completed, index, _):
+    completed.put(index)
+
+
+def next_completed(completed, pending):
+    """
+    Returns the index of a task within `pending` that has finished.
+
+    A task that fails within the pool itself (such as when `f`, or its result, cannot be pickled) announces
+    itself through its error callback. Python 2 has no such callback, so there, should nothing arrive for a
+    while, the outstanding tasks are checked for such a failure.
+    """
+    if not POLLED:
+        return completed.get()
+    while True:
+        try:
+            return completed.get(timeout=0.1)
+        except Empty:
+            for index, task in pending.items():
+                if task.ready() and not task.successful():
+                    return index
+
+
+def chunks(stream, size):
+    stream = iter(stream)
+    while True:
+        chunk = list(itertools.islice(stream, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_map(pool_type, f, stream, workers, chunksize, ordered):
+    """
+    Lazily maps `f` over `stream` using a `multiprocessing` style pool of `workers`.
+
+    Elements are shipped to the pool in chunks of `chunksize`. At most two chunks per worker are
+    ever outstanding (either in flight or waiting in the reorder buffer), so the upstream iterator
+    is only ever read ahead by a bounded amount. The pool is not started until the first element
+    is requested and is torn down as soon as the generator is exhausted or closed.
+    """
+    window = 2 * workers
+    chunked = chunks(stream, chunksize)
+    completed = Queue()
+    pending = dict()
+    submitted = 0
+    exhausted = False
+    pool = pool_type(workers)
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                chunk = next(chunked, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                # In order, tasks are simply waited on one after the other. Out of order, they announce themselves.
+                callbacks = dict()
+                if not ordered:
+                    callbacks['callback'] = functools.partial(notify, completed, submitted)
+                    if not POLLED:
+                        callbacks['error_callback'] = callbacks['callback']
+                pending[submitted] = pool.apply_async(apply_chunk, (f, chunk), **callbacks)
+                submitted += 1
+            if not pending:
+                return
+            if ordered:
+                index = min(pending)
+            else:
+                index = next_completed(completed, pending)
+            # Raises should the task have failed within the pool itself.
+            ok, values = pending.pop(index).get()
+            if not ok:
+                raise values
+            for x in values:
+                yield x
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+EXHAUSTED = object()
+
+
+def prefetch(stream, n):
+    """
+    Lazily drains `stream` from a daemon thread into a buffer of at most `n` elements.
+
+    The thread is not started until the first element is requested. An exception raised by `stream`
+    is shipped across the buffer and raised again once the consumer reaches it. Should the consumer stop
+    early, the buffer is emptied so that the thread can put whatever it is holding and notice that it
+    is no longer wanted, after pulling at most one more element from `stream`.
+    """
+    buffer = Queue(maxsize=n)
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for x in stream:
+                buffer.put((True, x))
+                if stopped.is_set():
+                    return
+        except Exception as e:
+            buffer.put((False, e))
+        else:
+            buffer.put((True, EXHAUSTED))
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            ok, x = buffer.get()
+            if not ok:
+                raise x
+            if x is EXHAUSTED:
+                return
+            yield x
+    finally:
+        stopped.set()
+        try:
+            while True:
+                buffer.get_nowait()
+        except Empty:
+            pass
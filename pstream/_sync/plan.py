@@ -0,0 +1,403 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import array
+import heapq
+import itertools
+
+from builtins import map
+from builtins import filter
+from builtins import range
+
+from collections import namedtuple, deque
+
+try:
+    # Py3
+    from collections.abc import Sequence, Sized
+except ImportError:  # pragma: no cover
+    # Py2
+    from collections import Sequence, Sized
+
+
+##############################
+# How to read this file.
+##############################
+#
+# A Stream does not nest its iterators as each method is called. Instead, it records
+# each step as a `Stage` in a plan and only compiles that plan into an actual iterator
+# once something begins to consume the stream.
+#
+# Element-wise stages (map, filter, filter_false, inspect, take_while) carry nothing but
+# the user's function. Adjacent runs of them are compiled into a single generated loop,
+# so that a pipeline of ten such stages costs one generator resumption per element
+# rather than ten.
+#
+# Every other stage carries a builder, `f(stream, *args) -> iterator`, which is simply
+# called with the upstream iterator at compile time.
+#
+# Before compiling, the plan is handed to `optimize` which applies a handful of
+# peephole rewrites to adjacent pairs of stages (see `rewrite`).
+#
+# When a Stream is built from a Sequence (a list, a range, and so on) it holds on to
+# that Sequence as its `source`. If the first stage of the plan is INDEXABLE then its
+# builder is handed the Sequence itself, rather than an iterator over it, so that it
+# may index into it directly. Before that, if the Sequence is a builtin that indexes in O(1),
+# any leading stages that only select elements by their position (skip, take, step_by,
+# reverse) are applied to the Sequence's indices rather than to its elements (see `push_down`).
+#
+# A Stream built from a Sized iterable also remembers that iterable, so that its length may be
+# taken when the stream is counted. As long as every stage
+# in the plan has an entry in LENGTHS, the length of the compiled stream is known before
+# a single element is drawn (see `length`).
+
+Stage = namedtuple('Stage', ['op', 'f', 'args'])
+
+MAP = 'map'
+FILTER = 'filter'
+FILTER_FALSE = 'filter_false'
+INSPECT = 'inspect'
+TAKE_WHILE = 'take_while'
+
+ELEMENTWISE = frozenset([MAP, FILTER, FILTER_FALSE, INSPECT, TAKE_WHILE])
+
+BOTTOM_K = 'bottom_k'
+CHAIN = 'chain'
+ENUMERATE = 'enumerate'
+PAR_MAP = 'par_map'
+POOL = 'pool'
+PREFETCH = 'prefetch'
+REVERSE = 'reverse'
+SAMPLE = 'sample'
+SAMPLE_FRACTION = 'sample_fraction'
+SKIP = 'skip'
+SORT = 'sort'
+SORT_DESCENDING = 'sort_descending'
+STEP_BY = 'step_by'
+TAIL = 'tail'
+TAKE = 'take'
+THREAD_MAP = 'thread_map'
+TOP_K = 'top_k'
+ZIP = 'zip'
+
+# Stages whose builders accept a Sequence in place of an iterator.
+INDEXABLE = frozenset([SAMPLE, SAMPLE_FRACTION])
+
+# Stages which never call a user provided function, so their output may be counted without being produced.
+STRUCTURAL = frozenset([CHAIN, ENUMERATE, POOL, PREFETCH, REVERSE, SAMPLE, SKIP, STEP_BY, TAIL, TAKE, ZIP])
+
+# Python < 3.7 refuses to compile functions with more than 255 arguments.
+MAX_FUSION = 64
+
+
+def compile(stream, stages, source=None):
+    if source is not None:
+        pushed, stages = push_down(source, stages)
+        if stages and stages[0].op in INDEXABLE:
+            stream = pushed
+        elif pushed is not source:
+            stream = iter(pushed)
+    i = 0
+    while i < len(stages):
+        if stages[i].op not in ELEMENTWISE:
+            stream = stages[i].f(stream, *stages[i].args)
+            i += 1
+            continue
+        j = i
+        while j < len(stages) and j - i < MAX_FUSION and stages[j].op in ELEMENTWISE:
+            j += 1
+        stream = fuse(stream, stages[i:j])
+        i = j
+    return stream
+
+
+def fuse(stream, stages):
+    if len(stages) == 1:
+        stage = stages[0]
+        if stage.op == MAP:
+            return map(stage.f, stream)
+        if stage.op == FILTER:
+            return filter(stage.f, stream)
+        if stage.op == TAKE_WHILE:
+            return itertools.takewhile(stage.f, stream)
+    fused = fusion(tuple(stage.op for stage in stages))
+    return fused(stream, *[stage.f for stage in stages])
+
+
+SNIPPETS = {
+    MAP: ['x = f{i}(x)'],
+    FILTER: ['if not f{i}(x):', '    continue'],
+    FILTER_FALSE: ['if f{i}(x):', '    continue'],
+    INSPECT: ['f{i}(x)'],
+    TAKE_WHILE: ['if not f{i}(x):', '    return'],
+}
+
+FUSIONS = dict()
+
+
+def fusion(ops, asynchronous=False):
+    """
+    Returns a generator function, `fused(stream, f0, f1, ...)`, that applies the given
+    sequence of element-wise operations within a single loop body.
+
+    If `asynchronous` is `True` then an asynchronous generator function, iterating over an
+    asynchronous stream, is returned instead. The operations themselves must be synchronous.
+
+    Generated functions are cached by their sequence of operations, so a given shape of
+    pipeline is only ever compiled once per process.
+    """
+    if (ops, asynchronous) in FUSIONS:
+        return FUSIONS[(ops, asynchronous)]
+    prefix = 'async ' if asynchronous else ''
+    functions = ', '.join('f{}'.format(i) for i in range(len(ops)))
+    lines = ['{}def fused(stream, {}):'.format(prefix, functions), '    {}for x in stream:'.format(prefix)]
+    for i, op in enumerate(ops):
+        lines.extend('        ' + snippet.format(i=i) for snippet in SNIPPETS[op])
+    lines.append('        yield x')
+    namespace = dict()
+    exec('\n'.join(lines), namespace)
+    FUSIONS[(ops, asynchronous)] = namespace['fused']
+    return FUSIONS[(ops, asynchronous)]
+
+
+##############################
+# PUSH_DOWN
+##############################
+
+
+# Applies a positional stage to a range of indices into the source. Every one of these is O(1).
+SLICES = {
+    SKIP: lambda indices, n: indices[max(n, 0):],
+    TAKE: lambda indices, n: indices[:max(n, 0)],
+    STEP_BY: lambda indices, step: indices[::step],
+    REVERSE: lambda indices: indices[::-1],
+    TAIL: lambda indices, n: indices[::-1][:max(n, 0)],
+}
+
+# Builtin sequences whose slices are views, and so cost O(1) no matter how much they select.
+SLICEABLE = (range, memoryview)
+# Builtin sequences whose slices are flat copies made in C. Copying is only worthwhile for a small selection.
+COPYABLE = (list, tuple, str, bytes, bytearray, array.array)
+SMALL_SELECTION = 64
+# Only sequences that are known to index in O(1) are pushed down into. Others, such as a deque,
+# may take O(n) to index into the middle, and so are far cheaper to simply iterate over.
+RANDOM_ACCESS = SLICEABLE + COPYABLE
+
+
+def push_down(source, stages):
+    """
+    Returns the Sequence selected by the leading positional stages of the plan, along with
+    the remaining stages. If there are no such stages, or if `source` is not known to support
+    random access, then `source` itself is returned.
+    """
+    if not isinstance(source, RANDOM_ACCESS):
+        return source, stages
+    indices = range(len(source))
+    i = 0
+    while i < len(stages) and stages[i].op in SLICES:
+        if stages[i].op == STEP_BY and stages[i].args[0] < 1:
+            # Left to the stage itself to reject.
+            break
+        indices = SLICES[stages[i].op](indices, *stages[i].args)
+        i += 1
+    if i == 0:
+        return source, stages
+    return select(source, indices), stages[i:]
+
+
+def select(source, indices):
+    if isinstance(source, COPYABLE) and len(indices) > SMALL_SELECTION:
+        return SequenceView(source, indices)
+    if len(indices) == 0:
+        return source[0:0]
+    # A negative stop only arises when stepping backwards past index 0, which a slice spells as None.
+    stop = indices.stop if indices.stop >= 0 else None
+    return source[indices.start:stop:indices.step]
+
+
+class SequenceView(Sequence):
+    """
+    A read only view over the elements of `source` at the given `indices`.
+    """
+
+    def __init__(self, source, indices):
+        self.source = source
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SequenceView(self.source, self.indices[i])
+        return self.source[self.indices[i]]
+
+    def __iter__(self):
+        return map(self.source.__getitem__, self.indices)
+
+
+##############################
+# LENGTH
+##############################
+
+
+def length(stages, n):
+    """
+    Returns the number of elements that the given plan will yield when run over a source
+    of `n` elements, or `None` if that cannot be known without running it.
+    """
+    for stage in stages:
+        if n is None or stage.op not in LENGTHS:
+            return None
+        n = LENGTHS[stage.op](n, *stage.args)
+    return n
+
+
+def preserved(n, *_):
+    return n
+
+
+def at_most(n, k):
+    return max(min(n, k), 0)
+
+
+def sized(iterables):
+    return all(isinstance(iterable, Sized) for iterable in iterables)
+
+
+LENGTHS = {
+    MAP: preserved,
+    INSPECT: preserved,
+    ENUMERATE: preserved,
+    PAR_MAP: preserved,
+    PREFETCH: preserved,
+    THREAD_MAP: preserved,
+    REVERSE: preserved,
+    SORT: preserved,
+    SORT_DESCENDING: preserved,
+    TAKE: at_most,
+    TAIL: at_most,
+    SKIP: lambda n, k: max(n - max(k, 0), 0),
+    STEP_BY: lambda n, step: -(-n // step) if step >= 1 else None,
+    POOL: lambda n, size: -(-n // size),
+    SAMPLE: lambda n, k, seed: at_most(n, k),
+    TOP_K: lambda n, key, k: at_most(n, k),
+    BOTTOM_K: lambda n, key, k: at_most(n, k),
+    CHAIN: lambda n, *iterables: n + sum(len(iterable) for iterable in iterables) if sized(iterables) else None,
+    ZIP: lambda n, *iterables: min([n] + [len(iterable) for iterable in iterables]) if sized(iterables) else None,
+}
+
+
+##############################
+# OPTIMIZE
+##############################
+
+
+def optimize(stages):
+    """
+    Repeatedly applies `rewrite` to adjacent pairs of stages until no more rewrites apply.
+
+    Every rewrite either shortens the plan or moves a `take` or a `filter` strictly
+    towards the source, so this always terminates.
+    """
+    stages = list(stages)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(stages) - 1):
+            rewritten = rewrite(stages[i], stages[i + 1])
+            if rewritten is not None:
+                stages[i:i + 2] = rewritten
+                changed = True
+                break
+    return stages
+
+
+def rewrite(a, b):
+    """
+    Returns a list of stages equivalent to running stage `a` followed by stage `b`,
+    or `None` if there is nothing to gain.
+
+    The user's functions are only ever called on the same elements as they would have
+    been otherwise, although filters may run before (rather than after) a sort or a reversal.
+    """
+    if b.op in (FILTER, FILTER_FALSE) and a.op in (SORT, SORT_DESCENDING, REVERSE):
+        # Filter pushdown. Why sort or reverse elements that are about to be thrown away?
+        return [b, a]
+    if b.op == TAKE:
+        n = b.args[0]
+        if a.op in (MAP, INSPECT, ENUMERATE, PREFETCH):
+            # Take pushdown. One-to-one stages never change which elements survive a take.
+            # Nor should a prefetch read ahead past the elements that are ever going to be taken.
+            return [b, a]
+        if a.op == TAKE:
+            return [Stage(TAKE, a.f, (min(a.args[0], n),))]
+        if a.op == SORT:
+            # Bounded to n elements regardless of any memory limit (or laziness) of the sort.
+            return [Stage(BOTTOM_K, bottom_k, (a.args[0], n))]
+        if a.op in (BOTTOM_K, TOP_K):
+            return [Stage(a.op, a.f, (a.args[0], min(a.args[1], n)))]
+        if a.op == REVERSE:
+            return [Stage(TAIL, tail, (n,))]
+    if a.op == SORT and b.op == REVERSE and a.args[1] is None and not a.args[2]:
+        return [Stage(SORT_DESCENDING, sort_descending, a.args[:1])]
+    return None
+
+
+def bottom_k(stream, key, n):
+    # heapq.nsmallest is documented to be equivalent to sorted(stream, key=key)[:n],
+    # but only ever holds n elements at once.
+    return iter(heapq.nsmallest(n, stream, key=key))
+
+
+def top_k(stream, key, n):
+    # Likewise, equivalent to sorted(stream, key=key, reverse=True)[:n].
+    return iter(heapq.nlargest(n, stream, key=key))
+
+
+def heap_sort(stream, key):
+    """
+    Yields the elements of `stream` in sorted order, but only does O(log(n)) work per element actually consumed
+    after an O(n) heapify. Each element is decorated with its position, so the sort is stable and the
+    elements themselves are never compared to one another.
+    """
+    if key is None:
+        heap = [(x, i, x) for i, x in enumerate(stream)]
+    else:
+        heap = [(key(x), i, x) for i, x in enumerate(stream)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def tail(stream, n):
+    return reversed(deque(stream, maxlen=max(n, 0)))
+
+
+def sort_descending(stream, key):
+    # reversed(sorted(x)) is not the same as sorted(x, reverse=True) as the latter
+    # keeps equal elements in their original order. Reversing the input first makes the two agree.
+    elements = list(stream)
+    elements.reverse()
+    elements.sort(key=key, reverse=True)
+    return iter(elements)
@@ -0,0 +1,130 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import absolute_import
+from __future__ import division
+
+import itertools
+import math
+import random
+
+from builtins import range
+
+try:
+    # Py3
+    from collections.abc import Sequence
+except ImportError:  # pragma: no cover
+    # Py2
+    from collections import Sequence
+
+NOTHING = object()
+
+
+def uniform(rng):
+    """
+    Returns a random float within (0, 1), so that its logarithm is always finite and negative.
+    """
+    u = rng.random()
+    while u == 0.0:  # pragma: no cover
+        u = rng.random()
+    return u
+
+
+def skip_length(rng, w):
+    """
+    The number of elements that Algorithm L skips over before its next replacement.
+    """
+    return int(math.log(uniform(rng)) / math.log(1 - w))
+
+
+def next_weight(rng, w, n):
+    return w * math.exp(math.log(uniform(rng)) / n)
+
+
+def gap(rng, log_q):
+    """
+    The number of elements skipped over before the next success of a Bernoulli trial with
+    a probability of failure of exp(`log_q`). That is, a draw from the geometric distribution.
+    """
+    return int(math.log(uniform(rng)) / log_q)
+
+
+def reservoir(stream, n, seed):
+    """
+    Returns a uniformly random sample of `n` elements from `stream` (or every element, if there are no more than `n`).
+
+    A `Sequence` is sampled by index directly. Otherwise, this is Li's Algorithm L. Rather than drawing a random
+    number for every element, it draws the number of elements to skip before the next replacement, so that only
+    O(n * (1 + log(N / n))) elements are ever looked at. The skipped elements are consumed by `islice`, in C.
+    """
+    rng = random.Random(seed)
+    if isinstance(stream, Sequence):
+        if n >= len(stream):
+            return iter(list(stream))
+        return iter(rng.sample(stream, n))
+    sample = list(itertools.islice(stream, n))
+    if len(sample) < n or n == 0:
+        return iter(sample)
+    w = next_weight(rng, 1.0, n)
+    while True:
+        x = next(itertools.islice(stream, skip_length(rng, w), None), NOTHING)
+        if x is NOTHING:
+            return iter(sample)
+        sample[rng.randrange(n)] = x
+        w = next_weight(rng, w, n)
+
+
+def bernoulli(stream, p, seed):
+    """
+    Returns an iterator that yields each element of `stream` independently with probability `p`.
+
+    Rather than drawing a random number for every element, the gap between selected elements is drawn from the
+    geometric distribution, so only one random number is drawn per selected element. A `Sequence` is
+    indexed directly, and so the elements between selections are never touched at all.
+    """
+    rng = random.Random(seed)
+    if p >= 1:
+        return iter(stream)
+    if p <= 0:
+        return iter(())
+    if isinstance(stream, Sequence):
+        return bernoulli_sequence(stream, rng, math.log(1 - p))
+    return bernoulli_iterator(stream, rng, math.log(1 - p))
+
+
+def bernoulli_iterator(stream, rng, log_q):
+    while True:
+        x = next(itertools.islice(stream, gap(rng, log_q), None), NOTHING)
+        if x is NOTHING:
+            return
+        yield x
+
+
+def bernoulli_sequence(sequence, rng, log_q):
+    i = -1
+    length = len(sequence)
+    while True:
+        i += gap(rng, log_q) + 1
+        if i >= length:
+            return
+        yield sequence[i]
@@ -0,0 +1,487 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+
+import heapq
+import itertools
+import math
+import random
+
+from collections import namedtuple
+from operator import itemgetter
+
+from builtins import object
+from builtins import range
+
+# Mixed into the second hash of each element so that it is independent of the first.
+SALT = 0x9E3779B97F4A7C15
+
+
+class BloomFilter(object):
+    """
+    A fixed size set membership filter that may report false positives, but never false negatives.
+
+    The filter is sized such that, after `capacity` distinct elements have been added to it, the probability
+    that an element that was never added is reported as present is no more than `error_rate`. Adding more than
+    `capacity` elements is allowed, but the false positive rate climbs accordingly (see
+    :attr:`BloomFilter.false_positive_rate`).
+
+    Elements must be hashable. Positions are derived by double hashing, `hash(x) + i * hash((x, SALT))`, so
+    that only two hashes are computed per element regardless of the number of positions.
+
+    :param capacity: :class:`int`. The number of distinct elements that the filter is sized for. `Must` be greater than 0.
+    :param error_rate: :class:`float`. The desired false positive rate once `capacity` elements have been added.
+                       `Must` be within (0, 1).
+
+    :Example:
+    >>> bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    >>> bloom.add('Alice')
+    False
+    >>> bloom.add('Alice')
+    True
+    >>> 'Alice' in bloom
+    True
+    >>> bloom.error_rate
+    0.01
+    >>> bloom.size, bloom.hashes
+    (9586, 7)
+    """
+
+    def __init__(self, capacity, error_rate):
+        if capacity <= 0:
+            raise ValueError("pstream.BloomFilter capacities must be greater than 0. Received {}.".format(capacity))
+        if not 0 < error_rate < 1:
+            raise ValueError("pstream.BloomFilter error rates must be within (0, 1). Received {}.".format(error_rate))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # The optimal number of bits, m = -n * ln(p) / ln(2)^2, and of positions per element, k = (m / n) * ln(2).
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, element):
+        """
+        Adds `element` to the filter.
+
+        :Returns: :class:`bool`. Whether `element` was (probably) already present.
+        """
+        bits = self.bits
+        size = self.size
+        h1 = hash(element)
+        h2 = hash((element, SALT)) | 1
+        present = True
+        for i in range(self.hashes):
+            index = (h1 + i * h2) % size
+            mask = 1 << (index & 7)
+            if not bits[index >> 3] & mask:
+                bits[index >> 3] |= mask
+                present = False
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, element):
+        bits = self.bits
+        size = self.size
+        h1 = hash(element)
+        h2 = hash((element, SALT)) | 1
+        for i in range(self.hashes):
+            index = (h1 + i * h2) % size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        """
+        The number of elements that have been added to the filter, less those that were mistaken for duplicates.
+        """
+        return self.count
+
+    @property
+    def false_positive_rate(self):
+        """
+        The expected false positive rate given the number of elements that have been added so far.
+        This is at most :attr:`BloomFilter.error_rate` until more than :attr:`BloomFilter.capacity`
+        elements have been added.
+        """
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+MASK64 = (1 << 64) - 1
+
+
+def splitmix64(h):
+    """
+    Scrambles the bits of `h` such that every bit of the 64 bit result depends upon every bit of `h`. The builtin
+    `hash` is the identity function for small integers, which would otherwise leave HyperLogLog registers mostly empty.
+    """
+    z = (h + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+class HyperLogLog(object):
+    """
+    Estimates the number of distinct elements that have been added to it using 2 ** `precision` single byte
+    registers, so the default precision of 14 takes 16KB regardless of the number of elements. The standard error
+    of the estimate is roughly 1.04 / sqrt(2 ** `precision`), or 0.8% for the default precision.
+
+    Sketches of the same precision may be merged, so that the estimate of the merged sketch is that of the union of
+    everything added to either sketch. This allows shards of a dataset to be counted independently and combined.
+
+    Elements are hashed with the builtin `hash`, which randomizes the hashes of strings and bytes per interpreter.
+    Sketches that are built in separate interpreters (for example, by a `spawn`ed process pool) may only be merged
+    if `PYTHONHASHSEED` is fixed, or if a deterministic `hasher` is provided.
+
+    :param precision: :class:`int`. The base 2 logarithm of the number of registers. `Must` be within [4, 18].
+    :param hasher: An optional function such that `hasher(element) -> int`. Defaults to the builtin `hash`.
+
+    :Example:
+    >>> a = HyperLogLog(precision=12)
+    >>> b = HyperLogLog(precision=12)
+    >>> for x in range(0, 6000):
+    ...     a.add(x)
+    >>> for x in range(4000, 10000):
+    ...     b.add(x)
+    >>> 9700 < a.merge(b).estimate() < 10300
+    True
+    """
+
+    def __init__(self, precision=14, hasher=hash):
+        if not 4 <= precision <= 18:
+            raise ValueError("pstream.HyperLogLog precisions must be within [4, 18]. Received {}.".format(precision))
+        self.precision = precision
+        self.hasher = hasher
+        self.registers = bytearray(1 << precision)
+
+    def add(self, element):
+        z = splitmix64(self.hasher(element) & MASK64)
+        index = z >> (64 - self.precision)
+        # The rank is the position of the leftmost 1 bit within the remaining 64 - precision bits.
+        rank = 64 - self.precision - (z & ((1 << (64 - self.precision)) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, elements):
+        for x in elements:
+            self.add(x)
+        return self
+
+    def merge(self, other):
+        """
+        Merges the registers of `other` into this sketch.
+
+        :param other: :class:`HyperLogLog`. A sketch of the same precision.
+
+        :Returns: :class:`HyperLogLog`. This sketch.
+        """
+        if other.precision != self.precision:
+            raise ValueError("pstream.HyperLogLog can only merge sketches of the same precision. Received {} and {}.".format(
+                self.precision, other.precision))
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        """
+        :Returns: :class:`float`. The estimated number of distinct elements that have been added to this sketch.
+        """
+        m = len(self.registers)
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / math.fsum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is far more accurate for small cardinalities.
+            return m * math.log(m / zeros)
+        return estimate
+
+
+class KLL(object):
+    """
+    Estimates the quantiles of the elements that have been added to it while holding only O(k) of them in memory,
+    using the KLL sketch of Karnin, Lang and Liberty. Elements may be of any mutually comparable type.
+
+    Elements are kept in a hierarchy of compactors, where an element at height `h` stands in for 2 ** `h` of the
+    original elements. Whenever the sketch is full, a compactor sorts its elements and promotes every other one
+    (starting at a random offset) to the next height. The rank error of any estimate is roughly 1.7 / `k`, or
+    a little under 1% for the default `k` of 200. The smallest and largest elements are always exact.
+
+    Sketches may be merged, so that quantiles can be estimated over the union of several streams.
+
+    :param k: :class:`int`. Controls the size, and therefore the accuracy, of the sketch. `Must` be at least 8.
+
+    :Example:
+    >>> sketch = KLL().update(range(1, 100001))
+    >>> sketch.quantile(0)
+    1
+    >>> 49000 < sketch.quantile(0.5) < 51000
+    True
+    >>> sketch.quantile(1)
+    100000
+    """
+
+    # Each compactor is this fraction of the size of the one above it.
+    C = 2 / 3
+
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError("pstream.KLL sizes must be at least 8. Received {}.".format(k))
+        self.k = k
+        self.random = random.Random(seed)
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = self.capacity(0)
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.C ** depth)) + 1
+
+    def add(self, element):
+        if self.count == 0:
+            self.min = self.max = element
+        elif element < self.min:
+            self.min = element
+        elif element > self.max:
+            self.max = element
+        self.count += 1
+        self.compactors[0].append(element)
+        self.size += 1
+        if self.size >= self.max_size:
+            self.compress()
+
+    def update(self, elements):
+        for x in elements:
+            self.add(x)
+        return self
+
+    def compress(self):
+        for height in range(len(self.compactors)):
+            if len(self.compactors[height]) < self.capacity(height):
+                continue
+            if height + 1 == len(self.compactors):
+                self.compactors.append([])
+            compactor = self.compactors[height]
+            compactor.sort()
+            # An odd element out stays behind so that weight is never lost.
+            keep = [compactor.pop()] if len(compactor) % 2 else []
+            self.compactors[height + 1].extend(compactor[self.random.randint(0, 1)::2])
+            self.compactors[height] = keep
+            self.size = sum(len(c) for c in self.compactors)
+            self.max_size = sum(self.capacity(h) for h in range(len(self.compactors)))
+            if self.size < self.max_size:
+                break
+
+    def merge(self, other):
+        """
+        Merges the elements of `other` into this sketch.
+
+        :param other: :class:`KLL`.
+
+        :Returns: :class:`KLL`. This sketch.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = other.min if other.min < self.min else self.min
+            self.max = other.max if other.max > self.max else self.max
+        self.count += other.count
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, compactor in enumerate(other.compactors):
+            self.compactors[height].extend(compactor)
+        self.size = sum(len(c) for c in self.compactors)
+        self.max_size = sum(self.capacity(h) for h in range(len(self.compactors)))
+        while self.size >= self.max_size:
+            self.compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        :param qs: A list of quantiles, each within [0, 1].
+
+        :Returns: :class:`list`. The estimated element at each quantile, or `None` for each if the sketch is empty.
+        """
+        if self.count == 0:
+            return [None for _ in qs]
+        weighted = sorted((x, 1 << height) for height, compactor in enumerate(self.compactors) for x in compactor)
+        total = sum(weight for _, weight in weighted)
+        quantiles = list()
+        for q in qs:
+            if q <= 0:
+                quantiles.append(self.min)
+                continue
+            if q >= 1:
+                quantiles.append(self.max)
+                continue
+            rank = q * total
+            cumulative = 0
+            for x, weight in weighted:
+                cumulative += weight
+                if cumulative >= rank:
+                    quantiles.append(x)
+                    break
+        return quantiles
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+
+class Moments(object):
+    """
+    Computes the exact count, mean, variance, minimum and maximum of the numbers added to it in a single pass using
+    Welford's algorithm, which does not suffer the catastrophic cancellation of the naive sum of squares.
+
+    Moments may be merged using the parallel update of Chan et al.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if self.count == 1:
+            self.min = self.max = x
+        elif x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = other.min if other.min < self.min else self.min
+        self.max = other.max if other.max > self.max else self.max
+        return self
+
+    @property
+    def variance(self):
+        """
+        The sample variance, or `None` if fewer than two numbers have been added.
+        """
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+
+Description = namedtuple('Description', ['count', 'mean', 'variance', 'stdev', 'min', 'max', 'quantiles'])
+
+
+def describe(moments, sketch, qs):
+    if moments.count == 0:
+        return Description(0, None, None, None, None, None, dict((q, None) for q in qs))
+    variance = moments.variance
+    stdev = None if variance is None else math.sqrt(variance)
+    return Description(moments.count, moments.mean, variance, stdev, moments.min, moments.max,
+                       dict(zip(qs, sketch.quantiles(qs))))
+
+
+class SpaceSaving(object):
+    """
+    Tracks the most frequent elements that have been added to it using no more than `counters` counters, using the
+    Space-Saving algorithm of Metwally, Agrawal and El Abbadi. A `counters` of `None` counts every element exactly.
+
+    Once every counter is in use, a new element takes over the counter of the least frequent element, inheriting
+    its count. Counts are therefore overestimated by at most N / `counters`, where N is the number of elements
+    added, and every element that occurs more than N / `counters` times is guaranteed to be tracked.
+
+    The least frequent counter is found with a lazy min-heap. Counts only ever grow, so an entry in the heap is
+    only ever an underestimate. A stale entry at the top of the heap is simply pushed back with its current count.
+
+    :param counters: :class:`int`. The maximum number of distinct elements to track.
+
+    :Example:
+    >>> sketch = SpaceSaving(counters=3).update('abracadabra')
+    >>> # 'b' only occurs twice, but inherited a count when it took over a counter.
+    >>> sketch.most_common(2)
+    [('a', 5), ('b', 3)]
+    """
+
+    def __init__(self, counters=None):
+        self.counters = counters
+        self.counts = dict()
+        self.heap = list()
+        self.sequence = itertools.count()
+
+    def add(self, element):
+        counts = self.counts
+        if element in counts:
+            counts[element] += 1
+            return
+        if self.counters is None or len(counts) < self.counters:
+            counts[element] = 1
+            if self.counters is not None:
+                heapq.heappush(self.heap, (1, next(self.sequence), element))
+            return
+        while True:
+            count, _, evicted = heapq.heappop(self.heap)
+            if counts[evicted] == count:
+                break
+            heapq.heappush(self.heap, (counts[evicted], next(self.sequence), evicted))
+        del counts[evicted]
+        counts[element] = count + 1
+        heapq.heappush(self.heap, (count + 1, next(self.sequence), element))
+
+    def update(self, elements):
+        for x in elements:
+            self.add(x)
+        return self
+
+    def most_common(self, k):
+        """
+        :Returns: :class:`list`. Up to `k` `(element, count)` pairs, from the most frequent to the least.
+                  Elements with equal counts are ordered by when they were first tracked.
+        """
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
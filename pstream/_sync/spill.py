@@ -0,0 +1,245 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+
+import heapq
+import itertools
+import pickle
+import tempfile
+
+from builtins import object
+from builtins import range
+from builtins import enumerate
+
+from collections import defaultdict
+
+# The largest number of elements pickled together as a single record in a spill file.
+BATCH_SIZE = 1024
+# The largest number of sorted runs that an ExternalSorter merges together at once.
+FAN_IN = 16
+# The number of files that a SpillingGrouper hash-partitions its elements into.
+PARTITIONS = 16
+# The number of times that a SpillingGrouper will re-partition an oversized partition.
+MAX_DEPTH = 4
+
+
+def spill(elements, batch_size):
+    f = tempfile.TemporaryFile()
+    elements = iter(elements)
+    while True:
+        batch = list(itertools.islice(elements, batch_size))
+        if not batch:
+            break
+        pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def unspill(f):
+    try:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            for x in batch:
+                yield x
+    finally:
+        f.close()
+
+
+class ExternalSorter(object):
+    """
+    Sorts an arbitrary number of elements while holding no more than `memory_limit` of them in memory.
+
+    Elements are accumulated into runs of `memory_limit` elements. Each full run is sorted and spilled to
+    a temporary file as a sequence of pickled batches.
+
+    No more than `fan_in` runs are ever merged at once, reading each back one batch at a time, with batches
+    sized such that `fan_in` of them fit within the `memory_limit`. Runs are kept in levels: once a level
+    holds `fan_in` runs, they are merged into a single run on the next level up. This bounds the number of
+    open files to `fan_in` per level, while each element is only rewritten once per level. Iterating over
+    the sorter merges whatever runs remain in as many passes as it takes to get down to `fan_in` runs,
+    and then lazily merges those.
+
+    The sort is stable, and so it is equivalent to `sorted(elements, key=key)`.
+    """
+
+    def __init__(self, key, memory_limit):
+        self.key = key if key is not None else identity
+        self.memory_limit = memory_limit
+        self.fan_in = max(2, min(FAN_IN, memory_limit))
+        self.batch_size = max(1, min(BATCH_SIZE, memory_limit // self.fan_in))
+        self.buffer = list()
+        # levels[i] holds runs made by merging fan_in runs from levels[i - 1]. A run on a higher
+        # level therefore always holds elements that were added before those of any lower level.
+        self.levels = list()
+
+    @property
+    def runs(self):
+        # Every spilled run, from the one holding the earliest elements to the one holding the latest.
+        return [run for level in reversed(self.levels) for run in level]
+
+    def add(self, element):
+        self.buffer.append(element)
+        if len(self.buffer) >= self.memory_limit:
+            self.buffer.sort(key=self.key)
+            self.push(0, spill(self.buffer, self.batch_size))
+            self.buffer = list()
+
+    def push(self, level, run):
+        if level == len(self.levels):
+            self.levels.append(list())
+        self.levels[level].append(run)
+        if len(self.levels[level]) == self.fan_in:
+            runs = self.levels[level]
+            self.levels[level] = list()
+            self.push(level + 1, spill(merge(runs, self.key), self.batch_size))
+
+    def __iter__(self):
+        self.buffer.sort(key=self.key)
+        if not self.levels:
+            return iter(self.buffer)
+        runs = self.runs
+        if self.buffer:
+            runs.append(spill(self.buffer, self.batch_size))
+        self.levels = list()
+        self.buffer = list()
+        while len(runs) > self.fan_in:
+            # Only adjacent runs are merged together, so earlier elements remain in earlier runs.
+            runs = [spill(merge(runs[i:i + self.fan_in], self.key), self.batch_size) for i in range(0, len(runs), self.fan_in)]
+        return merge(runs, self.key)
+
+
+def merge(runs, key):
+    """
+    Lazily merges the given spilled runs, closing each of them once the merge is exhausted or abandoned.
+
+    Ties are broken first by the run (earlier runs hold earlier elements) and then by the
+    position within the run, so the elements themselves are never compared and the merge is stable.
+    """
+    try:
+        decorated = [decorate(unspill(run), i, key) for i, run in enumerate(runs)]
+        for _, _, _, x in heapq.merge(*decorated):
+            yield x
+    finally:
+        for run in runs:
+            run.close()
+
+
+class Partition(object):
+
+    def __init__(self, batch_size):
+        self.file = tempfile.TemporaryFile()
+        self.buffer = list()
+        self.batch_size = batch_size
+
+    def append(self, pair):
+        self.buffer.append(pair)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            pickle.dump(self.buffer, self.file, pickle.HIGHEST_PROTOCOL)
+            self.buffer = list()
+
+    def drain(self):
+        self.flush()
+        self.file.seek(0)
+        return unspill(self.file)
+
+    def close(self):
+        self.file.close()
+
+
+class SpillingGrouper(object):
+    """
+    Groups elements by key while holding no more than (roughly) `memory_limit` elements in memory.
+    A `memory_limit` of `None` groups everything in memory.
+
+    Elements are grouped in memory until the limit is exceeded. At that point every `(key, element)` pair
+    is instead hash-partitioned by its key into one of a fixed number of temporary files. Iterating over
+    the grouper then groups each partition in turn. A partition that is itself larger than the limit is
+    recursively re-partitioned with a different hash salt. The only exception is a single key with more
+    elements than the limit, which cannot be split any further.
+
+    Each group maintains the order in which its elements were added.
+    """
+
+    def __init__(self, memory_limit, depth=0):
+        self.memory_limit = memory_limit
+        self.depth = depth
+        self.groups = defaultdict(list)
+        self.size = 0
+        self.partitions = None
+
+    def add(self, key, element):
+        if self.partitions is not None:
+            self.partition(key, element)
+            return
+        self.groups[key].append(element)
+        self.size += 1
+        if self.memory_limit is not None and self.size > self.memory_limit and self.depth < MAX_DEPTH:
+            batch_size = max(1, self.memory_limit // PARTITIONS)
+            self.partitions = [Partition(batch_size) for _ in range(PARTITIONS)]
+            for k, group in self.groups.items():
+                for x in group:
+                    self.partition(k, x)
+            self.groups = None
+
+    def partition(self, key, element):
+        self.partitions[hash((self.depth, key)) % PARTITIONS].append((key, element))
+
+    def __iter__(self):
+        if self.partitions is None:
+            return iter(self.groups.values())
+        return self.drain()
+
+    def drain(self):
+        try:
+            for partition in self.partitions:
+                groups = SpillingGrouper(self.memory_limit, self.depth + 1)
+                for key, element in partition.drain():
+                    groups.add(key, element)
+                for group in groups:
+                    yield group
+        finally:
+            for partition in self.partitions:
+                partition.close()
+
+
+def decorate(run, i, key):
+    for j, x in enumerate(run):
+        yield key(x), i, j, x
+
+
+def identity(x):
+    return x
+
+
+def external_sort(stream, key, memory_limit):
+    sorter = ExternalSorter(key, memory_limit)
+    for x in stream:
+        sorter.add(x)
+    return iter(sorter)
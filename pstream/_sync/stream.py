@@ -24,25 +24,35 @@ from __future__ import absolute_import
 
 import functools
 import itertools
+import multiprocessing
 
 from builtins import object
-from builtins import map
-from builtins import filter
 from builtins import enumerate
 from builtins import zip
 from builtins import reversed
 from builtins import sorted
 
-from collections import namedtuple, defaultdict
+from multiprocessing.pool import ThreadPool
 
+from collections import namedtuple, defaultdict, Counter
+
+from pstream._sync.parallel import parallel_map, prefetch
+from pstream._sync.sample import reservoir, bernoulli
+from pstream._sync.aggregate import AGGREGATORS, Aggregation, NOTHING, aggregate, aggregator, identity, is_valid
+from pstream._sync.sketch import BloomFilter, Description, HyperLogLog, KLL, Moments, SpaceSaving, describe
+from pstream._sync.spill import external_sort, SpillingGrouper
+from pstream._sync.plan import Stage, compile, length, optimize, bottom_k, heap_sort, top_k
+from pstream._sync.plan import MAP, FILTER, FILTER_FALSE, INSPECT, TAKE_WHILE, BOTTOM_K, CHAIN, ENUMERATE, PAR_MAP, POOL, PREFETCH, REVERSE, SAMPLE, SAMPLE_FRACTION, SKIP, SORT, STEP_BY, TAKE, THREAD_MAP, TOP_K, ZIP
+from pstream._sync.plan import STRUCTURAL
 from pstream._sync.util import not_infinite
+from pstream._sync.window import RecentKeys
 
 try:
     # Py3
-    from collections.abc import Iterator, Iterable
+    from collections.abc import Iterator, Iterable, Sequence, Sized
 except ImportError:  # pragma: no cover
     # Py2
-    from collections import Iterator, Iterable
+    from collections import Iterator, Iterable, Sequence, Sized
 
 from pstream.errors import InfiniteCollectionError
 
@@ -58,13 +68,22 @@ class Stream(object):
         """
         if initial is None:
             initial = []
+        self._source = None
+        self._sized = None
         if isinstance(initial, Iterator):
             self._stream = initial
         elif isinstance(initial, Iterable):
-            self._stream = (x for x in initial)
+            # A plain iterator (rather than a generator) keeps the length hint of a list, tuple, etc.
+            self._stream = iter(initial)
+            if isinstance(initial, Sequence):
+                self._source = initial
+            if isinstance(initial, Sized):
+                # Its length is only taken once it is asked for, as the iterable may still grow until then.
+                self._sized = initial
         else:
             raise ValueError(
                 'pstream.Stream can only accept either an iterator or an iterable. Got {}'.format(type(initial)))
+        self._stages = list()
         self._infinite = False
 
     def chain(self, *iterables):
@@ -80,14 +99,23 @@ class Stream(object):
         >>> got = Stream([1, 2, 3]).chain([4, 5, 6], [7, 8, 9]).collect()
         >>> assert got == [1, 2, 3, 4, 5, 6, 7, 8, 9]
         """
-        self._stream = itertools.chain(self._stream, *iterables)
-        return self
+        if self._stages and self._stages[-1].op == CHAIN:
+            # Extend the existing chain rather than nesting another one inside of it, so that
+            # each element only ever passes through a single itertools.chain.
+            last = self._stages.pop()
+            return self._then(CHAIN, last.f, *(last.args + iterables))
+        return self._then(CHAIN, itertools.chain, *iterables)
 
     @not_infinite
     def count(self):
         """
         Evaluates the stream, consuming it and returning a count of the number of elements in the stream.
 
+        If the stream was built from a sized iterable (such as a list, a set, or a range) and none of its steps
+        call a user provided function (for example, :meth:`Stream.skip`, :meth:`Stream.take`,
+        :meth:`Stream.step_by`, :meth:`Stream.reverse`) then the count is computed without producing
+        a single element.
+
         :Returns: :class:`int`
 
         :Raises: :class:`errors.InfiniteCollectionError`
@@ -95,12 +123,176 @@ class Stream(object):
         :Example:
         >>> count = Stream(range(100)).filter(lambda x: x % 2 is 0).count()
         >>> assert count == 50
+
+        :Example:
+        >>> count = Stream(range(10 ** 12)).skip(10).step_by(2).count()
+        >>> assert count == 499999999995
         """
+        count = length(self._stages, len(self._sized) if self._sized is not None else None)
+        if count is not None and all(stage.op in STRUCTURAL for stage in self._stages):
+            self._stream = iter(())
+            self._stages = list()
+            self._source = None
+            self._sized = None
+            return count
         count = 0
-        for _ in self:
+        for _ in self._compile():
             count += 1
         return count
 
+    @not_infinite
+    def approx_count_distinct(self, precision=14):
+        """
+        Evaluates the stream, consuming it and returning an estimate of the number of distinct elements in the stream.
+        Distinction is computed by applying the builtin `hash` function to each element.
+
+        Rather than collecting every distinct element into a hashset (as `distinct().count()` would) the estimate is
+        computed with a :class:`pstream.HyperLogLog` sketch of 2 ** `precision` bytes. The standard error of the
+        estimate is roughly 1.04 / sqrt(2 ** `precision`), or 0.8% for the default precision of 14 (16KB).
+
+        In order to combine estimates from several streams (say, shards of a dataset counted in parallel) build a
+        :class:`pstream.HyperLogLog` for each stream with :meth:`Stream.for_each` and merge them.
+
+        :param precision: :class:`int`. The base 2 logarithm of the number of registers in the sketch.
+                          `Must` be within [4, 18].
+
+        :Returns: :class:`int`
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> count = Stream(range(100)).map(lambda x: x % 10).approx_count_distinct()
+        >>> assert count == 10
+
+        :Example:
+        >>> from pstream import HyperLogLog
+        >>> shards = [range(0, 6000), range(4000, 10000)]
+        >>> sketches = [HyperLogLog() for _ in shards]
+        >>> for shard, sketch in zip(shards, sketches):
+        ...     Stream(shard).for_each(sketch.add)
+        >>> estimate = sketches[0].merge(sketches[1]).estimate()
+        >>> assert 9700 < estimate < 10300
+        """
+        sketch = HyperLogLog(precision)
+        for x in self._compile():
+            sketch.add(x)
+        return int(round(sketch.estimate()))
+
+    @not_infinite
+    def quantiles(self, qs, k=200):
+        """
+        Evaluates the stream, consuming it and returning an estimate of the element at each of the given quantiles.
+
+        Rather than sorting the entire stream, the estimates are computed in a single pass with a :class:`pstream.KLL`
+        sketch which holds only O(`k`) elements in memory. The rank of each estimate is typically within
+        1.7 / `k` of the requested quantile (a little under 1% for the default `k` of 200). The quantiles 0 and 1
+        are always exactly the smallest and largest elements.
+
+        :param qs: A list of quantiles, each of which `must` be within [0, 1].
+        :param k: :class:`int`. Controls the size, and therefore the accuracy, of the sketch. `Must` be at least 8.
+
+        :Returns: :class:`list`. The estimated element at each quantile, in the order given. Every estimate is
+                  `None` if the stream is empty.
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> # The median and the 99th percentile.
+        >>> p50, p99 = Stream(range(1, 10001)).quantiles([0.5, 0.99])
+        >>> assert 4900 <= p50 <= 5100
+        >>> assert 9800 <= p99 <= 10000
+        """
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError("pstream.Stream.quantiles quantiles must be within [0, 1]. Received {}.".format(q))
+        sketch = KLL(k)
+        for x in self._compile():
+            sketch.add(x)
+        return sketch.quantiles(qs)
+
+    Description = Description
+
+    @not_infinite
+    def describe(self, qs=(0.25, 0.5, 0.75), k=200):
+        """
+        Evaluates the stream of numbers, consuming it and returning summary statistics in a single pass.
+
+        The count, mean, (sample) variance, standard deviation, minimum and maximum are exact, and are computed using
+        Welford's algorithm. The quantiles are estimated as in :meth:`Stream.quantiles`.
+
+        The constructed tuple is the namedtuple, :class:`Stream.Description`, which provides the names `count`,
+        `mean`, `variance`, `stdev`, `min`, `max`, and `quantiles`, a :class:`dict` of each quantile to its estimate.
+        Statistics which are undefined for the number of elements in the stream (such as the mean of an empty
+        stream, or the variance of a single number) are `None`.
+
+        :param qs: A list of quantiles, each of which `must` be within [0, 1].
+        :param k: :class:`int`. Controls the size, and therefore the accuracy, of the quantile sketch.
+                  `Must` be at least 8.
+
+        :Returns: :class:`Stream.Description`
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> latencies = [12, 15, 11, 90, 13, 14, 12, 16, 11, 13]
+        >>> description = Stream(latencies).describe(qs=[0.5, 1])
+        >>> description.count, round(description.mean, 3), description.min, description.max
+        (10, 20.7, 11, 90)
+        >>> round(description.stdev, 3)
+        24.404
+        >>> description.quantiles
+        {0.5: 13, 1: 90}
+        """
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError("pstream.Stream.describe quantiles must be within [0, 1]. Received {}.".format(q))
+        moments = Moments()
+        sketch = KLL(k)
+        for x in self._compile():
+            moments.add(x)
+            sketch.add(x)
+        return describe(moments, sketch, qs)
+
+    @not_infinite
+    def most_common(self, k, approximate=False, counters=None):
+        """
+        Evaluates the stream, consuming it and returning the `k` most frequent elements along with their counts,
+        from the most frequent to the least. Elements with equal counts are ordered by their first occurrence.
+
+        By default, every distinct element is counted exactly with a :class:`collections.Counter`.
+
+        If `approximate` is `True` then no more than `counters` distinct elements are tracked at once using the
+        Space-Saving algorithm (see :class:`pstream.SpaceSaving`). Memory is then fixed, however counts may be
+        overestimated by up to N / `counters` where N is the number of elements in the stream. Every element that
+        occurs more than N / `counters` times is guaranteed to be reported.
+
+        :param k: :class:`int`. The number of elements to return. `Must` be greater than 0.
+        :param approximate: :class:`bool`. Whether to track a fixed number of counters rather than every element.
+        :param counters: :class:`int`. The number of counters to track. Defaults to 10 * `k`. `Must` be at least `k`.
+                         Ignored unless `approximate` is `True`.
+
+        :Returns: :class:`list`. Up to `k` `(element, count)` tuples.
+
+        :Raises: :class:`errors.InfiniteCollectionError`
+
+        :Example:
+        >>> words = 'the quick brown fox jumps over the lazy dog the fox'.split()
+        >>> Stream(words).most_common(2)
+        [('the', 3), ('fox', 2)]
+
+        :Example:
+        >>> Stream(words).most_common(1, approximate=True, counters=4)
+        [('the', 3)]
+        """
+        if k <= 0:
+            raise ValueError("pstream.Stream.most_common k must be greater than 0. Received {}.".format(k))
+        if not approximate:
+            return Counter(self._compile()).most_common(k)
+        counters = 10 * k if counters is None else counters
+        if counters < k:
+            raise ValueError("pstream.Stream.most_common counters must be at least k ({}). Received {}.".format(k, counters))
+        return SpaceSaving(counters).update(self._compile()).most_common(k)
+
     @not_infinite
     def collect(self):
         """
@@ -115,9 +307,9 @@ class Stream(object):
         >>> got = stream.collect()
         >>> assert got == [2, 4, 6, 8]
         """
-        return [_ for _ in self]
+        return list(self._compile())
 
-    def distinct(self):
+    def distinct(self, approximate=False, capacity=1000000, error_rate=0.001):
         """
         Returns a stream of distinct elements. Distinction is computed by applying the builtin `hash` function
         to each element. Ordering of elements in the stream is maintained.
@@ -125,26 +317,42 @@ class Stream(object):
         This functor incurs an additional allocation in the form of a hashset in order to keep track of
         the elements in the stream.
 
+        If `approximate` is `True` then the hashset is replaced by a :class:`pstream.BloomFilter` of a fixed size that
+        is determined by the given `capacity` and `error_rate`. Memory no longer grows with the number of distinct
+        elements, however an element may be mistaken for a duplicate (and thus dropped) with a probability of
+        roughly `error_rate`, so long as no more than `capacity` distinct elements have been seen. An element that
+        is truly distinct from all of its predecessors is never yielded twice.
+
+        :param approximate: :class:`bool`. Whether to track elements in a fixed size Bloom filter rather than a hashset.
+        :param capacity: :class:`int`. The number of distinct elements that the Bloom filter is sized for.
+                         `Must` be greater than 0. Ignored unless `approximate` is `True`.
+        :param error_rate: :class:`float`. The acceptable probability of dropping a distinct element.
+                           `Must` be within (0, 1). Ignored unless `approximate` is `True`.
+
         :Returns: :class:`Stream`
 
         :Example:
         >>> numbers = [1, 2, 2, 3, 2, 1, 4, 5, 6, 1]
         >>> got = Stream(numbers).distinct().collect()
         >>> assert got == [1, 2, 3, 4, 5, 6]
+
+        :Example:
+        >>> got = Stream(numbers).distinct(approximate=True, capacity=100, error_rate=0.01).collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6]
         """
-        seen = set()
-        stream = self._stream
+        if approximate:
+            return self.distinct_with(identity, approximate, capacity, error_rate)
 
-        def inner():
+        def inner(stream):
+            seen = set()
             for x in stream:
                 if x in seen:
                     continue
                 seen.add(x)
                 yield x
-        self._stream = inner()
-        return self
+        return self._then('distinct', inner)
 
-    def distinct_with(self, key):
+    def distinct_with(self, key, approximate=False, capacity=1000000, error_rate=0.001):
         """
         Returns a stream of distinct elements. Distinction is computed by applying the builtin `hash` function
         to each item generated by the provided `key(element)`. Ordering of elements in the stream is maintained.
@@ -152,7 +360,15 @@ class Stream(object):
         This functor incurs an additional allocation in the form of a hashset in order to keep track of
         the elements in the stream.
 
+        If `approximate` is `True` then the hashset is replaced by a fixed size Bloom filter
+        (see :meth:`Stream.distinct`).
+
         :param key: A function such that `key(element) -> T` where `T` must be hashable.
+        :param approximate: :class:`bool`. Whether to track keys in a fixed size Bloom filter rather than a hashset.
+        :param capacity: :class:`int`. The number of distinct keys that the Bloom filter is sized for.
+                         `Must` be greater than 0. Ignored unless `approximate` is `True`.
+        :param error_rate: :class:`float`. The acceptable probability of dropping a distinct element.
+                           `Must` be within (0, 1). Ignored unless `approximate` is `True`.
 
         :Returns: :class:`Stream`
 
@@ -164,18 +380,91 @@ class Stream(object):
         >>> got = Stream(people).distinct_with(fingerprinter).collect()
         >>> assert got == ['Bob', 'Alice', 'Eve', 'Achmed']
         """
-        seen = set()
-        stream = self._stream
+        if approximate:
+            bloom = BloomFilter(capacity, error_rate)
 
-        def inner():
+            def approximately(stream):
+                for x in stream:
+                    if not bloom.add(key(x)):
+                        yield x
+            return self._then('distinct_with', approximately)
+
+        def inner(stream):
+            seen = set()
             for x in stream:
                 h = key(x)
                 if h in seen:
                     continue
                 seen.add(h)
                 yield x
-        self._stream = inner()
-        return self
+        return self._then('distinct_with', inner)
+
+    def distinct_within(self, window=None, ttl=None, key=None):
+        """
+        Returns a stream of elements that are distinct from those that came shortly before them. Distinction is
+        computed by applying the builtin `hash` function to each element, or to each item generated by
+        the provided `key(element)`. Ordering of elements in the stream is maintained.
+
+        Unlike :meth:`Stream.distinct`, only the keys of recently yielded elements are remembered. A key is forgotten
+        once `window` other distinct keys have been yielded after it, or once `ttl` seconds have passed since it
+        was yielded. Memory is therefore bounded, and this functor may be used on infinite streams. At least one
+        of `window` and `ttl` `must` be given. If both are given, then a key is forgotten as soon as either bound
+        is reached.
+
+        :param window: :class:`int`. The number of most recently yielded keys to remember. `Must` be greater than 0.
+        :param ttl: :class:`float`. The number of seconds for which to remember a yielded key. `Must` be greater than 0.
+        :param key: An optional function such that `key(element) -> T` where `T` must be hashable.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> # Drop redelivered messages, so long as they arrive within three messages of the original.
+        >>> messages = [1, 2, 1, 3, 2, 4, 5, 6, 1, 6]
+        >>> got = Stream(messages).distinct_within(window=3).collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6, 1]
+
+        :Example:
+        >>> got = Stream().repeat_with(lambda: 'ping').distinct_within(ttl=60).take(1).collect()
+        >>> assert got == ['ping']
+        """
+        if window is None and ttl is None:
+            raise ValueError("pstream.Stream.distinct_within requires either a window or a ttl.")
+        if window is not None and window <= 0:
+            raise ValueError("pstream.Stream.distinct_within windows must be greater than 0. Received {}.".format(window))
+        if ttl is not None and ttl <= 0:
+            raise ValueError("pstream.Stream.distinct_within ttls must be greater than 0. Received {}.".format(ttl))
+        key = identity if key is None else key
+
+        def inner(stream):
+            seen = RecentKeys(window, ttl)
+            for x in stream:
+                if not seen.add(key(x)):
+                    yield x
+        return self._then('distinct_within', inner)
+
+    def distinct_sorted(self):
+        """
+        Returns a stream of distinct elements from a stream that is already sorted (or, at least, a stream
+        in which equal elements are adjacent to one another). Distinction is computed by equality against
+        the previous element, so this functor holds only a single element in memory, never requires that
+        elements be hashable, and may be used on infinite streams.
+
+        Equal elements that are not adjacent to one another are not considered duplicates.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> numbers = [1, 1, 2, 3, 3, 3, 4, 5, 5, 6]
+        >>> got = Stream(numbers).distinct_sorted().collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6]
+
+        :Example:
+        >>> got = Stream([[1], [1], [2], [1]]).distinct_sorted().collect()
+        >>> assert got == [[1], [2], [1]]
+        """
+        def inner(stream):
+            return (x for x, _ in itertools.groupby(stream))
+        return self._then('distinct_sorted', inner)
 
     Enumeration = namedtuple('Enumeration', ['count', 'element'])
 
@@ -202,8 +491,7 @@ class Stream(object):
         3 4
         >>> assert got == [1, 2, 3, 4]
         """
-        self._stream = enumerate(self._stream)
-        return self.map(lambda enumeration: Stream.Enumeration(*enumeration))
+        return self._then(ENUMERATE, enumerate).map(lambda enumeration: Stream.Enumeration(*enumeration))
 
     def filter(self, predicate):
         """
@@ -220,8 +508,7 @@ class Stream(object):
         >>> got = Stream(numbers).filter(odds).collect()
         >>> assert got == [1, 3, 5, 7, 9]
         """
-        self._stream = filter(predicate, self._stream)
-        return self
+        return self._then(FILTER, predicate)
 
     def filter_false(self, predicate):
         """
@@ -238,7 +525,7 @@ class Stream(object):
         >>> got = Stream(numbers).filter_false(odds).collect()
         >>> assert got == [2, 4, 6, 8]
         """
-        return self.filter(lambda x: not predicate(x))
+        return self._then(FILTER_FALSE, predicate)
 
     def flatten(self):
         """
@@ -262,8 +549,9 @@ class Stream(object):
         >>> got = Stream(three_dimensional).flatten().flatten().collect()
         >>> assert got == [1, 2, 3, 4, 5, 6]
         """
-        self._stream = (x for stream in self._stream for x in stream)
-        return self
+        def inner(streams):
+            return (x for stream in streams for x in stream)
+        return self._then('flatten', inner)
 
     @not_infinite
     def for_each(self, f):
@@ -292,17 +580,23 @@ class Stream(object):
         3
         4
         """
-        for x in self:
+        for x in self._compile():
             f(x)
 
     @not_infinite
-    def group_by(self, key):
+    def group_by(self, key, memory_limit=None):
         """
         Returns a stream that groups elements together using the provided `key` function.
 
         The ordering of the groups is non-deterministic.
 
+        If a `memory_limit` is provided then, once more than `memory_limit` elements have been seen, elements are
+        hash-partitioned by their key into temporary files which are then grouped one partition at a time. Every
+        element, and every key, must therefore be picklable.
+
         :param key: A function such that `f(element) -> T` where `T` will be used to group elements together.
+        :param memory_limit: :class:`int`. An optional maximum number of elements to hold in memory while grouping.
+                             `Must` be greater than 0.
 
         :Returns: :class:`Stream`
 
@@ -331,16 +625,112 @@ class Stream(object):
         >>> [0, 2, 4, 6, 8] in got
         True
         """
-        stream = self._stream
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError("pstream.Stream.group_by memory limits must be greater than 0. Received {}.".format(memory_limit))
 
-        def inner():
+        def inner(stream):
             m = defaultdict(list)
             for element in stream:
                 m[key(element)].append(element)
             for grouping in m.values():
                 yield grouping
-        self._stream = inner()
-        return self
+
+        def spilling(stream):
+            groups = SpillingGrouper(memory_limit)
+            for element in stream:
+                groups.add(key(element), element)
+            return iter(groups)
+        return self._then('group_by', inner if memory_limit is None else spilling)
+
+    Aggregation = Aggregation
+
+    @not_infinite
+    def group_by_aggregate(self, key, combine, initial=NOTHING):
+        """
+        Returns a stream that groups elements together using the provided `key` function and folds each group
+        into a single value as it goes, rather than collecting each group into a list.
+
+        Only one running accumulator is held per distinct key, so this is the equivalent of
+        `group_by(key).map(lambda group: reduce(combine, group))` without ever materializing the groups.
+
+        `combine` may either be a function or the name of one of the following builtin aggregators.
+
+            - "count": The number of elements in the group.
+            - "sum": The sum of the elements in the group.
+            - "min": The smallest element in the group. Ties favor the first element seen.
+            - "max": The largest element in the group. Ties favor the first element seen.
+            - "mean": The arithmetic mean of the elements in the group.
+            - "first": The first element of the group.
+            - "last": The last element of the group.
+
+        The constructed tuple is the namedtuple, :class:`Stream.Aggregation`, which provides
+        the names `key` and `value`.
+
+        The ordering of the groups is non-deterministic.
+
+        :param key: A function such that `f(element) -> T` where `T` will be used to group elements together.
+        :param combine: Either the name of a builtin aggregator or a function such that
+                        `f(accumulator, element) -> accumulator`.
+        :param initial: An optional initial accumulator for every group. If not provided then the first
+                        element of each group is used as its initial accumulator. Each group starts from its own shallow
+                        copy (`copy.copy`) of `initial`, so a mutable accumulator, such as a list, is never shared
+                        between groups. `May not` be given alongside the name of a builtin aggregator.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> # Count people by how long their names are.
+        >>> names = ['Alice', 'Bob', 'Eve', 'Chris', 'Arjuna', 'Zack']
+        >>> got = Stream(names).group_by_aggregate(len, 'count').collect()
+        >>> sorted(got)
+        [Aggregation(key=3, value=2), Aggregation(key=4, value=1), Aggregation(key=5, value=2), Aggregation(key=6, value=1)]
+
+        :Example:
+        >>> # Sum the evens and the odds within [0, 10).
+        >>> got = Stream(range(10)).group_by_aggregate(lambda x: x % 2, lambda acc, x: acc + x).collect()
+        >>> sorted(got)
+        [Aggregation(key=0, value=20), Aggregation(key=1, value=25)]
+
+        :Example:
+        >>> # Collect the first letter of each name, by length.
+        >>> got = Stream(names).group_by_aggregate(len, lambda acc, x: acc + x[0], initial='').collect()
+        >>> sorted(got)
+        [Aggregation(key=3, value='BE'), Aggregation(key=4, value='Z'), Aggregation(key=5, value='AC'), Aggregation(key=6, value='A')]
+        """
+        if not is_valid(combine, initial):
+            raise ValueError("pstream.Stream.group_by_aggregate aggregators must be either a function or one of {} "
+                             "without an initial accumulator. Received {}.".format(', '.join(sorted(AGGREGATORS)), repr(combine)))
+        return self._then('group_by_aggregate', aggregate, key, aggregator(combine, initial))
+
+    def group_by_sorted(self, key):
+        """
+        Returns a stream that groups together adjacent elements that share the same `key`. This is the
+        equivalent of :meth:`Stream.group_by` over a stream that is already sorted by `key`.
+
+        Unlike :meth:`Stream.group_by`, each group is yielded as soon as the key changes, so this functor
+        only ever holds a single group in memory, never requires that keys be hashable, and may be used on
+        infinite streams. Groups are yielded in the order in which they occur.
+
+        Elements that share a key but are not adjacent to one another are yielded in separate groups.
+
+        :param key: A function such that `f(element) -> T` where `T` will be used to group elements together.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> # Group people by how long their names are.
+        >>> names = ['Bob', 'Eve', 'Zack', 'Alice', 'Chris', 'Arjuna']
+        >>> got = Stream(names).group_by_sorted(len).collect()
+        >>> assert got == [['Bob', 'Eve'], ['Zack'], ['Alice', 'Chris'], ['Arjuna']]
+
+        :Example:
+        >>> # Group an infinite stream of counts into blocks of three.
+        >>> got = Stream().repeat_with(iter(range(100)).__next__).group_by_sorted(lambda x: x // 3).take(3).collect()
+        >>> assert got == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+        """
+        def inner(stream):
+            return (list(group) for _, group in itertools.groupby(stream, key))
+        return self._then('group_by_sorted', inner)
 
     def inspect(self, f):
         """
@@ -364,14 +754,7 @@ class Stream(object):
         WARNING: 9 is not even!
         >>> assert got == [1, 2, 3, 4, 5, 6, 7, 8, 9]
         """
-        stream = self._stream
-
-        def inner():
-            for x in stream:
-                f(x)
-                yield x
-        self._stream = inner()
-        return self
+        return self._then(INSPECT, f)
 
     def map(self, f):
         """
@@ -386,8 +769,43 @@ class Stream(object):
         >>> got = Stream(numbers).map(double).collect()
         >>> assert got == [2, 4, 6, 8, 10, 12, 14, 16, 18]
         """
-        self._stream = map(f, self._stream)
-        return self
+        return self._then(MAP, f)
+
+    def par_map(self, f, workers=None, chunksize=16, ordered=True):
+        """
+        Returns a stream that maps each value using `f` across a pool of worker processes.
+
+        Elements are sent to the workers in chunks of `chunksize` and only a bounded window of chunks
+        (two per worker) is ever outstanding, so the upstream is never read far ahead of the consumer.
+        The pool is started lazily when the stream is evaluated and is shut down once the stream is exhausted
+        or is abandoned early.
+
+        Both `f` and every element (as well as every result) must be picklable. In particular, this means that
+        `f` may not be a lambda or a locally defined function.
+
+        :param f: A function such that `f(A) -> B`.
+        :param workers: :class:`int`. The number of worker processes. Defaults to the number of CPUs.
+        :param chunksize: :class:`int`. The number of elements sent to a worker per task. `Must` be greater than 0.
+        :param ordered: :class:`bool`. If `True` (the default) then the ordering of the stream is maintained.
+                        Otherwise, results are yielded in the order in which they are completed.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> numbers = [-1, -2, -3, -4, -5, -6, -7, -8, -9]
+        >>> got = Stream(numbers).par_map(abs, workers=2, chunksize=2).collect()
+        >>> assert got == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers <= 0:
+            raise ValueError("pstream.Stream.par_map workers must be greater than 0. Received {}.".format(workers))
+        if chunksize <= 0:
+            raise ValueError("pstream.Stream.par_map chunksize must be greater than 0. Received {}.".format(chunksize))
+
+        def inner(stream):
+            return parallel_map(multiprocessing.Pool, f, stream, workers, chunksize, ordered)
+        return self._then(PAR_MAP, inner)
 
     @not_infinite
     def reduce(self, f, accumulator):
@@ -411,7 +829,7 @@ class Stream(object):
         >>> got = Stream(numbers).reduce(stringify, '')
         >>> assert got == '123456789'
         """
-        return functools.reduce(f, self, accumulator)
+        return functools.reduce(f, self._compile(), accumulator)
 
     @not_infinite
     def reverse(self):
@@ -422,6 +840,13 @@ class Stream(object):
         will incur an internal collection at that particular step. This is due to the reliance of Python's builtin
         `reversed` function which itself requires an object that is indexable.
 
+        A `reverse` that is immediately followed by a :meth:`Stream.take` of `n` elements only ever holds
+        the last `n` elements of the stream in memory.
+
+        If the stream was built directly from a builtin `Sequence` (such as a list, a tuple, or a range), and only
+        :meth:`Stream.skip`, :meth:`Stream.take`, or :meth:`Stream.step_by` come before it, then the reversal is done
+        by index arithmetic over the `Sequence` and nothing is collected or copied at all.
+
         :Returns: :class:`Stream`
 
         :Example:
@@ -429,17 +854,103 @@ class Stream(object):
         >>> got = Stream(numbers).reverse().collect()
         >>> assert got == [9, 8, 7, 6, 5, 4, 3, 2, 1]
         """
-        stream = self._stream
+        def inner(stream):
+            return reversed(list(stream))
+        return self._then(REVERSE, inner)
 
-        def inner():
-            return reversed([x for x in stream])
-        self._stream = inner()
-        return self
+    @not_infinite
+    def sample(self, n, seed=None):
+        """
+        Returns a stream of `n` elements chosen uniformly at random from this stream, in no particular order.
+        If the stream has no more than `n` elements, then every element is yielded.
+
+        Only `n` elements are held in memory at once. Rather than drawing a random number for every element, the
+        number of elements to skip over before the next one is chosen is drawn directly, so most elements are
+        never looked at. A stream built directly from a `Sequence` (such as a list or a range) is sampled by index.
+
+        :param n: :class:`int`. The size of the sample. `Must` be greater than or equal to 0.
+        :param seed: An optional seed for the random number generator, for repeatable samples.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> got = Stream(range(1000000)).sample(5).collect()
+        >>> assert len(got) == 5
+        >>> assert all(0 <= x < 1000000 for x in got)
+        """
+        if n < 0:
+            raise ValueError("pstream.Stream.sample sizes must be greater than or equal to 0. Received {}.".format(n))
+        return self._then(SAMPLE, reservoir, n, seed)
+
+    def sample_fraction(self, p, seed=None):
+        """
+        Returns a stream that yields each element of this stream independently with probability `p`.
+        Ordering of elements in the stream is maintained.
+
+        This is equivalent to `filter(lambda _: random.random() < p)`, except that rather than drawing a random
+        number for every element, the gap between chosen elements is drawn directly. A stream built directly from a
+        `Sequence` (such as a list or a range) is sampled by index, so skipped elements are never touched at all.
+
+        :param p: :class:`float`. The probability of yielding each element. `Must` be within [0, 1].
+        :param seed: An optional seed for the random number generator, for repeatable samples.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> got = Stream(range(100000)).sample_fraction(0.01).collect()
+        >>> assert 800 < len(got) < 1200
+        >>> assert got == sorted(got)
+        """
+        if not 0 <= p <= 1:
+            raise ValueError("pstream.Stream.sample_fraction probabilities must be within [0, 1]. Received {}.".format(p))
+        return self._then(SAMPLE_FRACTION, bernoulli, p, seed)
+
+    @not_infinite
+    def top_k(self, n, key=None):
+        """
+        Returns a stream of the `n` largest elements, from the largest to the smallest.
+
+        This is equivalent to `sort_with(key).reverse().take(n)` (except that equal elements retain their original
+        order) however only `n` elements are ever held in memory at once.
+
+        :param n: :class:`int`. The number of elements to yield.
+        :param key: An optional function such that `key(element) -> T` where `T` is the type used for comparison.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        >>> got = Stream(arr).top_k(3).collect()
+        >>> assert got == [344523, 5678, 4567]
+        """
+        return self._then(TOP_K, top_k, key, n)
+
+    @not_infinite
+    def bottom_k(self, n, key=None):
+        """
+        Returns a stream of the `n` smallest elements, from the smallest to the largest.
+
+        This is equivalent to `sort_with(key).take(n)`, however only `n` elements are ever held in memory at once.
+
+        :param n: :class:`int`. The number of elements to yield.
+        :param key: An optional function such that `key(element) -> T` where `T` is the type used for comparison.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        >>> got = Stream(arr).bottom_k(3).collect()
+        >>> assert got == [4, 7, 7]
+        """
+        return self._then(BOTTOM_K, bottom_k, key, n)
 
     def skip(self, n):
         """
         Returns a stream that skips over `n` number of elements.
 
+        If the stream was built directly from a builtin `Sequence` (such as a list, a tuple, or a range) then the skipped
+        elements are never visited, and the remaining elements are read in place rather than copied.
+
         :param n: :class:`int`
 
         :Returns: :class:`Stream`
@@ -449,15 +960,9 @@ class Stream(object):
         >>> got = Stream(numbers).skip(3).collect()
         >>> assert got == [4, 5, 6, 7, 8, 9]
         """
-        stream = self._stream
-
-        def inner():
-            for _ in range(n):
-                next(stream)
-            for x in stream:
-                yield x
-        self._stream = inner()
-        return self
+        def inner(stream, n):
+            return itertools.islice(stream, max(n, 0), None)
+        return self._then(SKIP, inner, n)
 
     def skip_while(self, predicate):
         """
@@ -474,17 +979,21 @@ class Stream(object):
         >>> got = Stream(numbers).skip_while(lambda x: x < 5).collect()
         >>> assert got == [5, 6, 7, 8, 9]
         """
-        self._stream = itertools.dropwhile(predicate, self._stream)
-        return self
+        def inner(stream):
+            return itertools.dropwhile(predicate, stream)
+        return self._then('skip_while', inner)
 
     @not_infinite
-    def sort(self):
+    def sort(self, memory_limit=None, lazy=False):
         """
         Returns a stream whose elements are sorted.
 
         Note that calling `sort` itself remains lazy, however at time of collecting the stream a sort
         will incur an internal collection at that particular step.
 
+        :param memory_limit: :class:`int`. See :meth:`Stream.sort_with`.
+        :param lazy: :class:`bool`. See :meth:`Stream.sort_with`.
+
         :Returns: :class:`Stream`
 
         :Example:
@@ -492,17 +1001,34 @@ class Stream(object):
         >>> got = Stream(arr).sort().collect()
         >>> assert got == [4, 7, 7, 12, 23, 34, 45, 63, 233, 345, 456, 567, 4567, 5678, 344523]
         """
-        return self.sort_with(None)
+        return self.sort_with(None, memory_limit, lazy)
 
     @not_infinite
-    def sort_with(self, key):
+    def sort_with(self, key, memory_limit=None, lazy=False):
         """
         Returns a stream whose elements are sorted using the provided key selection function.
 
         Note that calling `sort_with` itself remains lazy, however at time of collecting the stream a sort
         will incur an internal collection at that particular step.
 
+        A sort that is immediately followed by a :meth:`Stream.take` of `n` elements is evaluated with a heap that
+        only ever holds `n` elements in memory. A sort that is immediately followed by a :meth:`Stream.reverse`
+        is evaluated as a single descending sort.
+
+        If a `memory_limit` is provided then no more than `memory_limit` elements are held in memory at once.
+        Instead, sorted runs of `memory_limit` elements are spilled to temporary files and are lazily merged back
+        together as the stream is consumed. No more than 16 runs are merged at once (runs beyond that are first merged
+        into larger runs on disk), so the number of open files stays small. Since runs are pickled, every element must be picklable.
+
+        If `lazy` is `True` then, rather than sorting everything up front, the elements are heapified in O(n) time
+        and each element is only popped off of the heap as it is consumed, in O(log(n)) time. This is cheaper than a
+        full sort whenever only a prefix of the sorted stream is consumed, such as by a :meth:`Stream.take_while` or
+        by a :meth:`Stream.for_each` that is abandoned part way through.
+
         :param key: A function such that `key(element) -> T` where `T` is the type used for comparison.
+        :param memory_limit: :class:`int`. An optional maximum number of elements to hold in memory while sorting.
+                             `Must` be greater than 0.
+        :param lazy: :class:`bool`. Whether to heap sort lazily. `May not` be combined with a `memory_limit`.
 
         :Returns: :class:`Stream`
 
@@ -510,13 +1036,24 @@ class Stream(object):
         >>> arr = ['12', '233', '4567', '344523', '7', '567', '34', '5678', '456', '23', '4', '7', '63', '45', '345']
         >>> got = Stream(arr).sort_with(len).collect()
         >>> assert got == ['7', '4', '7', '12', '34', '23', '63', '45', '233', '567', '456', '345', '4567', '5678', '344523']
-        """
-        stream = self._stream
 
-        def inner():
-            return sorted(stream, key=key)
-        self._stream = inner()
-        return self
+        :Example:
+        >>> # Only the elements below 100 are ever popped off of the heap.
+        >>> got = Stream(arr).sort_with(int, lazy=True).take_while(lambda x: int(x) < 100).collect()
+        >>> assert got == ['4', '7', '7', '12', '23', '34', '45', '63']
+        """
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError("pstream.Stream.sort_with memory limits must be greater than 0. Received {}.".format(memory_limit))
+        if memory_limit is not None and lazy:
+            raise ValueError("pstream.Stream.sort_with lazy sorts may not have a memory limit. Received {}.".format(memory_limit))
+
+        def inner(stream, key, memory_limit, lazy):
+            if lazy:
+                return heap_sort(stream, key)
+            if memory_limit is None:
+                return iter(sorted(stream, key=key))
+            return external_sort(stream, key, memory_limit)
+        return self._then(SORT, inner, key, memory_limit, lazy)
 
     def step_by(self, step):
         """
@@ -532,8 +1069,9 @@ class Stream(object):
         >>> got = Stream(numbers).step_by(3).collect()
         >>> assert got == [1, 4, 7]
         """
-        self._stream = itertools.islice(self._stream, 0, None, step)
-        return self
+        def inner(stream, step):
+            return itertools.islice(stream, 0, None, step)
+        return self._then(STEP_BY, inner, step)
 
     def take(self, n):
         """
@@ -548,17 +1086,14 @@ class Stream(object):
         >>> got = Stream(numbers).take(6).collect()
         >>> assert got == [1, 2, 3, 4, 5, 6]
         """
-        stream = self._stream
-
-        def inner():
+        def inner(stream, n):
             for _ in range(n):
                 try:
                     yield next(stream)
                 except StopIteration:
                     break
-        self._stream = inner()
         self._infinite = False
-        return self
+        return self._then(TAKE, inner, n)
 
     def take_while(self, predicate):
         """
@@ -575,9 +1110,8 @@ class Stream(object):
         >>> got = Stream(numbers).take_while(lambda x: x < 5).collect()
         >>> assert got == [1, 2, 3, 4]
         """
-        self._stream = itertools.takewhile(predicate, self._stream)
         self._infinite = False
-        return self
+        return self._then(TAKE_WHILE, predicate)
 
     def tee(self, *receivers):
         """
@@ -597,14 +1131,8 @@ class Stream(object):
         >>> assert a == [1, 2, 3, 4]
         >>> assert b == [1, 2, 3, 4]
         """
-        stream = self._stream
-
-        def inner():
-            for element in stream:
-                for other in receivers:
-                    other.append(element)
-                yield element
-        self._stream = inner()
+        for other in receivers:
+            self._then(INSPECT, other.append)
         return self
 
     def zip(self, *iterables):
@@ -619,8 +1147,40 @@ class Stream(object):
         >>> got = Stream([0, 1, 2]).zip([3, 4, 5]).collect()
         >>> assert got == [(0, 3), (1, 4), (2, 5)]
         """
-        self._stream = zip(self._stream, *iterables)
-        return self
+        return self._then(ZIP, zip, *iterables)
+
+    def thread_map(self, f, workers=None, ordered=True):
+        """
+        Returns a stream that maps each value using `f` across a pool of worker threads.
+
+        This is intended for functions that either block (file or socket reads) or that release the GIL
+        (such as `hashlib` digests or `zlib` decompression). Only a bounded number of elements (two per worker)
+        are ever read ahead of the consumer. The pool is started lazily when the stream is evaluated and is
+        shut down once the stream is exhausted or is abandoned early.
+
+        :param f: A function such that `f(A) -> B`.
+        :param workers: :class:`int`. The number of worker threads. Defaults to the number of CPUs.
+        :param ordered: :class:`bool`. If `True` (the default) then the ordering of the stream is maintained.
+                        Otherwise, results are yielded in the order in which they are completed.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> import hashlib
+        >>>
+        >>> people = ['Bob', 'Alice', 'Eve']
+        >>> fingerprinter = lambda x: hashlib.sha256(x.encode('UTF-8')).hexdigest()[:8]
+        >>> got = Stream(people).thread_map(fingerprinter, workers=2).collect()
+        >>> assert got == ['cd9fb1e1', '3bc51062', 'b9bae658']
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers <= 0:
+            raise ValueError("pstream.Stream.thread_map workers must be greater than 0. Received {}.".format(workers))
+
+        def inner(stream):
+            return parallel_map(ThreadPool, f, stream, workers, 1, ordered)
+        return self._then(THREAD_MAP, inner)
 
     def pool(self, size):
         """
@@ -646,19 +1206,47 @@ class Stream(object):
         """
         if size <= 0:
             raise ValueError("pstream.Stream.pool sizes must be greater than 0. Received {}.".format(size))
-        stream = self._stream
 
-        def inner():
-            pool = list()
-            for x in stream:
-                pool.append(x)
-                if len(pool) == size:
-                    yield pool
-                    pool = list()
-            if len(pool) != 0:
+        def inner(stream, size):
+            while True:
+                pool = list(itertools.islice(stream, size))
+                if len(pool) == 0:
+                    return
                 yield pool
-        self._stream = inner()
-        return self
+        return self._then(POOL, inner, size)
+
+    def prefetch(self, n):
+        """
+        Returns a stream whose preceding steps run in a background thread, which runs ahead of
+        the consumer by up to `n` elements.
+
+        Ordinarily, a source with high latency (such as a file or a database cursor) and an expensive step
+        further down the stream take turns. With a `prefetch` between them the two overlap instead. This pays off
+        whenever the source spends its time waiting on I/O, or otherwise releases the GIL.
+
+        An exception raised upstream is re-raised to the consumer once it reaches the failing element. Should the
+        consumer stop early, the thread exits after pulling at most one more element. The thread is a daemon,
+        so it never holds up the interpreter from exiting.
+
+        :param n: :class:`int`. The number of elements to buffer. `Must` be greater than 0.
+
+        :Returns: :class:`Stream`
+
+        :Example:
+        >>> import time
+        >>> def read(path):
+        ...     time.sleep(0.1)
+        ...     return path
+        >>> def parse(line):
+        ...     time.sleep(0.1)
+        ...     return line.upper()
+        >>> # Takes roughly 0.4 seconds rather than 0.6.
+        >>> got = Stream(['a', 'b', 'c']).map(read).prefetch(2).map(parse).collect()
+        >>> assert got == ['A', 'B', 'C']
+        """
+        if n <= 0:
+            raise ValueError("pstream.Stream.prefetch sizes must be greater than 0. Received {}.".format(n))
+        return self._then(PREFETCH, prefetch, n)
 
     def repeat(self, element):
         """
@@ -695,6 +1283,9 @@ class Stream(object):
             while True:
                 yield element
         self._stream = inner()
+        self._source = None
+        self._sized = None
+        self._stages = list()
         self._infinite = True
         return self
 
@@ -733,14 +1324,30 @@ class Stream(object):
             while True:
                 yield f()
         self._stream = inner()
+        self._source = None
+        self._sized = None
+        self._stages = list()
         self._infinite = True
         return self
 
+    def _then(self, op, f, *args):
+        self._stages.append(Stage(op, f, args))
+        return self
+
+    def _compile(self):
+        if self._stages:
+            self._stream = compile(self._stream, optimize(self._stages), self._source)
+            self._stages = list()
+        # Once compiled, elements may be drawn from the stream, so the source can no longer stand in for it.
+        self._source = None
+        self._sized = None
+        return self._stream
+
     def __iter__(self):
-        return (x for x in self._stream)
+        return iter(self._compile())
 
     def __next__(self):
-        return next(self._stream)
+        return next(self._compile())
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,75 @@
+# MIT License
+#
+# Copyright (c) 2020 Christopher Henderson, chris@chenderson.org
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import absolute_import
+
+from builtins import object
+
+from collections import OrderedDict
+
+try:
+    # Py3
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Py2
+    from time import time as monotonic
+
+
+class RecentKeys(object):
+    """
+    Remembers only the most recently seen keys. A key is forgotten once either more than `window` other keys
+    have been seen since it, or once more than `ttl` seconds have passed since it was seen. Either bound may be
+    `None`, but not both.
+
+    A key that is seen again while it is still remembered is not refreshed; it is forgotten according to
+    when it was first seen.
+    """
+
+    def __init__(self, window=None, ttl=None, clock=monotonic):
+        self.window = window
+        self.ttl = ttl
+        self.clock = clock
+        self.keys = OrderedDict()
+
+    def add(self, key):
+        """
+        Adds `key` to the keys that are remembered.
+
+        :Returns: :class:`bool`. Whether `key` was already remembered.
+        """
+        keys = self.keys
+        now = None
+        if self.ttl is not None:
+            now = self.clock()
+            horizon = now - self.ttl
+            while keys:
+                oldest = next(iter(keys))
+                if keys[oldest] > horizon:
+                    break
+                del keys[oldest]
+        if key in keys:
+            return True
+        keys[key] = now
+        if self.window is not None and len(keys) > self.window:
+            keys.popitem(last=False)
+        return False
@@ -0,0 +1,51 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+class ApproxCountDistinct(Method):
+
+    def __init__(self, args):
+        super(ApproxCountDistinct, self).__init__(AsyncStream.approx_count_distinct, args)
+
+
+class TestApproxCountDistinct(unittest.TestCase):
+
+    @Driver(initial=[x % 10 for x in range(100)], method=ApproxCountDistinct([]), want=10, evaluator=None)
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[x % 10 for x in range(100)], method=ApproxCountDistinct([]), want=10, evaluator=None)
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=ApproxCountDistinct([]), want=0, evaluator=None)
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=ApproxCountDistinct([]), want=0, evaluator=None)
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    async def test_large(self):
+        got = await AsyncStream(range(50000)).approx_count_distinct(precision=12)
+        self.assertLess(abs(got - 50000), 50000 * 0.05)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_precision(self):
+        await AsyncStream([]).approx_count_distinct(precision=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
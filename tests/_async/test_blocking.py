@@ -0,0 +1,89 @@
+import asyncio
+import time
+import unittest
+
+from pstream import AsyncStream
+from pstream._async.util import BlockingAdaptor
+from tests._async.utils import expect, run_to_completion
+
+
+def slowly(n, delay):
+    for x in range(n):
+        time.sleep(delay)
+        yield x
+
+
+class TestBlocking(unittest.TestCase):
+
+    @run_to_completion
+    async def test_blocking(self):
+        got = await AsyncStream(range(10), blocking=True, batch_size=3).map(lambda x: x * 2).collect()
+        self.assertEqual(got, [x * 2 for x in range(10)])
+
+    @run_to_completion
+    async def test_empty(self):
+        self.assertEqual(await AsyncStream([], blocking=True).collect(), [])
+
+    @run_to_completion
+    async def test_exact_batches(self):
+        self.assertEqual(await AsyncStream(range(6), blocking=True, batch_size=3).collect(), list(range(6)))
+
+    @run_to_completion
+    async def test_iterator(self):
+        self.assertEqual(await AsyncStream(iter(range(5)), blocking=True, batch_size=2).count(), 5)
+
+    @run_to_completion
+    async def test_adaptor(self):
+        s = AsyncStream(range(5), blocking=True)
+        self.assertIsInstance(s.stream, BlockingAdaptor)
+        s = AsyncStream(range(5), blocking=False)
+        self.assertNotIsInstance(s.stream, BlockingAdaptor)
+
+    @run_to_completion
+    async def test_does_not_block_the_loop(self):
+        ticks = list()
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+        ticker = asyncio.ensure_future(tick())
+        got = await AsyncStream(slowly(5, 0.02), blocking=True, batch_size=1).collect()
+        await ticker
+        self.assertEqual(got, list(range(5)))
+        # Had the source run on the loop, the ticker would have stalled behind each 20ms sleep.
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.02)
+
+    @run_to_completion
+    async def test_next_batch_in_flight(self):
+        drawn = list()
+
+        def source():
+            for x in range(100):
+                drawn.append(x)
+                yield x
+        s = AsyncStream(source(), blocking=True, batch_size=10)
+        self.assertEqual(await s.__anext__(), 0)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(drawn), 20)
+
+    @run_to_completion
+    async def test_exception_after_elements(self):
+        got = list()
+        try:
+            async for x in AsyncStream((1 / x for x in [1, 2, 0, 4]), blocking=True, batch_size=10):
+                got.append(x)
+        except ZeroDivisionError:
+            pass
+        else:
+            self.fail('expected a ZeroDivisionError')
+        self.assertEqual(got, [1, 0.5])
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_batch_size(self):
+        AsyncStream([], blocking=True, batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
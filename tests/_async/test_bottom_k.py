@@ -0,0 +1,78 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, expect, AF, run_to_completion
+
+
+class BottomK(Method):
+
+    def __init__(self, args):
+        super(BottomK, self).__init__(AsyncStream.bottom_k, args)
+
+
+class TestBottomK(unittest.TestCase):
+
+    random = [123, 5, 1245, 6, 2, 56, 0, 8, 2, 78, 4, -1]
+
+    @Driver(initial=random, method=BottomK(args=[3]), want=[-1, 0, 2])
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=random, method=BottomK(args=[3]), want=[-1, 0, 2])
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=['bb', 'a', 'cc', 'd', 'ee', 'f'], method=BottomK(args=[2, len]), want=['a', 'd'])
+    def test_key__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['bb', 'a', 'cc', 'd', 'ee', 'f'], method=BottomK(args=[2, len]), want=['a', 'd'])
+    def test_key__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=range(100), method=BottomK(args=[5]), want=[0, 1, 2, 3, 4])
+    def test_large__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(100), method=BottomK(args=[5]), want=[0, 1, 2, 3, 4])
+    def test_large__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=random, method=BottomK(args=[0]), want=[])
+    def test_zero__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=BottomK(args=[3]), want=[])
+    def test_empty__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    @expect(TypeError)
+    async def test_async_key(self):
+        AsyncStream([3, 4, 2, 1]).bottom_k(2, AF(lambda x: x))
+
+
+if __name__ == '__main__':
+    unittest.main()
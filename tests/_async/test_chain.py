@@ -1,7 +1,7 @@
 import unittest
 
 from pstream import AsyncStream
-from tests._async.utils import Driver, Method
+from tests._async.utils import Driver, Method, AI, run_to_completion
 
 
 class Chain(Method):
@@ -138,6 +138,38 @@ class TestChain(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###############################
+
+    @run_to_completion
+    async def test_flattened(self):
+        s = AsyncStream(AI([0]))
+        for i in range(1, 5000):
+            s = s.chain([i] if i % 100 else AI([i]))
+        self.assertEqual(len(s.stream.streams), 5000)
+        self.assertEqual(await s.collect(), list(range(5000)))
+
+    @run_to_completion
+    async def test_chain_after_map(self):
+        got = await AsyncStream([1, 2]).chain([3]).map(lambda x: x * 2).chain([4]).chain(AI([5])).collect()
+        self.assertEqual(got, [2, 4, 6, 4, 5])
+
+    @run_to_completion
+    async def test_aclose(self):
+        closed = list()
+
+        async def source(name):
+            try:
+                for x in range(10):
+                    yield x
+            finally:
+                closed.append(name)
+        s = AsyncStream(source('first')).chain([10], source('second'), source('third'))
+        self.assertEqual(await s.__anext__(), 0)
+        await s.stream.aclose()
+        self.assertEqual(closed, ['first'])
+        with self.assertRaises(StopAsyncIteration):
+            await s.__anext__()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from pstream import AsyncStream, Stream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+class Describe(Method):
+
+    def __init__(self, args):
+        super(Describe, self).__init__(AsyncStream.describe, args)
+
+
+WANT = Stream.Description(8, 5.0, 32 / 7, (32 / 7) ** 0.5, 2, 9, {0.5: 4})
+
+
+class TestDescribe(unittest.TestCase):
+
+    @Driver(initial=[2, 4, 4, 4, 5, 5, 7, 9], method=Describe([[0.5]]), want=WANT, evaluator=None)
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[2, 4, 4, 4, 5, 5, 7, 9], method=Describe([[0.5]]), want=WANT, evaluator=None)
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=Describe([[0.5]]), want=Stream.Description(0, None, None, None, None, None, {0.5: None}), evaluator=None)
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=Describe([[0.5]]), want=Stream.Description(0, None, None, None, None, None, {0.5: None}), evaluator=None)
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_value_error(self):
+        await AsyncStream([]).describe([2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,20 @@ class TestDistinct(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###########################
+
+    @Driver(initial=[1, 2, 1, 3, 2, 0, 5], method=Distinct(args=[True, 100, 0.0001]), want=[1, 2, 3, 0, 5])
+    def test_approximate__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 1, 3, 2, 0, 5], method=Distinct(args=[True, 100, 0.0001]), want=[1, 2, 3, 0, 5])
+    def test_approximate__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
 
 if __name__ == '__main__':
     unittest.main()
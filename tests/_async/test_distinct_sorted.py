@@ -0,0 +1,64 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion
+
+
+class DistinctSorted(Method):
+
+    def __init__(self, args):
+        super(DistinctSorted, self).__init__(AsyncStream.distinct_sorted, args)
+
+
+class TestDistinctSorted(unittest.TestCase):
+
+    @Driver(initial=[1, 1, 2, 3, 3, 3, 1], method=DistinctSorted(args=[]), want=[1, 2, 3, 1])
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 1, 2, 3, 3, 3, 1], method=DistinctSorted(args=[]), want=[1, 2, 3, 1])
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=range(0), method=DistinctSorted(args=[]), want=[])
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=DistinctSorted(args=[]), want=[])
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=[None, None, 0, 0], method=DistinctSorted(args=[]), want=[None, 0])
+    def test2__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[None, None, 0, 0], method=DistinctSorted(args=[]), want=[None, 0])
+    def test2__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @run_to_completion
+    async def test_infinite(self):
+        got = await AsyncStream().repeat(1).enumerate().map(lambda e: e.count // 3).distinct_sorted().take(3).collect()
+        self.assertEqual(got, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -62,6 +62,32 @@ class TestDistinctWith(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###########################
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=DistinctWith(args=[lambda x: x % 2, True, 100, 0.0001]), want=[1, 2])
+    def test_approximate__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=DistinctWith(args=[lambda x: x % 2, True, 100, 0.0001]), want=[1, 2])
+    def test_approximate__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=DistinctWith(args=[lambda x: x % 2, True, 100, 0.0001]), want=[1, 2])
+    def test_approximate__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=DistinctWith(args=[lambda x: x % 2, True, 100, 0.0001]), want=[1, 2])
+    def test_approximate__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
 
 if __name__ == '__main__':
     unittest.main()
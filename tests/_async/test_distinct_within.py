@@ -0,0 +1,105 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+class DistinctWithin(Method):
+
+    def __init__(self, args):
+        super(DistinctWithin, self).__init__(AsyncStream.distinct_within, args)
+
+
+class TestDistinctWithin(unittest.TestCase):
+
+    @Driver(initial=[1, 2, 1, 3, 2, 4, 5, 6, 1, 6], method=DistinctWithin(args=[3]), want=[1, 2, 3, 4, 5, 6, 1])
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 1, 3, 2, 4, 5, 6, 1, 6], method=DistinctWithin(args=[3]), want=[1, 2, 3, 4, 5, 6, 1])
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[], method=DistinctWithin(args=[3]), want=[])
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=DistinctWithin(args=[3]), want=[])
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=['a', 'bb', 'c', 'dd', 'eee', 'f'], method=DistinctWithin(args=[2, None, len]), want=['a', 'bb', 'eee', 'f'])
+    def test2__a_sss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['a', 'bb', 'c', 'dd', 'eee', 'f'], method=DistinctWithin(args=[2, None, len]), want=['a', 'bb', 'eee', 'f'])
+    def test2__s_sss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['a', 'bb', 'c', 'dd', 'eee', 'f'], method=DistinctWithin(args=[2, None, len]), want=['a', 'bb', 'eee', 'f'])
+    def test2__a_ssa(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['a', 'bb', 'c', 'dd', 'eee', 'f'], method=DistinctWithin(args=[2, None, len]), want=['a', 'bb', 'eee', 'f'])
+    def test2__s_ssa(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[1, 2, 1, 2], method=DistinctWithin(args=[None, 60]), want=[1, 2])
+    def test3__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 1, 2], method=DistinctWithin(args=[None, 60]), want=[1, 2])
+    def test3__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_infinite(self):
+        got = await AsyncStream().repeat(1).enumerate().distinct_within(window=10, key=lambda e: e.count % 3).take(3).collect()
+        self.assertEqual(got, [(0, 1), (1, 1), (2, 1)])
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_no_bounds(self):
+        AsyncStream([]).distinct_within()
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_window(self):
+        AsyncStream([]).distinct_within(window=0)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_ttl(self):
+        AsyncStream([]).distinct_within(ttl=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -88,6 +88,32 @@ class TestGroupBy(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###########################
+
+    @Driver(initial=range(10), method=GroupBy(args=[lambda x: x % 2, 3]), want=[[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]])
+    def test_memory_limit__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=range(10), method=GroupBy(args=[lambda x: x % 2, 3]), want=[[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]])
+    def test_memory_limit__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=range(10), method=GroupBy(args=[lambda x: x % 2, 3]), want=[[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]])
+    def test_memory_limit__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=range(10), method=GroupBy(args=[lambda x: x % 2, 3]), want=[[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]])
+    def test_memory_limit__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect, AF
+
+
+class GroupByAggregate(Method):
+
+    def __init__(self, args):
+        super(GroupByAggregate, self).__init__(AsyncStream.group_by_aggregate, args)
+
+
+def add(acc, x):
+    return acc + x
+
+
+class TestGroupByAggregate(unittest.TestCase):
+
+    @Driver(initial=range(10), method=GroupByAggregate(args=[lambda x: x % 2, add]), want=[(0, 20), (1, 25)])
+    def test__a_as(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=GroupByAggregate(args=[lambda x: x % 2, add]), want=[(0, 20), (1, 25)])
+    def test__s_as(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=GroupByAggregate(args=[lambda x: x % 2, add]), want=[(0, 20), (1, 25)])
+    def test__a_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=GroupByAggregate(args=[lambda x: x % 2, add]), want=[(0, 20), (1, 25)])
+    def test__s_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[], method=GroupByAggregate(args=[lambda x: x % 2, 'count']), want=[])
+    def test2__a_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=GroupByAggregate(args=[lambda x: x % 2, 'count']), want=[])
+    def test2__s_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[4, 1, 3, 2, 5], method=GroupByAggregate(args=[lambda x: True, 'mean']), want=[(True, 3)])
+    def test3__a_as(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[4, 1, 3, 2, 5], method=GroupByAggregate(args=[lambda x: True, 'max']), want=[(True, 5)])
+    def test3__s_as(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[4, 1, 3, 2, 5], method=GroupByAggregate(args=[lambda x: True, 'min']), want=[(True, 1)])
+    def test3__a_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[4, 1, 3, 2, 5], method=GroupByAggregate(args=[lambda x: True, 'last']), want=[(True, 5)])
+    def test3__s_ss(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_initial(self):
+        got = await AsyncStream(range(10)).group_by_aggregate(lambda x: x % 2, add, initial=100).collect()
+        self.assertEqual(got, [(0, 120), (1, 125)])
+
+    @run_to_completion
+    async def test_mutable_initial(self):
+        initial = []
+        got = await AsyncStream(range(6)).group_by_aggregate(lambda x: x % 2, lambda acc, x: (acc.append(x), acc)[1], initial=initial).collect()
+        self.assertEqual(got, [(0, [0, 2, 4]), (1, [1, 3, 5])])
+        self.assertEqual(initial, [])
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_unknown(self):
+        AsyncStream([]).group_by_aggregate(lambda x: x, 'median')
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_async_combine(self):
+        AsyncStream([]).group_by_aggregate(lambda x: x, AF(add))
+
+
+if __name__ == '__main__':
+    unittest.main()
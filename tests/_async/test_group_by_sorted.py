@@ -0,0 +1,74 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion
+
+
+class GroupBySorted(Method):
+
+    def __init__(self, args):
+        super(GroupBySorted, self).__init__(AsyncStream.group_by_sorted, args)
+
+
+class TestGroupBySorted(unittest.TestCase):
+
+    @Driver(initial=[0, 2, 1, 3, 4], method=GroupBySorted(args=[lambda x: x % 2]), want=[[0, 2], [1, 3], [4]])
+    def test__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[0, 2, 1, 3, 4], method=GroupBySorted(args=[lambda x: x % 2]), want=[[0, 2], [1, 3], [4]])
+    def test__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[0, 2, 1, 3, 4], method=GroupBySorted(args=[lambda x: x % 2]), want=[[0, 2], [1, 3], [4]])
+    def test__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[0, 2, 1, 3, 4], method=GroupBySorted(args=[lambda x: x % 2]), want=[[0, 2], [1, 3], [4]])
+    def test__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[], method=GroupBySorted(args=[lambda x: x % 2]), want=[])
+    def test2__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=GroupBySorted(args=[lambda x: x % 2]), want=[])
+    def test2__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=GroupBySorted(args=[lambda x: x % 2]), want=[])
+    def test2__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=GroupBySorted(args=[lambda x: x % 2]), want=[])
+    def test2__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_infinite(self):
+        got = await AsyncStream().repeat(1).enumerate().group_by_sorted(lambda e: e.count // 2).take(2).collect()
+        self.assertEqual(got, [[(0, 1), (1, 1)], [(2, 1), (3, 1)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 
 from pstream import AsyncStream
-from pstream._async.functors import for_each
-from tests._async.utils import AF, run_to_completion
+from pstream._async.functors import Fused, for_each
+from pstream._sync.plan import MAX_FUSION
+from tests._async.utils import AF, AI, run_to_completion
 
 
 class TestInternals(unittest.TestCase):
@@ -28,6 +29,55 @@ class TestInternals(unittest.TestCase):
         await AsyncStream(range(10)).for_each(lambda x: got.append(x))
         self.assertEqual(got, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9])
 
+    @run_to_completion
+    async def test_fused(self):
+        s = AsyncStream(AI(range(10))).map(lambda x: x + 1).filter(lambda x: x % 2).inspect(lambda x: x).take_while(lambda x: x < 8)
+        self.assertIsInstance(s.stream, Fused)
+        self.assertEqual(len(s.stream.stages), 4)
+        self.assertEqual(await s.collect(), [1, 3, 5, 7])
+
+    @run_to_completion
+    async def test_fused_interrupted_by_async_function(self):
+        s = AsyncStream(AI(range(6))).map(lambda x: x * 2).map(AF(lambda x: x + 1)).filter_false(lambda x: x % 3).map(str)
+        self.assertIsInstance(s.stream, Fused)
+        self.assertEqual(len(s.stream.stages), 2)
+        self.assertEqual(await s.collect(), ['3', '9'])
+
+    @run_to_completion
+    async def test_fused_limit(self):
+        s = AsyncStream(AI(range(3)))
+        for _ in range(MAX_FUSION + 1):
+            s = s.map(lambda x: x + 1)
+        self.assertEqual(len(s.stream.stages), 1)
+        self.assertEqual(len(s.stream.upstream.stages), MAX_FUSION)
+        self.assertEqual(await s.collect(), [MAX_FUSION + 1, MAX_FUSION + 2, MAX_FUSION + 3])
+
+    @run_to_completion
+    async def test_fused_after_iteration(self):
+        s = AsyncStream(AI(range(4))).map(lambda x: x * 10)
+        self.assertEqual(await s.__anext__(), 0)
+        s = s.map(lambda x: x + 1)
+        self.assertEqual(len(s.stream.stages), 1)
+        self.assertEqual(await s.collect(), [11, 21, 31])
+
+    @run_to_completion
+    async def test_fused_aclose(self):
+        closed = list()
+
+        async def source():
+            try:
+                for x in range(10):
+                    yield x
+            finally:
+                closed.append(True)
+        s = AsyncStream(source()).map(lambda x: x * 2).filter(lambda x: x % 3)
+        self.assertIsInstance(s.stream, Fused)
+        self.assertEqual(await s.__anext__(), 2)
+        await s.stream.aclose()
+        self.assertEqual(closed, [True])
+        with self.assertRaises(StopAsyncIteration):
+            await s.__anext__()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,15 @@
+import asyncio
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from pstream import AsyncStream
-from tests._async.utils import Driver, Method
+from tests._async.utils import Driver, Method, AI, AF, run_to_completion, expect
+
+
+def square(x):
+    return x * x
 
 
 class Map(Method):
@@ -114,6 +122,183 @@ class TestMap(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ####################
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 2]), want=[2, 4, 6, 8, 10])
+    def test_concurrent__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 2]), want=[2, 4, 6, 8, 10])
+    def test_concurrent__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 2]), want=[2, 4, 6, 8, 10])
+    def test_concurrent__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 2]), want=[2, 4, 6, 8, 10])
+    def test_concurrent__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ####################
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 3, False]), want=[2, 4, 6, 8, 10])
+    def test_unordered__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Map(args=[lambda x: x * 2, 3, False]), want=[2, 4, 6, 8, 10])
+    def test_unordered__s_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=[], method=Map(args=[lambda x: x * 2, 3, False]), want=[])
+    def test_unordered_empty__a_a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ####################
+
+    @run_to_completion
+    async def test_concurrency_overlaps(self):
+        async def slow(x):
+            await asyncio.sleep(0.1)
+            return x
+        start = time.time()
+        got = await AsyncStream(range(10)).map(slow, concurrency=10).collect()
+        self.assertEqual(got, list(range(10)))
+        self.assertLess(time.time() - start, 0.5)
+
+    @run_to_completion
+    async def test_concurrency_ordered_out_of_order_completion(self):
+        async def backwards(x):
+            await asyncio.sleep(0.01 * (5 - x))
+            return x
+        got = await AsyncStream(range(5)).map(backwards, concurrency=5).collect()
+        self.assertEqual(got, [0, 1, 2, 3, 4])
+        got = await AsyncStream(range(5)).map(backwards, concurrency=5, ordered=False).collect()
+        self.assertEqual(got, [4, 3, 2, 1, 0])
+
+    @run_to_completion
+    async def test_concurrency_bounded(self):
+        in_flight = [0, 0]
+
+        async def track(x):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return x
+        await AsyncStream(range(20)).map(track, concurrency=3).collect()
+        self.assertEqual(in_flight[1], 3)
+
+    @run_to_completion
+    @expect(ZeroDivisionError)
+    async def test_concurrency_error(self):
+        async def invert(x):
+            return 1 / x
+        await AsyncStream([1, 0, 2]).map(invert, concurrency=2).collect()
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_concurrency_value_error(self):
+        AsyncStream().map(lambda x: x, concurrency=0)
+
+    ###########################
+
+    @run_to_completion
+    async def test_executor_thread(self):
+        got = await AsyncStream(range(10)).map(square, executor='thread', concurrency=2).collect()
+        self.assertEqual(got, [x * x for x in range(10)])
+
+    @run_to_completion
+    async def test_executor_process(self):
+        got = await AsyncStream(AI(range(10))).map(square, executor='process', concurrency=2, batch_size=4).collect()
+        self.assertEqual(got, [x * x for x in range(10)])
+
+    @run_to_completion
+    async def test_executor_instance(self):
+        with ThreadPoolExecutor(2) as executor:
+            got = await AsyncStream(range(10)).map(square, executor=executor, batch_size=3, ordered=False).collect()
+            self.assertEqual(sorted(got), [x * x for x in range(10)])
+            # Executors that are handed in are left for their owner to shut down.
+            self.assertEqual(await AsyncStream([3]).map(square, executor=executor).collect(), [9])
+
+    @run_to_completion
+    async def test_executor_off_loop(self):
+        threads = set()
+
+        def record(x):
+            threads.add(threading.current_thread())
+            return x
+        await AsyncStream(range(5)).map(record, executor='thread').collect()
+        self.assertNotIn(threading.current_thread(), threads)
+
+    @run_to_completion
+    async def test_executor_does_not_block_the_loop(self):
+        ticks = list()
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        def slow(x):
+            time.sleep(0.02)
+            return x
+        ticker = asyncio.ensure_future(tick())
+        got = await AsyncStream(range(5)).map(slow, executor='thread', concurrency=1).collect()
+        await ticker
+        self.assertEqual(got, list(range(5)))
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.02)
+
+    @run_to_completion
+    async def test_executor_bounded(self):
+        in_flight = [0, 0]
+        lock = threading.Lock()
+
+        def track(x):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return x
+        await AsyncStream(range(20)).map(track, executor='thread', concurrency=3).collect()
+        self.assertLessEqual(in_flight[1], 3)
+
+    @run_to_completion
+    @expect(ZeroDivisionError)
+    async def test_executor_error(self):
+        await AsyncStream([1, 0, 2]).map(lambda x: 1 / x, executor='thread').collect()
+
+    @run_to_completion
+    @expect(TypeError)
+    async def test_executor_async_function(self):
+        AsyncStream().map(AF(lambda x: x), executor='thread')
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_executor_value_error(self):
+        AsyncStream().map(lambda x: x, executor='fiber')
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_executor_batch_size_value_error(self):
+        AsyncStream().map(lambda x: x, executor='thread', batch_size=0)
+
 
 if __name__ == '__main__':
     unittest.main()
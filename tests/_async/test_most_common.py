@@ -0,0 +1,63 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+class MostCommon(Method):
+
+    def __init__(self, args):
+        super(MostCommon, self).__init__(AsyncStream.most_common, args)
+
+
+class TestMostCommon(unittest.TestCase):
+
+    @Driver(initial='abracadabra', method=MostCommon([3]), want=[('a', 5), ('b', 2), ('r', 2)], evaluator=None)
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial='abracadabra', method=MostCommon([3]), want=[('a', 5), ('b', 2), ('r', 2)], evaluator=None)
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=MostCommon([3]), want=[], evaluator=None)
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=MostCommon([3]), want=[], evaluator=None)
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[x if x % 4 else -1 for x in range(1000)], method=MostCommon([1, True, 10]), want=-1, evaluator=None)
+    def test2__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got[0][0], want)
+
+    @Driver(initial=[x if x % 4 else -1 for x in range(1000)], method=MostCommon([1, True, 10]), want=-1, evaluator=None)
+    def test2__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got[0][0], want)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_k(self):
+        await AsyncStream([]).most_common(0)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_counters(self):
+        await AsyncStream([]).most_common(5, approximate=True, counters=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
+import asyncio
 import unittest
 
 from pstream import AsyncStream
-from tests._async.utils import Driver, Method
+from tests._async.utils import Driver, Method, AI, run_to_completion
+from tests._async.utils import expect as expect_async
 from tests.sync.test_stream import expect
 
 
@@ -109,6 +111,79 @@ class TestPool(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###########################
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Pool(args=[2, 1]), want=[[1, 2], [3, 4], [5]])
+    def test_timeout__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3, 4, 5], method=Pool(args=[2, 1]), want=[[1, 2], [3, 4], [5]])
+    def test_timeout__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    async def test_timeout_flushes(self):
+        async def trickle():
+            for x in range(6):
+                yield x
+                await asyncio.sleep(0.1 if x % 2 else 0)
+        got = await AsyncStream(trickle()).pool(100, timeout=0.05).collect()
+        self.assertEqual(got, [[0, 1], [2, 3], [4, 5]])
+
+    @run_to_completion
+    async def test_timeout_measured_from_oldest(self):
+        async def steady():
+            for x in range(10):
+                yield x
+                await asyncio.sleep(0.02)
+        got = await AsyncStream(steady()).pool(100, timeout=0.07).collect()
+        # A deadline reset by every arrival would never fire, yielding a single pool.
+        self.assertGreater(len(got), 1)
+        self.assertTrue(all(len(p) <= 5 for p in got))
+        self.assertEqual([x for p in got for x in p], list(range(10)))
+
+    @run_to_completion
+    async def test_timeout_does_not_cancel_upstream(self):
+        cancelled = list()
+
+        async def slow():
+            for x in range(3):
+                try:
+                    await asyncio.sleep(0.05)
+                except asyncio.CancelledError:
+                    cancelled.append(x)
+                    raise
+                yield x
+        got = await AsyncStream(slow()).pool(10, timeout=0.01).collect()
+        self.assertEqual(got, [[0], [1], [2]])
+        self.assertEqual(cancelled, [])
+
+    @run_to_completion
+    async def test_timeout_early_close(self):
+        async def forever():
+            x = 0
+            while True:
+                await asyncio.sleep(0.01)
+                yield x
+                x += 1
+        s = AsyncStream(forever()).pool(3, timeout=1)
+        self.assertEqual(await s.__anext__(), [0, 1, 2])
+        await s.stream.aclose()
+
+    @run_to_completion
+    @expect_async(ZeroDivisionError)
+    async def test_timeout_error(self):
+        await AsyncStream(AI([1, 0, 2])).map(lambda x: 1 / x).pool(2, timeout=1).collect()
+
+    @run_to_completion
+    @expect_async(ValueError)
+    async def test_timeout_value_error(self):
+        AsyncStream([]).pool(2, timeout=0)
+
 
 if __name__ == '__main__':
     unittest.main()
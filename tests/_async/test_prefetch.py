@@ -0,0 +1,127 @@
+import asyncio
+import time
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, AI, expect, run_to_completion
+
+
+class Prefetch(Method):
+
+    def __init__(self, args):
+        super(Prefetch, self).__init__(AsyncStream.prefetch, args)
+
+
+class TestPrefetch(unittest.TestCase):
+
+    @Driver(initial=range(10), method=Prefetch(args=[3]), want=list(range(10)))
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=Prefetch(args=[3]), want=list(range(10)))
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=[], method=Prefetch(args=[1]), want=[])
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[], method=Prefetch(args=[1]), want=[])
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_overlap(self):
+        async def slow(x):
+            await asyncio.sleep(0.05)
+            return x
+        start = time.monotonic()
+        got = await AsyncStream(AI(range(5))).map(slow).prefetch(2).map(slow).collect()
+        elapsed = time.monotonic() - start
+        self.assertEqual(got, list(range(5)))
+        # 10 sleeps of 50ms taken in turn would be 0.5s. Overlapped, they're closer to 0.3s.
+        self.assertLess(elapsed, 0.45)
+
+    @run_to_completion
+    async def test_backpressure(self):
+        pulled = list()
+
+        async def source():
+            for x in range(100):
+                pulled.append(x)
+                yield x
+        s = AsyncStream(source()).prefetch(3)
+        self.assertEqual(await s.__anext__(), 0)
+        await asyncio.sleep(0.01)
+        # One handed to the consumer, three in the queue, and one more waiting to be put.
+        self.assertLessEqual(len(pulled), 5)
+        await s.stream.aclose()
+
+    @run_to_completion
+    async def test_early_close(self):
+        pulled = list()
+
+        async def source():
+            for x in range(100):
+                pulled.append(x)
+                yield x
+        s = AsyncStream(source()).prefetch(2)
+        self.assertEqual(await s.__anext__(), 0)
+        await s.stream.aclose()
+        await asyncio.sleep(0.01)
+        before = len(pulled)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(pulled), before)
+
+    @run_to_completion
+    async def test_early_close_full_queue(self):
+        closed = list()
+
+        async def source():
+            try:
+                for x in range(100):
+                    yield x
+            finally:
+                closed.append(True)
+        s = AsyncStream(source()).prefetch(1)
+        self.assertEqual(await s.__anext__(), 0)
+        await asyncio.sleep(0.01)
+        await s.stream.aclose()
+        await asyncio.sleep(0.01)
+        self.assertEqual(closed, [True])
+
+    @run_to_completion
+    @expect(ZeroDivisionError)
+    async def test_exception(self):
+        await AsyncStream(AI([1, 2, 0, 4])).map(lambda x: 1 / x).prefetch(2).collect()
+
+    @run_to_completion
+    async def test_exception_after_elements(self):
+        got = list()
+        try:
+            async for x in AsyncStream(AI([1, 2, 0, 4])).map(lambda x: 1 / x).prefetch(2):
+                got.append(x)
+        except ZeroDivisionError:
+            pass
+        self.assertEqual(got, [1, 0.5])
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_value_error(self):
+        AsyncStream([]).prefetch(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
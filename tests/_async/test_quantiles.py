@@ -0,0 +1,52 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+class Quantiles(Method):
+
+    def __init__(self, args):
+        super(Quantiles, self).__init__(AsyncStream.quantiles, args)
+
+
+class TestQuantiles(unittest.TestCase):
+
+    @Driver(initial=[5, 3, 1, 4, 2], method=Quantiles([[0, 0.5, 1]]), want=[1, 3, 5], evaluator=None)
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[5, 3, 1, 4, 2], method=Quantiles([[0, 0.5, 1]]), want=[1, 3, 5], evaluator=None)
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=Quantiles([[0.5]]), want=[None], evaluator=None)
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(0), method=Quantiles([[0.5]]), want=[None], evaluator=None)
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    async def test_large(self):
+        p50, p99 = await AsyncStream(range(100000)).quantiles([0.5, 0.99])
+        self.assertLess(abs(p50 - 50000), 2000)
+        self.assertLess(abs(p99 - 99000), 2000)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_value_error(self):
+        await AsyncStream([]).quantiles([-0.1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from pstream import AsyncStream
+from pstream.errors import InfiniteCollectionError
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+async def fast(iterable):
+    # Unlike AI, does not sleep between elements.
+    for x in iterable:
+        yield x
+
+
+class Sample(Method):
+
+    def __init__(self, args):
+        super(Sample, self).__init__(AsyncStream.sample, args)
+
+
+class TestSample(unittest.TestCase):
+
+    @Driver(initial=[1, 2, 3], method=Sample(args=[5]), want=[1, 2, 3])
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    @Driver(initial=[1, 2, 3], method=Sample(args=[5]), want=[1, 2, 3])
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(sorted(got), want)
+
+    ###########################
+
+    @Driver(initial=[1, 2, 3], method=Sample(args=[0]), want=[])
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=[1, 2, 3], method=Sample(args=[0]), want=[])
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_async_large(self):
+        got = await AsyncStream(fast(range(5000))).sample(10, seed=1).collect()
+        self.assertEqual(len(set(got)), 10)
+        self.assertEqual(got, await AsyncStream(fast(range(5000))).sample(10, seed=1).collect())
+        # The synchronous and asynchronous reservoirs draw the same random numbers.
+        self.assertEqual(got, await AsyncStream(iter(range(5000))).sample(10, seed=1).collect())
+
+    @run_to_completion
+    async def test_sequence(self):
+        got = await AsyncStream(range(10 ** 11)).sample(5).collect()
+        self.assertEqual(len(got), 5)
+
+    @run_to_completion
+    async def test_sequence_after_anext(self):
+        stream = AsyncStream([1, 2, 3])
+        self.assertEqual(await stream.__anext__(), 1)
+        self.assertEqual(sorted(await stream.sample(5).collect()), [2, 3])
+
+    @run_to_completion
+    async def test_uniform(self):
+        counts = [0] * 10
+        for seed in range(1000):
+            for x in await AsyncStream(fast(range(10))).sample(3, seed=seed).collect():
+                counts[x] += 1
+        self.assertTrue(all(220 < count < 380 for count in counts), counts)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_value_error(self):
+        AsyncStream([]).sample(-1)
+
+    @run_to_completion
+    @expect(InfiniteCollectionError)
+    async def test_infinite(self):
+        AsyncStream().repeat(1).sample(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
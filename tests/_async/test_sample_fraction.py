@@ -0,0 +1,70 @@
+import unittest
+
+from pstream import AsyncStream
+from tests._async.utils import Driver, Method, run_to_completion, expect
+
+
+async def fast(iterable):
+    # Unlike AI, does not sleep between elements.
+    for x in iterable:
+        yield x
+
+
+class SampleFraction(Method):
+
+    def __init__(self, args):
+        super(SampleFraction, self).__init__(AsyncStream.sample_fraction, args)
+
+
+class TestSampleFraction(unittest.TestCase):
+
+    @Driver(initial=range(10), method=SampleFraction(args=[1]), want=list(range(10)))
+    def test__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=SampleFraction(args=[1]), want=list(range(10)))
+    def test__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @Driver(initial=range(10), method=SampleFraction(args=[0]), want=[])
+    def test1__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=range(10), method=SampleFraction(args=[0]), want=[])
+    def test1__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###########################
+
+    @run_to_completion
+    async def test_fraction(self):
+        got = await AsyncStream(fast(range(5000))).sample_fraction(0.1, seed=3).collect()
+        self.assertTrue(350 < len(got) < 650)
+        self.assertEqual(got, sorted(set(got)))
+        # Every path draws the same gaps for the same seed.
+        self.assertEqual(got, await AsyncStream(iter(range(5000))).sample_fraction(0.1, seed=3).collect())
+        self.assertEqual(got, await AsyncStream(range(5000)).sample_fraction(0.1, seed=3).collect())
+
+    @run_to_completion
+    async def test_infinite(self):
+        got = await AsyncStream().repeat(1).sample_fraction(0.5).take(3).collect()
+        self.assertEqual(got, [1, 1, 1])
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_value_error(self):
+        AsyncStream([]).sample_fraction(-0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
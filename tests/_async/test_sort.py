@@ -1,7 +1,7 @@
 import unittest
 
 from pstream import AsyncStream
-from tests._async.utils import Driver, Method
+from tests._async.utils import Driver, Method, run_to_completion, expect
 
 
 class Sort(Method):
@@ -40,6 +40,44 @@ class TestSort(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###############################
+
+    @Driver(initial=random, method=Sort(args=[5]), want=[-1, 0, 2, 2, 4, 5, 6, 8, 56, 78, 123, 1245])
+    def test_memory_limit__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=random, method=Sort(args=[5]), want=[-1, 0, 2, 2, 4, 5, 6, 8, 56, 78, 123, 1245])
+    def test_memory_limit__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_memory_limit_value_error(self):
+        AsyncStream(self.random).sort(0)
+
+    ###############################
+
+    @Driver(initial=random, method=Sort(args=[None, True]), want=[-1, 0, 2, 2, 4, 5, 6, 8, 56, 78, 123, 1245])
+    def test_lazy__a(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=random, method=Sort(args=[None, True]), want=[-1, 0, 2, 2, 4, 5, 6, 8, 56, 78, 123, 1245])
+    def test_lazy__s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @run_to_completion
+    @expect(ValueError)
+    async def test_lazy_memory_limit_value_error(self):
+        AsyncStream(self.random).sort(5, True)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -52,6 +52,38 @@ class TestSortWith(unittest.TestCase):
             raise exception
         self.assertEqual(got, want)
 
+    ###############################
+
+    @Driver(initial=['12', '233', '4567', '7', '567', '34', '4', '7', '63'], method=SortWith(args=[len, 2]),
+            want=['7', '4', '7', '12', '34', '63', '233', '567', '4567'])
+    def test_memory_limit__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['12', '233', '4567', '7', '567', '34', '4', '7', '63'], method=SortWith(args=[len, 2]),
+            want=['7', '4', '7', '12', '34', '63', '233', '567', '4567'])
+    def test_memory_limit__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    ###############################
+
+    @Driver(initial=['12', '233', '4567', '7', '567', '34', '4', '7', '63'], method=SortWith(args=[len, None, True]),
+            want=['7', '4', '7', '12', '34', '63', '233', '567', '4567'])
+    def test_lazy__s_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
+    @Driver(initial=['12', '233', '4567', '7', '567', '34', '4', '7', '63'], method=SortWith(args=[len, None, True]),
+            want=['7', '4', '7', '12', '34', '63', '233', '567', '4567'])
+    def test_lazy__a_s(self, got=None, want=None, exception=None):
+        if exception is not None:
+            raise exception
+        self.assertEqual(got, want)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -21,11 +21,30 @@
 # SOFTWARE.
 
 import hashlib
+import pickle
+import threading
+import time
 import unittest
+from collections import deque
 from functools import wraps
+from multiprocessing.pool import MaybeEncodingError
+
+try:
+    # Py3
+    from collections.abc import Sequence
+except ImportError:  # pragma: no cover
+    # Py2
+    from collections import Sequence
 
 from pstream.errors import InfiniteCollectionError
-from pstream import Stream
+from pstream import Stream, BloomFilter, HyperLogLog, KLL, SpaceSaving
+from pstream._sync.spill import ExternalSorter, SpillingGrouper
+from pstream._sync.window import RecentKeys
+from pstream._sync.plan import optimize, select, SequenceView, ENUMERATE, FILTER, MAP, SORT_DESCENDING, TAIL, BOTTOM_K, TOP_K
+
+
+def make_lock(_):
+    return threading.Lock()
 
 
 def expect(exception):
@@ -72,6 +91,13 @@ class TestStream(unittest.TestCase):
     def test_chain_repeated_call(self):
         self.assertEqual(Stream([1, 2, 3]).chain([4, 5, 6]).chain([7, 8, 9]).collect(), [1, 2, 3, 4, 5, 6, 7, 8, 9])
 
+    def test_chain_flattened(self):
+        s = Stream([0])
+        for i in range(1, 5000):
+            s = s.chain([i])
+        self.assertEqual(len(s._stages), 1)
+        self.assertEqual(s.collect(), list(range(5000)))
+
     def test_count(self):
         self.assertEqual(Stream([1, 2, 3]).count(), 3)
 
@@ -81,9 +107,313 @@ class TestStream(unittest.TestCase):
     def test_count_filtered(self):
         self.assertEqual(Stream([1, 2, 3, 4]).filter(lambda x: x % 2 == 0).count(), 2)
 
+    def test_count_structural(self):
+        self.assertEqual(Stream(range(10 ** 15)).skip(5).step_by(10).count(), 10 ** 14)
+        self.assertEqual(Stream(range(10)).take(3).reverse().count(), 3)
+        self.assertEqual(Stream([1, 2]).skip(5).count(), 0)
+        self.assertEqual(Stream({1, 2, 3}).zip([1, 2]).count(), 2)
+        self.assertEqual(Stream(range(10)).chain([1, 2], (3,)).pool(4).count(), 4)
+
+    def test_count_inspected(self):
+        seen = TestStream.Inspector()
+        self.assertEqual(Stream(range(5)).inspect(seen.visit).take(3).count(), 3)
+        self.assertEqual(seen.copy, [0, 1, 2])
+
+    def test_count_mapped(self):
+        self.assertEqual(Stream(range(10)).map(str).skip(3).step_by(2).count(), 4)
+        self.assertEqual(Stream([1, 2, 3]).zip(range(10)).sort().count(), 3)
+        self.assertEqual(Stream(range(10)).chain(x for x in range(5)).count(), 15)
+
+    def test_count_source_grows(self):
+        source = [1, 2]
+        s = Stream(source).skip(1)
+        source.append(3)
+        self.assertEqual(s.count(), 2)
+        source = [1, 2]
+        s = Stream(source)
+        source.append(3)
+        self.assertEqual(s.count(), 3)
+
+    def test_count_after_iteration(self):
+        s = Stream(range(10))
+        next(s)
+        self.assertEqual(s.count(), 9)
+
     def test_distinct(self):
         self.assertEqual(Stream([1, 2, 2, 3, 2, 1, 4, 5, 6, 1]).distinct().collect(), [1, 2, 3, 4, 5, 6])
 
+    def test_approx_count_distinct(self):
+        self.assertEqual(Stream(range(1000)).map(lambda x: x % 10).approx_count_distinct(), 10)
+        self.assertEqual(Stream().approx_count_distinct(), 0)
+
+    def test_approx_count_distinct_large(self):
+        got = Stream(range(200000)).map(lambda x: 'id-{}'.format(x)).approx_count_distinct()
+        self.assertLess(abs(got - 200000), 200000 * 0.03)
+
+    @expect(ValueError)
+    def test_approx_count_distinct_precision(self):
+        Stream().approx_count_distinct(precision=19)
+
+    def test_hyperloglog_merge(self):
+        a = HyperLogLog(precision=10).update(range(0, 30000))
+        b = HyperLogLog(precision=10).update(range(20000, 50000))
+        union = HyperLogLog(precision=10).update(range(0, 50000))
+        self.assertEqual(a.merge(b).registers, union.registers)
+        self.assertEqual(len(a.registers), 1024)
+
+    @expect(ValueError)
+    def test_hyperloglog_merge_precision(self):
+        HyperLogLog(precision=10).merge(HyperLogLog(precision=11))
+
+    def test_quantiles(self):
+        numbers = [(i * 7919) % 100000 for i in range(100000)]
+        got = Stream(numbers).quantiles([0, 0.01, 0.5, 0.99, 1])
+        self.assertEqual(got[0], 0)
+        self.assertEqual(got[-1], 99999)
+        for q, x in zip([0.01, 0.5, 0.99], got[1:-1]):
+            self.assertLess(abs(x / 100000.0 - q), 0.02)
+
+    def test_quantiles_empty(self):
+        self.assertEqual(Stream().quantiles([0.5, 0.9]), [None, None])
+
+    def test_quantiles_small(self):
+        self.assertEqual(Stream([3, 1, 2]).quantiles([0, 0.5, 1]), [1, 2, 3])
+
+    @expect(ValueError)
+    def test_quantiles_value_error(self):
+        Stream().quantiles([0.5, 1.5])
+
+    def test_kll_merge(self):
+        a = KLL(k=50, seed=1).update(range(0, 50000))
+        b = KLL(k=50, seed=2).update(range(50000, 100000))
+        a.merge(b)
+        self.assertEqual(a.count, 100000)
+        self.assertEqual(a.quantiles([0, 1]), [0, 99999])
+        self.assertLess(abs(a.quantile(0.5) - 50000), 5000)
+        self.assertLess(a.size, 400)
+
+    def test_describe(self):
+        numbers = [2, 4, 4, 4, 5, 5, 7, 9]
+        got = Stream(numbers).describe()
+        self.assertEqual(got.count, 8)
+        self.assertAlmostEqual(got.mean, 5)
+        self.assertAlmostEqual(got.variance, 32 / 7.0)
+        self.assertAlmostEqual(got.stdev, (32 / 7.0) ** 0.5)
+        self.assertEqual((got.min, got.max), (2, 9))
+        self.assertEqual(got.quantiles, {0.25: 4, 0.5: 4, 0.75: 5})
+
+    def test_describe_stable(self):
+        # The naive sum of squares loses all precision here.
+        got = Stream([1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]).describe()
+        self.assertAlmostEqual(got.variance, 30)
+
+    def test_describe_degenerate(self):
+        self.assertEqual(Stream().describe(qs=[0.5]), Stream.Description(0, None, None, None, None, None, {0.5: None}))
+        got = Stream([1]).describe(qs=[0.5])
+        self.assertEqual(got, Stream.Description(1, 1, None, None, 1, 1, {0.5: 1}))
+
+    def test_most_common(self):
+        got = Stream('abracadabra').most_common(3)
+        self.assertEqual(got, [('a', 5), ('b', 2), ('r', 2)])
+
+    def test_most_common_empty(self):
+        self.assertEqual(Stream().most_common(3), [])
+        self.assertEqual(Stream().most_common(3, approximate=True), [])
+
+    def test_most_common_approximate(self):
+        # A heavy hitter hidden amongst a long tail of singletons.
+        numbers = [x if x % 4 else -1 for x in range(10000)]
+        got = Stream(numbers).most_common(1, approximate=True, counters=10)
+        self.assertEqual(got[0][0], -1)
+        self.assertGreaterEqual(got[0][1], 2500)
+        self.assertLessEqual(got[0][1], 2500 + 10000 // 10)
+
+    def test_most_common_approximate_exact_when_sufficient(self):
+        words = 'the quick brown fox jumps over the lazy dog the fox'.split()
+        self.assertEqual(Stream(words).most_common(3, approximate=True), Stream(words).most_common(3))
+
+    def test_space_saving_bounded(self):
+        sketch = SpaceSaving(counters=50).update(range(10000))
+        self.assertEqual(len(sketch.counts), 50)
+        self.assertEqual(len(sketch.heap), 50)
+
+    @expect(ValueError)
+    def test_most_common_k(self):
+        Stream().most_common(0)
+
+    @expect(ValueError)
+    def test_most_common_counters(self):
+        Stream().most_common(5, approximate=True, counters=4)
+
+    def test_sample(self):
+        got = Stream(iter(range(100000))).sample(10, seed=42).collect()
+        self.assertEqual(len(got), 10)
+        self.assertEqual(len(set(got)), 10)
+        self.assertTrue(all(0 <= x < 100000 for x in got))
+        self.assertEqual(got, Stream(iter(range(100000))).sample(10, seed=42).collect())
+
+    def test_sample_small(self):
+        self.assertEqual(Stream(iter([1, 2, 3])).sample(5).collect(), [1, 2, 3])
+        self.assertEqual(sorted(Stream([1, 2, 3]).sample(5).collect()), [1, 2, 3])
+        self.assertEqual(Stream(iter([1, 2, 3])).sample(0).collect(), [])
+        self.assertEqual(Stream().sample(3).collect(), [])
+
+    def test_sample_uniform(self):
+        counts = [0] * 10
+        for seed in range(2000):
+            for x in Stream(iter(range(10))).sample(3, seed=seed):
+                counts[x] += 1
+        # Each element is expected 600 times.
+        self.assertTrue(all(500 < count < 700 for count in counts), counts)
+
+    def test_sample_sequence(self):
+        # Indexing directly into a range means this never iterates over the hundred billion elements.
+        got = Stream(range(10 ** 11)).sample(5).collect()
+        self.assertEqual(len(got), 5)
+
+    def test_sample_sequence_after_next(self):
+        stream = Stream([1, 2, 3])
+        self.assertEqual(next(stream), 1)
+        self.assertEqual(sorted(stream.sample(5).collect()), [2, 3])
+
+    @expect(ValueError)
+    def test_sample_value_error(self):
+        Stream().sample(-1)
+
+    @expect(InfiniteCollectionError)
+    def test_sample_infinite(self):
+        Stream().repeat(1).sample(1)
+
+    def test_sample_fraction(self):
+        got = Stream(iter(range(100000))).sample_fraction(0.1, seed=7).collect()
+        self.assertTrue(9000 < len(got) < 11000)
+        self.assertEqual(got, sorted(set(got)))
+        self.assertEqual(got, Stream(range(100000)).sample_fraction(0.1, seed=7).collect())
+
+    def test_sample_fraction_bounds(self):
+        self.assertEqual(Stream(iter(range(10))).sample_fraction(1).collect(), list(range(10)))
+        self.assertEqual(Stream(range(10)).sample_fraction(0).collect(), [])
+
+    def test_sample_fraction_sequence(self):
+        got = Stream(range(10 ** 11)).sample_fraction(10 ** -10).collect()
+        self.assertTrue(len(got) < 100)
+
+    def test_sample_fraction_infinite(self):
+        got = Stream().repeat(1).sample_fraction(0.5).take(3).collect()
+        self.assertEqual(got, [1, 1, 1])
+
+    @expect(ValueError)
+    def test_sample_fraction_value_error(self):
+        Stream().sample_fraction(1.5)
+
+    def test_distinct_approximate(self):
+        numbers = [(i * 7919) % 1000 for i in range(5000)]
+        got = Stream(numbers).distinct(approximate=True, capacity=1000, error_rate=0.001).collect()
+        want = Stream(numbers).distinct().collect()
+        # A false positive may only ever drop an element, never duplicate one.
+        self.assertEqual(len(set(got)), len(got))
+        self.assertTrue(set(got).issubset(want))
+        self.assertGreaterEqual(len(got), 990)
+
+    def test_distinct_with_approximate(self):
+        people = ['Bob', 'Alice', 'Eve', 'Alice', 'Alice', 'Eve', 'Achmed']
+        got = Stream(people).distinct_with(len, approximate=True, capacity=10, error_rate=0.0001).collect()
+        self.assertEqual(got, ['Bob', 'Alice', 'Achmed'])
+
+    @expect(ValueError)
+    def test_distinct_approximate_capacity(self):
+        Stream().distinct(approximate=True, capacity=0)
+
+    @expect(ValueError)
+    def test_distinct_approximate_error_rate(self):
+        Stream().distinct(approximate=True, error_rate=1)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for x in range(10000):
+            bloom.add(x)
+        self.assertEqual(bloom.error_rate, 0.01)
+        self.assertTrue(all(x in bloom for x in range(10000)))
+        self.assertLessEqual(bloom.false_positive_rate, 0.011)
+        false_positives = sum(1 for x in range(10 ** 6, 10 ** 6 + 10000) if x in bloom)
+        self.assertLess(false_positives / 10000.0, 0.02)
+
+    def test_bloom_filter_fixed_size(self):
+        bloom = BloomFilter(capacity=100, error_rate=0.01)
+        size = len(bloom.bits)
+        for x in range(10000):
+            bloom.add(x)
+        self.assertEqual(len(bloom.bits), size)
+        self.assertGreater(bloom.false_positive_rate, 0.5)
+
+    def test_distinct_within(self):
+        got = Stream([1, 2, 1, 3, 2, 4, 5, 6, 1, 6]).distinct_within(window=3).collect()
+        self.assertEqual(got, [1, 2, 3, 4, 5, 6, 1])
+
+    def test_distinct_within_key(self):
+        got = Stream(['a', 'bb', 'c', 'dd', 'eee', 'f']).distinct_within(window=1, key=len).collect()
+        self.assertEqual(got, ['a', 'bb', 'c', 'dd', 'eee', 'f'])
+        got = Stream(['a', 'bb', 'c', 'dd', 'eee', 'f']).distinct_within(window=2, key=len).collect()
+        self.assertEqual(got, ['a', 'bb', 'eee', 'f'])
+
+    def test_distinct_within_infinite(self):
+        got = Stream().repeat(1).enumerate().distinct_within(window=10, key=lambda e: e.count % 3).take(3).collect()
+        self.assertEqual(got, [(0, 1), (1, 1), (2, 1)])
+
+    def test_distinct_within_bounded(self):
+        seen = RecentKeys(window=100)
+        for x in range(10000):
+            self.assertFalse(seen.add(x))
+        self.assertEqual(len(seen.keys), 100)
+        self.assertTrue(seen.add(9999))
+        self.assertFalse(seen.add(0))
+
+    def test_distinct_within_ttl(self):
+        class Clock(object):
+            now = 0
+
+            def __call__(self):
+                return self.now
+        clock = Clock()
+        seen = RecentKeys(ttl=10, clock=clock)
+        self.assertFalse(seen.add('a'))
+        clock.now = 5
+        self.assertTrue(seen.add('a'))
+        self.assertFalse(seen.add('b'))
+        clock.now = 10
+        self.assertFalse(seen.add('a'))
+        self.assertTrue(seen.add('b'))
+        clock.now = 15
+        self.assertFalse(seen.add('c'))
+        self.assertEqual(list(seen.keys), ['a', 'c'])
+
+    def test_distinct_within_ttl_stream(self):
+        got = Stream([1, 2, 1, 2]).distinct_within(ttl=60).collect()
+        self.assertEqual(got, [1, 2])
+
+    @expect(ValueError)
+    def test_distinct_within_no_bounds(self):
+        Stream().distinct_within()
+
+    @expect(ValueError)
+    def test_distinct_within_window(self):
+        Stream().distinct_within(window=0)
+
+    @expect(ValueError)
+    def test_distinct_within_ttl_value_error(self):
+        Stream().distinct_within(ttl=-1)
+
+    def test_distinct_sorted(self):
+        got = Stream([1, 1, 2, 3, 3, 3, 1]).distinct_sorted().collect()
+        self.assertEqual(got, [1, 2, 3, 1])
+
+    def test_distinct_sorted_empty(self):
+        self.assertEqual(Stream().distinct_sorted().collect(), [])
+
+    def test_distinct_sorted_infinite(self):
+        got = Stream().repeat(1).enumerate().map(lambda e: e.count // 3).distinct_sorted().take(3).collect()
+        self.assertEqual(got, [0, 1, 2])
+
     def test_distinct_with(self):
         def fingerprint(name):
             return hashlib.sha256(name.encode('utf-8')).digest()
@@ -173,6 +503,82 @@ class TestStream(unittest.TestCase):
         got = Stream().group_by(len).collect()
         self.assertEqual(got, [])
 
+    def test_group_by_memory_limit(self):
+        numbers = [(i * 7919) % 1000 for i in range(1000)]
+        got = Stream(numbers).group_by(lambda x: x % 50, memory_limit=20).collect()
+        want = Stream(numbers).group_by(lambda x: x % 50).collect()
+        self.assertEqual(len(got), 50)
+        self.assertEqual(sorted(got), sorted(want))
+
+    def test_group_by_memory_limit_single_key(self):
+        got = Stream(range(100)).group_by(lambda x: 'all', memory_limit=10).collect()
+        self.assertEqual(got, [list(range(100))])
+
+    def test_group_by_memory_limit_under(self):
+        got = Stream(range(10)).group_by(lambda x: x % 2, memory_limit=100).collect()
+        self.assertEqual(sorted(got), [[0, 2, 4, 6, 8], [1, 3, 5, 7, 9]])
+
+    @expect(ValueError)
+    def test_group_by_memory_limit_value_error(self):
+        Stream().group_by(len, memory_limit=0)
+
+    def test_spilling_grouper(self):
+        groups = SpillingGrouper(10)
+        for x in range(100):
+            groups.add(x % 20, x)
+        self.assertIsNone(groups.groups)
+        self.assertEqual(len(groups.partitions), 16)
+        self.assertEqual(sorted(groups), [list(range(k, 100, 20)) for k in range(20)])
+
+    def test_group_by_aggregate(self):
+        numbers = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+        groups = Stream(numbers).group_by(lambda x: x % 3).collect()
+        for name, f in [('count', len), ('sum', sum), ('min', min), ('max', max),
+                        ('mean', lambda g: sum(g) / len(g)), ('first', lambda g: g[0]), ('last', lambda g: g[-1])]:
+            got = Stream(numbers).group_by_aggregate(lambda x: x % 3, name).collect()
+            want = [Stream.Aggregation(group[0] % 3, f(group)) for group in groups]
+            self.assertEqual(sorted(got), sorted(want), name)
+
+    def test_group_by_aggregate_function(self):
+        got = Stream(range(10)).group_by_aggregate(lambda x: x % 2, lambda acc, x: acc * 10 + x).collect()
+        self.assertEqual(sorted(got), [(0, 2468), (1, 13579)])
+
+    def test_group_by_aggregate_initial(self):
+        got = Stream(range(10)).group_by_aggregate(lambda x: x % 2, lambda acc, x: acc + (x,), initial=()).collect()
+        self.assertEqual(sorted(got), [(0, (0, 2, 4, 6, 8)), (1, (1, 3, 5, 7, 9))])
+
+    def test_group_by_aggregate_mutable_initial(self):
+        initial = []
+        got = Stream(range(6)).group_by_aggregate(lambda x: x % 2, lambda acc, x: (acc.append(x), acc)[1], initial=initial).collect()
+        self.assertEqual(sorted(got), [(0, [0, 2, 4]), (1, [1, 3, 5])])
+        self.assertEqual(initial, [])
+
+    def test_group_by_aggregate_empty(self):
+        self.assertEqual(Stream().group_by_aggregate(len, 'sum').collect(), [])
+
+    @expect(ValueError)
+    def test_group_by_aggregate_unknown(self):
+        Stream().group_by_aggregate(len, 'median')
+
+    @expect(ValueError)
+    def test_group_by_aggregate_named_with_initial(self):
+        Stream().group_by_aggregate(len, 'sum', initial=0)
+
+    def test_group_by_sorted(self):
+        got = Stream([1, 1, 2, 3, 3, 1]).group_by_sorted(lambda x: x).collect()
+        self.assertEqual(got, [[1, 1], [2], [3, 3], [1]])
+
+    def test_group_by_sorted_empty(self):
+        self.assertEqual(Stream().group_by_sorted(len).collect(), [])
+
+    def test_group_by_sorted_infinite(self):
+        got = Stream().repeat(1).enumerate().group_by_sorted(lambda e: e.count // 2).take(2).collect()
+        self.assertEqual(got, [[(0, 1), (1, 1)], [(2, 1), (3, 1)]])
+
+    def test_group_by_sorted_unhashable(self):
+        got = Stream([[1], [1], [2]]).group_by_sorted(lambda x: x).collect()
+        self.assertEqual(got, [[[1], [1]], [[2]]])
+
     def test_inspect(self):
         inspector = TestStream.Inspector()
         got = Stream([1, 2, 3, 4]).filter(lambda x: x % 2 == 0).inspect(inspector.visit).collect()
@@ -190,12 +596,77 @@ class TestStream(unittest.TestCase):
     def test_map_empty(self):
         self.assertEqual(Stream([]).map(lambda x: x * 2).collect(), [])
 
+    def test_fused(self):
+        inspector = TestStream.Inspector()
+        got = Stream(range(20)) \
+            .map(lambda x: x + 1) \
+            .filter(lambda x: x % 2 == 0) \
+            .inspect(inspector.visit) \
+            .filter_false(lambda x: x % 4 == 0) \
+            .map(lambda x: x * 10) \
+            .take_while(lambda x: x < 150) \
+            .collect()
+        self.assertEqual(got, [20, 60, 100, 140])
+        self.assertEqual(inspector.copy, [2, 4, 6, 8, 10, 12, 14, 16, 18])
+
+    def test_fused_is_lazy(self):
+        inspector = TestStream.Inspector()
+        s = Stream([1, 2, 3]).inspect(inspector.visit).map(lambda x: x * 2)
+        self.assertEqual(inspector.copy, [])
+        self.assertEqual(s.collect(), [2, 4, 6])
+        self.assertEqual(inspector.copy, [1, 2, 3])
+
+    def test_fused_long_pipeline(self):
+        s = Stream(range(10))
+        for _ in range(300):
+            s = s.map(lambda x: x + 1)
+        self.assertEqual(s.collect(), list(range(300, 310)))
+
+    def test_fused_after_next(self):
+        s = Stream(range(10)).map(lambda x: x * 2)
+        self.assertEqual(next(s), 0)
+        s.filter(lambda x: x > 10).map(lambda x: x + 1)
+        self.assertEqual(s.collect(), [13, 15, 17, 19])
+
     def test_next(self):
         s = Stream([1, 2, 3, 4, 5]).map(lambda x: x * 2)
         for i in range(1, 4):
             self.assertEqual(next(s), i * 2)
         self.assertEqual(s.collect(), [8, 10])
 
+    def test_par_map(self):
+        got = Stream(range(-100, 0)).par_map(abs, workers=2, chunksize=3).collect()
+        self.assertEqual(got, list(range(100, 0, -1)))
+
+    def test_par_map_unordered(self):
+        got = Stream(range(-100, 0)).par_map(abs, workers=2, chunksize=3, ordered=False).collect()
+        self.assertEqual(sorted(got), list(range(1, 101)))
+
+    def test_par_map_empty(self):
+        self.assertEqual(Stream([]).par_map(abs, workers=2).collect(), [])
+
+    def test_par_map_early_stop(self):
+        got = Stream(range(-1000, 0)).par_map(abs, workers=2, chunksize=1).take(3).collect()
+        self.assertEqual(got, [1000, 999, 998])
+
+    @expect(TypeError)
+    def test_par_map_error(self):
+        Stream([-1, 'a', -3]).par_map(abs, workers=2).collect()
+
+    def test_par_map_unpicklable_function(self):
+        for ordered in (True, False):
+            with self.assertRaises((pickle.PicklingError, AttributeError)):
+                Stream([1, 2, 3]).par_map(lambda x: x * 2, workers=2, ordered=ordered).collect()
+
+    def test_par_map_unpicklable_result(self):
+        for ordered in (True, False):
+            with self.assertRaises(MaybeEncodingError):
+                Stream([1, 2, 3]).par_map(make_lock, workers=2, ordered=ordered).collect()
+
+    @expect(ValueError)
+    def test_par_map_value_error(self):
+        Stream().par_map(abs, workers=0)
+
     def test_pool_even_even(self):
         self.assertEqual(Stream([1, 2, 3, 4]).pool(2).collect(), [[1, 2], [3, 4]])
 
@@ -311,6 +782,259 @@ class TestStream(unittest.TestCase):
         got = Stream(arr).filter(lambda x: x % 2).sort().reverse().filter(lambda x: x < 1000).distinct().collect()
         self.assertEqual(got, [567, 345, 233, 63, 45, 23, 7])
 
+    def test_sort_memory_limit(self):
+        arr = [(i * 7919) % 1000 for i in range(1000)]
+        self.assertEqual(Stream(arr).sort(memory_limit=7).collect(), sorted(arr))
+        self.assertEqual(Stream(arr).sort(memory_limit=1).collect(), sorted(arr))
+        self.assertEqual(Stream(arr).sort(memory_limit=5000).collect(), sorted(arr))
+
+    def test_sort_with_memory_limit_is_stable(self):
+        arr = ['12', '233', '4567', '344523', '7', '567', '34', '5678', '456', '23', '4', '7', '63', '45', '345']
+        got = Stream(arr).sort_with(len, memory_limit=2).collect()
+        self.assertEqual(got, ['7', '4', '7', '12', '34', '23', '63', '45', '233', '567', '456', '345', '4567', '5678', '344523'])
+        got = Stream(arr).sort_with(len, memory_limit=2).reverse().collect()
+        self.assertEqual(got, list(reversed(sorted(arr, key=len))))
+
+    def test_sort_memory_limit_early_stop(self):
+        got = Stream(range(100, 0, -1)).sort(memory_limit=10).take_while(lambda x: x < 4).collect()
+        self.assertEqual(got, [1, 2, 3])
+
+    @expect(ValueError)
+    def test_sort_memory_limit_value_error(self):
+        Stream().sort(memory_limit=0)
+
+    def test_external_sorter_spills(self):
+        sorter = ExternalSorter(None, 10)
+        for x in range(95, 0, -1):
+            sorter.add(x)
+        self.assertEqual(len(sorter.runs), 9)
+        self.assertEqual(len(sorter.buffer), 5)
+        self.assertEqual(list(sorter), list(range(1, 96)))
+
+    def test_external_sorter_levels(self):
+        sorter = ExternalSorter(None, 10)
+        for x in range(5000, 0, -1):
+            sorter.add(x)
+        # 500 runs of 10, merged 10 at a time, make 50 runs of 100 and then 5 runs of 1000.
+        self.assertEqual([len(level) for level in sorter.levels], [0, 0, 5])
+        self.assertEqual(list(sorter), list(range(1, 5001)))
+
+    def test_external_sorter_is_stable_across_merge_passes(self):
+        arr = [(x * 7919) % 13 for x in range(3000)]
+        got = Stream(enumerate(arr)).sort_with(lambda pair: pair[1], memory_limit=4).collect()
+        self.assertEqual(got, sorted(enumerate(arr), key=lambda pair: pair[1]))
+
+    def test_external_sorter_bounded_batches(self):
+        sorter = ExternalSorter(None, 1000)
+        self.assertLessEqual(sorter.fan_in * sorter.batch_size, 1000)
+
+    def test_sort_memory_limit_open_files(self):
+        try:
+            import resource
+        except ImportError:  # pragma: no cover
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (256, hard))
+        try:
+            arr = [float((x * 7919) % 50000) for x in range(50000)]
+            got = Stream(arr).sort(memory_limit=10).collect()
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        self.assertEqual(got, sorted(arr))
+
+    def test_sort_take(self):
+        arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        self.assertEqual(Stream(arr).sort().take(4).collect(), [4, 7, 7, 12])
+        self.assertEqual(Stream(arr).sort().take(0).collect(), [])
+        self.assertEqual(Stream(arr).sort().take(100).collect(), sorted(arr))
+
+    def test_sort_with_take_is_stable(self):
+        arr = ['12', '233', '4567', '344523', '7', '567', '34', '5678', '456', '23', '4', '7', '63', '45', '345']
+        self.assertEqual(Stream(arr).sort_with(len).take(5).collect(), ['7', '4', '7', '12', '34'])
+
+    def test_sort_map_take(self):
+        mapped = TestStream.Inspector()
+        got = Stream([5, 3, 1, 4, 2]).sort().inspect(mapped.visit).map(lambda x: x * 10).take(2).collect()
+        self.assertEqual(got, [10, 20])
+        self.assertEqual(mapped.copy, [1, 2])
+
+    def test_sort_reverse_is_stable(self):
+        arr = ['12', '233', '4567', '344523', '7', '567', '34', '5678', '456', '23', '4', '7', '63', '45', '345']
+        got = Stream(arr).sort_with(len).reverse().collect()
+        self.assertEqual(got, list(reversed(sorted(arr, key=len))))
+
+    def test_sort_filter(self):
+        got = Stream([5, 3, 1, 4, 2]).sort().filter(lambda x: x % 2).reverse().filter_false(lambda x: x == 3).collect()
+        self.assertEqual(got, [5, 1])
+
+    def test_sort_lazy(self):
+        arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        self.assertEqual(Stream(arr).sort(lazy=True).collect(), sorted(arr))
+        self.assertEqual(Stream().sort(lazy=True).collect(), [])
+
+    def test_sort_with_lazy_is_stable(self):
+        arr = ['12', '233', '4567', '344523', '7', '567', '34', '5678', '456', '23', '4', '7', '63', '45', '345']
+        self.assertEqual(Stream(arr).sort_with(len, lazy=True).collect(), sorted(arr, key=len))
+        self.assertEqual(Stream(arr).sort_with(len, lazy=True).reverse().collect(), list(reversed(sorted(arr, key=len))))
+
+    def test_sort_lazy_early_stop(self):
+        popped = TestStream.Inspector()
+        got = Stream(range(100, 0, -1)).sort(lazy=True).inspect(popped.visit).take_while(lambda x: x < 4).collect()
+        self.assertEqual(got, [1, 2, 3])
+        self.assertEqual(popped.copy, [1, 2, 3, 4])
+
+    @expect(ValueError)
+    def test_sort_lazy_memory_limit_value_error(self):
+        Stream().sort(memory_limit=10, lazy=True)
+
+    def test_top_k(self):
+        arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        self.assertEqual(Stream(arr).top_k(3).collect(), [344523, 5678, 4567])
+        self.assertEqual(Stream(arr).top_k(0).collect(), [])
+        self.assertEqual(Stream(arr).top_k(100).collect(), sorted(arr, reverse=True))
+        self.assertEqual(Stream(['bb', 'a', 'cc', 'd']).top_k(2, key=len).collect(), ['bb', 'cc'])
+
+    def test_bottom_k(self):
+        arr = [12, 233, 4567, 344523, 7, 567, 34, 5678, 456, 23, 4, 7, 63, 45, 345]
+        self.assertEqual(Stream(arr).bottom_k(3).collect(), [4, 7, 7])
+        self.assertEqual(Stream(arr).bottom_k(100).collect(), sorted(arr))
+        self.assertEqual(Stream(['bb', 'a', 'cc', 'd']).bottom_k(2, key=len).collect(), ['a', 'd'])
+
+    def test_top_k_take(self):
+        s = Stream(range(10)).top_k(5).take(2)
+        self.assertEqual([stage.op for stage in optimize(s._stages)], [TOP_K])
+        self.assertEqual(s.collect(), [9, 8])
+        self.assertEqual(Stream(range(10)).bottom_k(2).take(5).collect(), [0, 1])
+
+    @expect(InfiniteCollectionError)
+    def test_top_k_infinite(self):
+        Stream().repeat(1).top_k(3)
+
+    def test_push_down(self):
+        self.assertEqual(Stream(range(10 ** 12)).skip(10 ** 12 - 3).reverse().collect(), [10 ** 12 - 1, 10 ** 12 - 2, 10 ** 12 - 3])
+        self.assertEqual(Stream(list(range(20))).skip(3).step_by(4).reverse().take(3).collect(), [19, 15, 11])
+        self.assertEqual(Stream((1, 2, 3)).reverse().take(-1).collect(), [])
+        self.assertEqual(Stream([1, 2, 3]).skip(-1).take(2).collect(), [1, 2])
+        self.assertEqual(Stream([]).reverse().step_by(2).collect(), [])
+        self.assertEqual(Stream(memoryview(b'abcdef')).skip(2).reverse().map(chr).collect(), ['f', 'e', 'd', 'c'])
+
+    def test_push_down_below_map(self):
+        mapped = TestStream.Inspector()
+        got = Stream(list(range(10))).inspect(mapped.visit).map(lambda x: x * 2).take(3).collect()
+        self.assertEqual(got, [0, 2, 4])
+        self.assertEqual(mapped.copy, [0, 1, 2])
+
+    def test_push_down_stops_at_filter(self):
+        got = Stream(list(range(10))).skip(1).filter(lambda x: x % 2).reverse().take(2).collect()
+        self.assertEqual(got, [9, 7])
+
+    def test_push_down_sequence_view(self):
+        class Squares(Sequence):
+            def __len__(self):
+                return 10
+
+            def __getitem__(self, i):
+                if not 0 <= i < 10:
+                    raise IndexError(i)
+                return i * i
+        self.assertEqual(Stream(Squares()).skip(2).step_by(3).reverse().collect(), [64, 25, 4])
+        self.assertEqual(sorted(Stream(Squares()).skip(7).sample(5).collect()), [49, 64, 81])
+
+    def test_push_down_select(self):
+        big = list(range(1000))
+        view = select(big, range(999, 0, -2))
+        self.assertIsInstance(view, SequenceView)
+        self.assertIs(view.source, big)
+        self.assertEqual(list(view), big[999:0:-2])
+        self.assertEqual(select(big, range(10, 0, -2)), [10, 8, 6, 4, 2])
+        self.assertEqual("".join(select("abcdef" * 100, range(1, 600, 6))), "b" * 100)
+        self.assertIsInstance(select(range(10 ** 6), range(1, 10 ** 6)), range)
+        self.assertEqual(Stream(big).skip(1).reverse().take(2).collect(), [999, 998])
+        self.assertEqual(Stream(tuple(big)).skip(900).step_by(25).collect(), [900, 925, 950, 975])
+
+    def test_push_down_deque(self):
+        class Deque(deque):
+            def __getitem__(self, i):
+                raise AssertionError('a deque must be iterated over rather than indexed into')
+        d = Deque(range(1000))
+        self.assertEqual(Stream(d).skip(1).collect(), list(range(1, 1000)))
+        self.assertEqual(Stream(d).reverse().take(3).collect(), [999, 998, 997])
+        self.assertEqual(Stream(d).skip(10).step_by(100).collect(), list(range(10, 1000, 100)))
+
+    @expect(ValueError)
+    def test_push_down_step_by_zero(self):
+        Stream([1, 2, 3]).step_by(0).collect()
+
+    def test_prefetch(self):
+        self.assertEqual(Stream(range(100)).prefetch(3).collect(), list(range(100)))
+        self.assertEqual(Stream().prefetch(1).collect(), [])
+
+    def test_prefetch_overlaps(self):
+        def slow(x):
+            time.sleep(0.02)
+            return x
+        start = time.time()
+        got = Stream(range(10)).map(slow).prefetch(2).map(slow).collect()
+        self.assertEqual(got, list(range(10)))
+        # 20 sleeps of 20ms taken in turn would be 0.4s. Overlapped, they're closer to 0.22s.
+        self.assertLess(time.time() - start, 0.35)
+
+    def test_prefetch_runs_upstream_in_thread(self):
+        threads = set()
+        Stream(range(5)).inspect(lambda _: threads.add(threading.current_thread())).prefetch(2).collect()
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    @expect(ZeroDivisionError)
+    def test_prefetch_exception(self):
+        Stream([1, 2, 0, 4]).map(lambda x: 1 / x).prefetch(2).collect()
+
+    def test_prefetch_exception_after_elements(self):
+        got = list()
+        try:
+            for x in Stream([1, 2, 0, 4]).map(lambda x: 1 / x).prefetch(2):
+                got.append(x)
+        except ZeroDivisionError:
+            pass
+        self.assertEqual(got, [1, 0.5])
+
+    def test_prefetch_early_stop(self):
+        pulled = TestStream.Inspector()
+        s = iter(Stream(range(1000)).inspect(pulled.visit).prefetch(2))
+        self.assertEqual(next(s), 0)
+        s.close()
+        time.sleep(0.05)
+        before = len(pulled.copy)
+        time.sleep(0.05)
+        self.assertEqual(len(pulled.copy), before)
+        self.assertLessEqual(before, 5)
+
+    def test_prefetch_take(self):
+        pulled = TestStream.Inspector()
+        self.assertEqual(Stream(range(1000)).inspect(pulled.visit).prefetch(10).take(3).collect(), [0, 1, 2])
+        self.assertEqual(pulled.copy, [0, 1, 2])
+
+    @expect(ValueError)
+    def test_prefetch_value_error(self):
+        Stream().prefetch(0)
+
+    def test_reverse_take(self):
+        self.assertEqual(Stream(range(10)).reverse().take(3).collect(), [9, 8, 7])
+        self.assertEqual(Stream(range(2)).reverse().take(3).collect(), [1, 0])
+        self.assertEqual(Stream(range(2)).reverse().take(-1).collect(), [])
+
+    def test_take_take(self):
+        self.assertEqual(Stream(range(10)).take(5).take(3).collect(), [0, 1, 2])
+        self.assertEqual(Stream(range(10)).take(3).take(5).collect(), [0, 1, 2])
+
+    def test_optimize(self):
+        s = Stream(range(10)).sort().map(lambda x: x).take(3)
+        self.assertEqual([stage.op for stage in optimize(s._stages)], [BOTTOM_K, MAP])
+        s = Stream(range(10)).sort().reverse().filter(lambda x: x)
+        self.assertEqual([stage.op for stage in optimize(s._stages)], [FILTER, SORT_DESCENDING])
+        s = Stream(range(10)).reverse().enumerate().take(3)
+        self.assertEqual([stage.op for stage in optimize(s._stages)], [TAIL, ENUMERATE, MAP])
+
     def test_step_by_even(self):
         self.assertEqual(Stream([1, 2, 3, 4, 5, 6, 7, 8, 9]).step_by(4).collect(), [1, 5, 9])
 
@@ -343,6 +1067,28 @@ class TestStream(unittest.TestCase):
         self.assertEqual(a, [1, 2, 3, 4])
         self.assertEqual(b, [1, 2, 3, 4])
 
+    def test_thread_map(self):
+        got = Stream(['Bob', 'Alice', 'Eve']).thread_map(lambda x: hashlib.sha256(x.encode('UTF-8')).digest(), workers=2).collect()
+        self.assertEqual(got, [hashlib.sha256(x.encode('UTF-8')).digest() for x in ['Bob', 'Alice', 'Eve']])
+
+    def test_thread_map_unordered(self):
+        got = Stream(range(100)).thread_map(lambda x: x * 2, workers=4, ordered=False).collect()
+        self.assertEqual(sorted(got), list(range(0, 200, 2)))
+
+    def test_thread_map_early_stop(self):
+        pulled = list()
+        got = Stream(range(1000)).tee(pulled).thread_map(lambda x: x * 2, workers=2).take(3).collect()
+        self.assertEqual(got, [0, 2, 4])
+        self.assertTrue(len(pulled) < 10)
+
+    @expect(ZeroDivisionError)
+    def test_thread_map_error(self):
+        Stream([1, 0, 2]).thread_map(lambda x: 1 / x, workers=2).collect()
+
+    @expect(ValueError)
+    def test_thread_map_value_error(self):
+        Stream().thread_map(abs, workers=0)
+
     def test_zip(self):
         self.assertEqual(Stream([0, 1, 2]).zip([3, 4, 5]).collect(), [(0, 3), (1, 4), (2, 5)])
 